@@ -0,0 +1,898 @@
+"""
+Замеры производительности лаунчера.
+
+Запуск:
+    python benchmark.py render
+    python benchmark.py search
+    python benchmark.py fuzzy
+    python benchmark.py datamanager
+    python benchmark.py history
+    python benchmark.py launch
+    python benchmark.py memory
+    python benchmark.py storage
+    python benchmark.py prewarm
+    python benchmark.py sqlite
+    python benchmark.py startup
+    python benchmark.py cli
+    python benchmark.py service
+    python benchmark.py palette
+
+Бенчмарки, которым нужно окно Tk, требуют графического дисплея.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _make_synthetic_library(directory, count, category="Bench"):
+    """Создает count пустых файлов и файл launcher_data.json, ссылающийся на них."""
+    programs = []
+    for i in range(count):
+        path = os.path.join(directory, f"program_{i:06d}.exe")
+        with open(path, "wb"):
+            pass
+        programs.append({
+            "name": f"Program {i:06d}",
+            "path": path,
+            "type": "exe",
+            "note": "",
+            "arguments": "",
+            "working_directory": ""
+        })
+    data = {
+        "categories": {category: programs},
+        "last_selected_category": None,
+        "window_geometry": "1000x600",
+        "favorites": []
+    }
+    with open(os.path.join(directory, "launcher_data.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return category
+
+
+def _fake_icon_loader(root, counter):
+    """Подменяет извлечение иконки: создает PhotoImage и считает вызовы."""
+    def get_icon(path, size=(32, 32), cache=None):
+        counter[0] += 1
+        return tk.PhotoImage(master=root, width=size[0], height=size[1])
+    return get_icon
+
+
+class _patched_icon_pipeline:
+    """Подменяет фоновую загрузку иконок в main_app на дешевую заглушку со счетчиком вызовов."""
+
+    def __init__(self, main_app, root):
+        self.main_app = main_app
+        self.root = root
+        self.calls = 0
+
+    def _load(self, path, size=(32, 32), cache=None, signature=None):
+        self.calls += 1
+        return size
+
+    def _photo(self, size):
+        return tk.PhotoImage(master=self.root, width=size[0], height=size[1])
+
+    def __enter__(self):
+        self.saved = (self.main_app.load_icon_image, self.main_app.photo_image_from_pil)
+        self.main_app.load_icon_image = self._load
+        self.main_app.photo_image_from_pil = self._photo
+        return self
+
+    def __exit__(self, *exc_info):
+        self.main_app.load_icon_image, self.main_app.photo_image_from_pil = self.saved
+
+
+def _wait_for_icons(app, timeout=60.0):
+    """Прокручивает цикл событий Tk, пока фоновые загрузки иконок не закончатся."""
+    deadline = time.perf_counter() + timeout
+    while (app.icon_jobs or not app.icon_results.empty()) and time.perf_counter() < deadline:
+        app.master.update()
+        time.sleep(0.001)
+
+
+def _legacy_display_programs(app, get_icon):
+    """Старый конвейер: вставка всех строк, затем filter_programs удаляет их и извлекает иконки заново."""
+    from tkinter import ttk
+
+    import main_app
+
+    tree = ttk.Treeview(app.master) # Отдельное дерево, чтобы не трогать виртуальный список
+    for _ in range(2):
+        tree.delete(*tree.get_children())
+        references = {}
+        sort_by, descending = main_app.SORT_OPTIONS.get(app.sort_var.get(), (None, False))
+        programs = app.data_manager.list_programs(app.data_manager.get_current_category_name(), sort_by, descending)
+        for program_data in programs:
+            icon = get_icon(program_data["path"], size=(32, 32))
+            references[program_data["path"]] = icon
+            tree.insert("", tk.END, text=program_data["name"], image=icon, values=(program_data["path"],))
+    tree.destroy()
+
+
+def _time_scrolling(app, steps=300):
+    """Среднее время одного шага прокрутки колесом и одного прыжка ползунком, мс."""
+    program_list = app.program_list
+    root = app.master
+    start = time.perf_counter()
+    for _ in range(steps):
+        program_list.yview("scroll", 3, "units")
+        root.update_idletasks()
+    wheel = (time.perf_counter() - start) / steps
+    start = time.perf_counter()
+    for i in range(steps):
+        program_list.yview("moveto", (i * 7919 % steps) / steps)
+        root.update_idletasks()
+    jump = (time.perf_counter() - start) / steps
+    return wheel * 1000, jump * 1000
+
+
+def bench_render(sizes=(1000, 10000, 100000), legacy_limit=10000):
+    """Отрисовка категории и прокрутка: старый конвейер против виртуального списка."""
+    import main_app
+
+    print(f"{'строк':>8} | {'до, мс':>8} | {'первая отрис., мс':>17} | {'с иконками, мс':>14} | {'повторно, мс':>12} | "
+          f"{'шаг колеса, мс':>14} | {'прыжок, мс':>10} | {'элементов Tk':>12} | {'изображений':>11} | {'извлечений до/после':>20}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            category = _make_synthetic_library(directory, count)
+            old_cwd = os.getcwd()
+            os.chdir(directory)
+            root = tk.Tk()
+            root.geometry("1000x600")
+            try:
+                app = main_app.AppLauncher(root)
+                root.update()
+                app.data_manager.set_current_category_name(category)
+
+                legacy_calls = [0]
+                legacy = None
+                if count <= legacy_limit:
+                    start = time.perf_counter()
+                    _legacy_display_programs(app, _fake_icon_loader(root, legacy_calls))
+                    legacy = time.perf_counter() - start
+
+                with _patched_icon_pipeline(main_app, root) as pipeline:
+                    app.icon_references.clear()
+                    start = time.perf_counter()
+                    app.display_programs()
+                    first_paint = time.perf_counter() - start
+                    _wait_for_icons(app)
+                    cold = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    app.display_programs()
+                    warm = time.perf_counter() - start
+                    _wait_for_icons(app)
+
+                    wheel, jump = _time_scrolling(app)
+                    _wait_for_icons(app)
+                    live_items = app.program_list.live_item_count()
+                    images = len(root.image_names())
+
+                legacy_text = f"{legacy * 1000:>8.0f}" if legacy is not None else f"{'-':>8}"
+                print(f"{count:>8} | {legacy_text} | {first_paint * 1000:>17.1f} | {cold * 1000:>14.1f} | {warm * 1000:>12.1f} | "
+                      f"{wheel:>14.2f} | {jump:>10.2f} | {live_items:>12} | {images:>11} | {legacy_calls[0]:>9} / {pipeline.calls:<9}")
+                app.shutdown_background_tasks()
+            finally:
+                root.destroy()
+                os.chdir(old_cwd)
+
+
+def _synthetic_data(count, categories=10):
+    """Синтетические данные лаунчера с count программами, распределенными по категориям."""
+    words = ["alpha", "studio", "player", "editor", "viewer", "manager", "tools", "office", "game", "console"]
+    data = {
+        "categories": {f"Category {c}": [] for c in range(categories)},
+        "last_selected_category": None,
+        "window_geometry": "1000x600",
+        "favorites": []
+    }
+    for i in range(count):
+        word = words[i % len(words)]
+        data["categories"][f"Category {i % categories}"].append({
+            "name": f"{word.capitalize()} {i:06d}",
+            "path": f"C:\\Program Files\\{word}\\{word}_{i:06d}.exe",
+            "type": "exe",
+            "note": "",
+            "arguments": f"--profile {i % 7}",
+            "working_directory": ""
+        })
+    return data
+
+
+def _make_data_manager(count, categories=10, directory=None, storage="json"):
+    """
+    Создает DataManager, загрузивший count синтетических программ из временного файла.
+    Если directory не задан, файл удаляется сразу после загрузки.
+    """
+    from data_manager import DataManager
+
+    if directory is None:
+        with tempfile.TemporaryDirectory() as directory:
+            return _make_data_manager(count, categories, directory, storage)
+    filename = os.path.join(directory, "launcher_data.json")
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(_synthetic_data(count, categories), f, ensure_ascii=False)
+    data_manager = DataManager(filename, storage=storage)
+    data_manager.load_data()
+    return data_manager
+
+
+def bench_search(count=10000, query="studio 00042"):
+    """Время поиска по индексу на каждое нажатие клавиши (набор query по одной букве)."""
+    data_manager = _make_data_manager(count, categories=1)
+    programs = data_manager.get_programs_in_category("Category 0")
+    print(f"программ: {count}")
+    print(f"{'запрос':<16} | {'найдено':>8} | {'индекс, мс':>10} | {'линейно, мс':>11}")
+    for length in range(1, len(query) + 1):
+        prefix = query[:length]
+        start = time.perf_counter()
+        matched = data_manager.search_program_keys(prefix, programs)
+        indexed = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        [program for program in programs
+         if any(prefix in program.get(field, '').lower() for field in ("name", "note", "arguments", "path"))]
+        linear = (time.perf_counter() - start) * 1000
+        print(f"{prefix!r:<16} | {len(matched):>8} | {indexed:>10.2f} | {linear:>11.2f}")
+
+
+def bench_fuzzy(count=50000, queries=("s", "vs", "vwr", "stud 42", "ofcmgr", "game00049999", "zzz")):
+    """Нечеткий поиск по всем категориям: построение индекса и время запроса (топ-50)."""
+    start = time.perf_counter()
+    data_manager = _make_data_manager(count, categories=50)
+    built = time.perf_counter() - start
+    print(f"программ: {count}, загрузка и построение индекса: {built * 1000:.0f} мс")
+    gc.collect() # Полная сборка мусора после загрузки не должна попасть в замер первого запроса
+    print(f"{'запрос':<16} | {'мс (лучшее из 3)':>16} | лучший результат")
+    for query in queries:
+        elapsed = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            results = data_manager.fuzzy_search(query, limit=50)
+            elapsed = min(elapsed, (time.perf_counter() - start) * 1000)
+        best = f"{results[0][1]['name']} ({results[0][2]})" if results else "-"
+        print(f"{query!r:<16} | {elapsed:>16.2f} | {best}")
+
+
+def _time_per_call(func, calls):
+    """Среднее время одного вызова func(i) в микросекундах."""
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def bench_datamanager(sizes=(10000, 100000), calls=1000):
+    """Микро-замеры публичных методов DataManager (мкс на вызов)."""
+    for count in sizes:
+        data_manager = _make_data_manager(count, categories=10)
+        gc.collect()
+        paths = [p["path"] for programs in data_manager.data["categories"].values() for p in programs]
+        last_path = paths[-1]
+        category = "Category 0"
+        for path in paths[:100]:
+            data_manager.add_favorite(data_manager.get_program_data_by_path(path))
+
+        def add_and_delete(i):
+            data_manager.add_program(category, f"Bench {i}", f"C:\\bench\\{i}.exe")
+            data_manager.delete_program(category, f"Bench {i}")
+
+        def toggle_favorite(i):
+            program = data_manager.get_program_data_by_path(paths[i])
+            if not data_manager.add_favorite(program):
+                data_manager.remove_favorite(paths[i])
+
+        def rename_back_and_forth(i):
+            path = paths[i * 10] # Программы i*10 лежат в Category 0
+            data_manager.update_program_details(category, path, "Renamed", path + ".new")
+            data_manager.update_program_details(category, path + ".new", f"Restored {i}", path)
+
+        def rename_category(i):
+            data_manager.rename_category(category, "Renamed category")
+            data_manager.rename_category("Renamed category", category)
+
+        def import_merge(i):
+            data_manager.import_all_data({"categories": {category: [{"name": f"Imported {i}", "path": paths[i * 10]}]}})
+
+        measurements = [
+            ("get_program_data_by_path", lambda i: data_manager.get_program_data_by_path(last_path), calls),
+            ("is_favorite (нет)", lambda i: data_manager.is_favorite(last_path), calls),
+            ("is_favorite (да)", lambda i: data_manager.is_favorite(paths[0]), calls),
+            ("add_favorite/remove_favorite", toggle_favorite, calls),
+            ("add_program + delete_program", add_and_delete, calls),
+            ("update_program_details x2", rename_back_and_forth, calls),
+            ("update_program_details_with_full_data", lambda i: data_manager.update_program_details_with_full_data(last_path, note=str(i)), calls),
+            ("rename_category x2", rename_category, 10),
+            ("import_all_data (1 запись, merge)", import_merge, calls),
+        ]
+        print(f"программ: {count}")
+        for title, func, n in measurements:
+            print(f"  {title:<40} {_time_per_call(func, n):>10.1f} мкс")
+
+
+def _journal_size(filename):
+    directory = os.path.dirname(filename)
+    prefix = os.path.basename(filename) + ".journal."
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory) if name.startswith(prefix))
+
+
+def bench_storage(sizes=(1000, 10000, 50000), changes=200):
+    """
+    Стоимость сохранения одного мелкого изменения: полная перезапись JSON
+    (то, что делает фоновая запись JsonStorage) против дописывания в журнал.
+    """
+    print(f"{'программ':>8} | {'хранилище':<9} | {'мс на сохранение':>16} | {'байт на изменение':>17} | {'свертка, мс':>11}")
+    for count in sizes:
+        for storage in ("json", "journal"):
+            with tempfile.TemporaryDirectory() as directory:
+                data_manager = _make_data_manager(count, directory=directory, storage=storage)
+                filename = data_manager.filename
+                paths = [p["path"] for programs in data_manager.data["categories"].values() for p in programs]
+                gc.collect()
+                written = 0
+                elapsed = 0.0
+                journal_before = _journal_size(filename)
+                for i in range(changes):
+                    data_manager.update_program_details_with_full_data(paths[i * 37 % len(paths)], note=f"note {i}")
+                    start = time.perf_counter()
+                    if storage == "json":
+                        data_manager.save_data() # Худший случай фоновой записи: каждое изменение отдельно
+                        elapsed += time.perf_counter() - start
+                        written += os.path.getsize(filename)
+                    else:
+                        data_manager.schedule_save() # Строка журнала дописывается в потоке записи
+                        elapsed += time.perf_counter() - start
+                if storage == "journal":
+                    data_manager.storage.flush()
+                    written = _journal_size(filename) - journal_before
+
+                compaction = "-"
+                if storage == "journal":
+                    start = time.perf_counter()
+                    data_manager.save_data()
+                    compaction = f"{(time.perf_counter() - start) * 1000:.1f}"
+                data_manager.close()
+            print(f"{count:>8} | {storage:<9} | {elapsed / changes * 1000:>16.3f} | {written / changes:>17.0f} | {compaction:>11}")
+
+
+def bench_history(programs=(100, 1000, 10000), launches=1000):
+    """
+    Задержка записи запуска в историю: отложенная фоновая запись LaunchHistory
+    против синхронной записи файла истории при каждом запуске; плюс сортировка по frecency.
+    """
+    from data_manager import sort_programs
+    from launch_history import LaunchHistory
+
+    print(f"{'программ':>8} | {'мкс на запуск (фон)':>19} | {'мкс на запуск (сразу)':>21} | {'сортировка frecency, мс':>23}")
+    for count in programs:
+        with tempfile.TemporaryDirectory() as directory:
+            history = LaunchHistory(os.path.join(directory, "history.json"))
+            paths = [f"C:/Bench/program_{i:06d}.exe" for i in range(count)]
+            for i, path in enumerate(paths):
+                history.record_launch(path, timestamp=time.time() - i * 3600)
+            history.get_history(paths[0]) # Дочитываем файл, чтобы замерять только сами запуски
+            batched = _time_per_call(lambda i: history.record_launch(paths[i * 37 % count], "--bench"), launches)
+            sync_calls = min(launches, 100)
+            immediate = _time_per_call(
+                lambda i: (history.record_launch(paths[i * 37 % count], "--bench"), history._write(None)), sync_calls
+            )
+            records = [{"name": os.path.basename(path), "path": path} for path in paths]
+            start = time.perf_counter()
+            sort_programs(records, "frecency", scores=history.scores("frecency"))
+            sort_ms = (time.perf_counter() - start) * 1000
+            history.close()
+        print(f"{count:>8} | {batched:>19.1f} | {immediate:>21.1f} | {sort_ms:>23.2f}")
+
+
+def bench_launch(count=1000, calls=10000, spawns=20):
+    """
+    Подготовка запуска до Popen: поиск записи, проверки диска и разбор аргументов
+    при каждом запуске против готового плана из кэша менеджера данных; для масштаба -
+    сам Popen короткой программы.
+    """
+    import shutil
+    import subprocess
+
+    from data_manager import DataManager
+    from program_launcher import resolve_launch
+
+    with tempfile.TemporaryDirectory() as directory:
+        workdir = os.path.join(directory, "work dir")
+        os.makedirs(workdir)
+        data_manager = DataManager(os.path.join(directory, "launcher_data.json"))
+        data_manager.load_data()
+        data_manager.add_category("Bench")
+        paths = []
+        for i in range(count):
+            path = os.path.join(directory, f"script_{i:05d}.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("pass\n")
+            data_manager.add_program("Bench", f"Script {i}", path, "py", f'--input "file {i}.txt" --verbose', workdir)
+            paths.append(path)
+        for path in paths:
+            data_manager.get_launch_plan(path) # Планы собираются при первом запуске
+        gc.collect()
+
+        uncached = _time_per_call(lambda i: resolve_launch(data_manager.get_program_data_by_path(paths[i % count])), calls)
+        cached = _time_per_call(lambda i: data_manager.get_launch_plan(paths[i % count]), calls)
+        print(f"программ: {count}, планов в кэше: {len(data_manager.launch_plans)}")
+        print(f"  {'поиск записи + проверки диска + shlex':<40} {uncached:>10.1f} мкс")
+        print(f"  {'готовый план (get_launch_plan)':<40} {cached:>10.1f} мкс")
+
+        true_command = shutil.which("true")
+        if true_command:
+            processes = []
+            start = time.perf_counter()
+            for _ in range(spawns):
+                processes.append(subprocess.Popen([true_command]))
+            popen = (time.perf_counter() - start) / spawns * 1_000_000
+            for process in processes:
+                process.wait()
+            print(f"  {'Popen(true), для сравнения':<40} {popen:>10.1f} мкс")
+        data_manager.close()
+
+
+PREWARM_SCRIPT = """\
+import asyncio
+import decimal
+import email.mime.multipart
+import http.client
+import unittest
+import xml.dom.minidom
+print("ready", flush=True)
+"""
+
+
+def bench_prewarm(runs=5, warmup_seconds=2.0):
+    """
+    Задержка от клика до первой строки вывода Python-программы:
+    обычный запуск интерпретатора против заготовки prewarm с уже импортированными модулями.
+    """
+    import subprocess
+    import statistics
+
+    from prewarm import WarmWorker
+
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "heavy_script.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(PREWARM_SCRIPT)
+
+        cold = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE)
+            process.stdout.readline()
+            cold.append((time.perf_counter() - start) * 1000)
+            process.wait()
+            process.stdout.close()
+
+        warm = []
+        for _ in range(runs):
+            worker = WarmWorker(script, output=subprocess.PIPE)
+            time.sleep(warmup_seconds) # Заготовка успевает импортировать модули, как между запусками в лаунчере
+            start = time.perf_counter()
+            process = worker.start()
+            process.stdout.readline()
+            warm.append((time.perf_counter() - start) * 1000)
+            process.wait()
+            process.stdout.close()
+
+    print(f"{'запуск':<10} | {'медиана, мс':>11} | {'лучший, мс':>10}")
+    for label, times in (("обычный", cold), ("теплый", warm)):
+        print(f"{label:<10} | {statistics.median(times):>11.1f} | {min(times):>10.1f}")
+
+
+def bench_sqlite(count=100000, categories=100, query="studio 0004"):
+    """SQLite против DataManager в памяти: старт, список категории с сортировкой, поиск."""
+    from data_manager import DataManager
+    from sqlite_data_manager import SqliteDataManager
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = _make_data_manager(count, categories, directory=directory).filename
+        gc.collect()
+        memory = DataManager(filename)
+        start = time.perf_counter()
+        memory.load_data()
+        memory_load = time.perf_counter() - start
+
+        database = SqliteDataManager(filename)
+        start = time.perf_counter()
+        database.load_data()
+        migration = time.perf_counter() - start
+        database.close()
+
+        database = SqliteDataManager(filename)
+        start = time.perf_counter()
+        database.load_data()
+        database_load = time.perf_counter() - start
+
+        category = "Category 0"
+        print(f"программ: {count}, категорий: {categories}, миграция из JSON: {migration * 1000:.0f} мс")
+        print(f"{'операция':<36} | {'в памяти, мс':>12} | {'SQLite, мс':>10}")
+        measurements = [
+            ("загрузка", lambda manager: None),
+            ("список категории (Имя Я-А)", lambda manager: manager.list_programs(category, "name", True)),
+            ("поиск в категории", lambda manager: manager.search_program_keys(query, manager.list_programs(category))),
+            ("нечеткий поиск 'stud 42'", lambda manager: manager.fuzzy_search("stud 42")),
+            ("get_program_data_by_path", lambda manager: manager.get_program_data_by_path(f"C:\\Program Files\\game\\game_{count - 2:06d}.exe")),
+        ]
+        for title, func in measurements:
+            timings = []
+            for manager, loaded in ((memory, memory_load), (database, database_load)):
+                if title == "загрузка":
+                    timings.append(loaded * 1000)
+                    continue
+                start = time.perf_counter()
+                func(manager)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{title:<36} | {timings[0]:>12.2f} | {timings[1]:>10.2f}")
+        database.close()
+
+
+def _write_launcher_file(directory, count, categories):
+    """Записывает синтетические данные так же, как их сохраняет DataManager (с заголовком категорий)."""
+    from data_manager import DataManager
+    from program_record import Program
+
+    data_manager = DataManager(os.path.join(directory, "launcher_data.json"), backup_count=0)
+    data_manager.data = _synthetic_data(count, categories)
+    data_manager.data["categories"] = {
+        name: [Program(program) for program in programs]
+        for name, programs in data_manager.data["categories"].items()
+    }
+    data_manager.data["last_selected_category"] = f"Category {categories // 2}"
+    data_manager.save_data()
+    data_manager.close()
+    return data_manager.filename
+
+
+def _time_to_first_paint(filename):
+    """Время от создания AppLauncher до первой отрисовки окна (нужен дисплей)."""
+    import main_app
+
+    old_cwd = os.getcwd()
+    os.chdir(os.path.dirname(filename))
+    try:
+        start = time.perf_counter()
+        root = tk.Tk()
+        app = main_app.AppLauncher(root)
+        root.update()
+        first_paint = time.perf_counter() - start
+        while app.data_manager.is_loading():
+            root.update()
+            time.sleep(0.001)
+        loaded = time.perf_counter() - start
+        app.data_manager.close()
+        app.shutdown_background_tasks()
+        root.destroy()
+        return first_paint, loaded
+    finally:
+        os.chdir(old_cwd)
+
+
+# Модули, которые main_app раньше импортировал при старте, а теперь - при первом использовании
+EAGER_IMPORTS = "PIL.Image, PIL.ImageTk, icoextract, webbrowser, shlex, concurrent.futures"
+
+
+def _time_import(statement, runs=5):
+    """Лучшее время импорта в отдельном процессе (мс): каждый запуск начинается с пустого sys.modules."""
+    import subprocess
+
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return min(times) * 1000
+
+
+def bench_startup(target_mb=50, categories=50):
+    """Время до первой отрисовки на большом файле: полная загрузка против отложенной."""
+    from data_manager import DataManager
+    from program_record import DEFAULT_FIELDS
+
+    count = int(target_mb * 1024 * 1024 / 270) # ~270 байт на программу с отступами
+    with tempfile.TemporaryDirectory() as directory:
+        filename = _write_launcher_file(directory, count, categories)
+        size_mb = os.path.getsize(filename) / (1024 * 1024)
+        print(f"файл: {size_mb:.1f} МБ, программ: {count}, категорий: {categories}")
+
+        gc.collect()
+        start = time.perf_counter()
+        with open(filename, "r", encoding="utf-8") as f:
+            legacy_data = json.load(f)
+        for programs in legacy_data["categories"].values():
+            for program in programs:
+                for field, default in DEFAULT_FIELDS:
+                    program.setdefault(field, default)
+        legacy = time.perf_counter() - start
+        del legacy_data
+
+        gc.collect()
+        start = time.perf_counter()
+        data_manager = DataManager(filename)
+        data_manager.load_data()
+        full = time.perf_counter() - start
+        data_manager.close()
+        del data_manager
+
+        gc.collect()
+        start = time.perf_counter()
+        data_manager = DataManager(filename)
+        data_manager.load_data(defer_categories=True)
+        first_paint = time.perf_counter() - start
+        while data_manager.is_loading():
+            data_manager.integrate_loaded_categories()
+        deferred_total = time.perf_counter() - start
+        data_manager.close()
+        del data_manager
+
+        print(f"  {'json.load + поля (старый load_data)':<42} {legacy * 1000:>8.0f} мс до окна")
+        print(f"  {'load_data() с индексами':<42} {full * 1000:>8.0f} мс до окна")
+        print(f"  {'load_data(defer_categories=True)':<42} {first_paint * 1000:>8.0f} мс до окна, {deferred_total * 1000:.0f} мс до полной загрузки")
+        print(f"  {'import main_app':<42} {_time_import('import main_app'):>8.0f} мс")
+        print(f"  {'import main_app + прежние импорты':<42} {_time_import(f'import main_app, {EAGER_IMPORTS}'):>8.0f} мс")
+        try:
+            gui_first_paint, gui_loaded = _time_to_first_paint(filename)
+        except tk.TclError as e:
+            print(f"  AppLauncher: пропущено ({e})")
+        else:
+            print(f"  {'AppLauncher (первая отрисовка)':<42} {gui_first_paint * 1000:>8.0f} мс, {gui_loaded * 1000:.0f} мс до полной загрузки")
+
+
+CLI_COLD_START_LIMIT_MS = 100
+CLI_COMMANDS = (
+    ("list \"Category 3\"", ["list", "Category 3"]),
+    ("--json list \"Category 3\"", ["--json", "list", "Category 3"]),
+    ("search \"studio 42\"", ["search", "studio 42"]),
+    ("search --substring 00042", ["search", "--substring", "00042"]),
+    ("search s (одна буква)", ["search", "s"]),
+)
+
+
+def _time_command(command, runs):
+    """Лучшее и медианное время работы команды в отдельном процессе (мс), от запуска до выхода."""
+    import subprocess
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=directory, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[0] * 1000, times[len(times) // 2] * 1000
+
+
+def bench_cli(count=10000, categories=20, runs=15):
+    """Холодный запуск python -m launcher_cli: весь процесс, от запуска интерпретатора до выхода."""
+    import subprocess
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    code = "import sys, launcher_cli; print(sorted({m.split('.')[0] for m in sys.modules} & {'tkinter', 'PIL'}))"
+    heavy = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout.strip()
+    print(f"tkinter/PIL после import launcher_cli: {heavy}")
+    baseline, _ = _time_command([sys.executable, "-c", "pass"], runs)
+    print(f"пустой процесс Python: {baseline:.0f} мс; предел холодного запуска: {CLI_COLD_START_LIMIT_MS} мс")
+    with tempfile.TemporaryDirectory() as data_directory:
+        filename = _write_launcher_file(data_directory, count, categories)
+        print(f"программ: {count}, категорий: {categories}")
+        print(f"{'Команда':<36} | {'лучшее, мс':>10} | {'медиана, мс':>11}")
+        for title, arguments in CLI_COMMANDS:
+            best, median = _time_command([sys.executable, "-m", "launcher_cli", "--data", filename, *arguments], runs)
+            mark = "" if median <= CLI_COLD_START_LIMIT_MS else "  > предела"
+            print(f"{title:<36} | {best:>10.1f} | {median:>11.1f}{mark}")
+
+
+def _latency_summary(times):
+    times = sorted(times)
+    mean = sum(times) / len(times)
+    return f"среднее {mean * 1000:.3f} мс, p50 {times[len(times) // 2] * 1000:.3f} мс, p99 {times[int(len(times) * 0.99)] * 1000:.3f} мс"
+
+
+def bench_service(count=10000, categories=20, calls=1000, runs=9):
+    """Задержка запросов к службе лаунчера (python -m launcher_service) и тонкий клиент против холодного запуска."""
+    import subprocess
+
+    from launcher_service import ServiceClient, connect_service, service_address
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as data_directory:
+        filename = _write_launcher_file(data_directory, count, categories)
+        start = time.perf_counter()
+        daemon = subprocess.Popen([sys.executable, "-m", "launcher_service", "--data", filename], cwd=directory,
+                                  stdout=subprocess.DEVNULL)
+        try:
+            client = None
+            while client is None:
+                if daemon.poll() is not None or time.perf_counter() - start > 30:
+                    print("служба не запустилась")
+                    return
+                time.sleep(0.01)
+                client = connect_service(filename)
+            print(f"программ: {count}; служба готова через {(time.perf_counter() - start) * 1000:.0f} мс после запуска")
+            with client:
+                for title, op, params in (("ping", "ping", {}),
+                                          ("search \"studio 42\"", "command", {"argv": ["search", "studio 42"]}),
+                                          ("search s (одна буква)", "command", {"argv": ["search", "s"]})):
+                    times = []
+                    for _ in range(calls if op == "ping" else calls // 10):
+                        call_start = time.perf_counter()
+                        client.request(op, **params)
+                        times.append(time.perf_counter() - call_start)
+                    print(f"  {title:<34} {_latency_summary(times)}")
+            times = []
+            address = service_address(filename)
+            for _ in range(calls // 10):
+                call_start = time.perf_counter()
+                with ServiceClient(address) as fresh:
+                    fresh.request("ping")
+                times.append(time.perf_counter() - call_start)
+            print(f"  {'новое соединение + ping':<34} {_latency_summary(times)}")
+            for title, extra in (("launcher_cli через службу", []), ("launcher_cli --local", ["--local"])):
+                best, median = _time_command([sys.executable, "-m", "launcher_cli", "--data", filename, *extra,
+                                              "search", "studio 42"], runs)
+                print(f"  {title:<34} лучшее {best:.1f} мс, медиана {median:.1f} мс (процесс целиком)")
+            with connect_service(filename) as client:
+                client.request("shutdown")
+            daemon.wait(timeout=10)
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+
+
+PALETTE_QUERIES = ("studio", "viewer 12", "game 42", "ofcmgr", "e0")
+PALETTE_BUDGET_MS = 50 # От нажатия клавиши до результатов в окне быстрого запуска
+
+
+def bench_palette(count=20000, categories=20, queries=PALETTE_QUERIES):
+    """Быстрый запуск: задержка каждого нажатия при наборе запросов по одной букве (сессия поиска и окно Tk)."""
+    data_manager = _make_data_manager(count, categories)
+    gc.collect()
+    print(f"программ: {count}, бюджет на нажатие: {PALETTE_BUDGET_MS} мс")
+    print(f"{'запрос':<14} | {'без сессии, макс. мс':>20} | {'сессия, макс. мс':>16} | {'сессия, среднее мс':>18}")
+    for query in queries:
+        plain = []
+        timed = []
+        session = data_manager.fuzzy_session()
+        for length in range(1, len(query) + 1):
+            prefix = query[:length]
+            start = time.perf_counter()
+            data_manager.fuzzy_search(prefix, 12)
+            plain.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            data_manager.fuzzy_search(prefix, 12, session=session)
+            timed.append((time.perf_counter() - start) * 1000)
+        mark = "" if max(timed) <= PALETTE_BUDGET_MS else "  (больше бюджета)"
+        print(f"{query!r:<14} | {max(plain):>20.1f} | {max(timed):>16.1f} | {sum(timed) / len(timed):>18.1f}{mark}")
+
+    from quick_launcher import QuickLauncher
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"окно Tk не создано ({e}), замер с отрисовкой пропущен")
+        return
+    try:
+        palette = QuickLauncher(root, data_manager, lambda program: None)
+        start = time.perf_counter()
+        palette.show()
+        root.update()
+        print(f"открытие окна: {(time.perf_counter() - start) * 1000:.1f} мс")
+        for query in queries:
+            latencies = []
+            palette.show()
+            for ch in query:
+                palette.entry.insert(tk.END, ch)
+                root.update()
+                latencies.append(palette.last_latency * 1000)
+            print(f"  {query!r:<14} нажатие -> список: макс. {max(latencies):.1f} мс, среднее {sum(latencies) / len(latencies):.1f} мс")
+    finally:
+        root.destroy()
+
+
+def _traced_memory(build):
+    """Вызывает build() под tracemalloc; возвращает (результат, байт, удерживаемых результатом)."""
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, retained
+
+
+def bench_memory(count=100000, favorites=1000):
+    """Память на программы (tracemalloc): словари из json.load против записей Program."""
+    from data_manager import DataManager
+    from program_record import Program
+
+    data = _synthetic_data(count)
+    data["favorites"] = [dict(program) for program in data["categories"]["Category 0"][:favorites]]
+    text = json.dumps(data, ensure_ascii=False)
+    del data
+
+    def as_records():
+        loaded = json.loads(text)
+        categories = {name: [Program(program) for program in programs] for name, programs in loaded["categories"].items()}
+        by_path = {program.path: program for programs in categories.values() for program in programs}
+        favorite_records = []
+        for favorite in loaded["favorites"]:
+            favorite = Program(favorite)
+            shared = by_path.get(favorite.path)
+            favorite_records.append(shared if shared is not None and shared.same_fields(favorite) else favorite)
+        return categories, favorite_records
+
+    def load_data_manager(filename):
+        data_manager = DataManager(filename, backup_count=0)
+        data_manager.load_data()
+        return data_manager
+
+    def report(label, retained):
+        print(f"  {label:<38} {retained / (1024 * 1024) * 100000 / count:>8.1f} МБ на 100 тыс. ({retained / count:.0f} байт на программу)")
+
+    print(f"программ: {count}, из них в избранном: {favorites}")
+    dicts, retained = _traced_memory(lambda: json.loads(text))
+    report("словари (json.load)", retained)
+    del dicts
+    records, retained = _traced_memory(as_records)
+    report("записи Program", retained)
+    del records
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "launcher_data.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(text)
+        data_manager, retained = _traced_memory(lambda: load_data_manager(filename))
+        report("DataManager.load_data() с индексами", retained)
+        data_manager.close()
+
+
+BENCHMARKS = {
+    "cli": bench_cli,
+    "datamanager": bench_datamanager,
+    "fuzzy": bench_fuzzy,
+    "history": bench_history,
+    "launch": bench_launch,
+    "memory": bench_memory,
+    "palette": bench_palette,
+    "prewarm": bench_prewarm,
+    "render": bench_render,
+    "search": bench_search,
+    "service": bench_service,
+    "sqlite": bench_sqlite,
+    "startup": bench_startup,
+    "storage": bench_storage,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности лаунчера")
+    parser.add_argument("names", nargs="*", help=f"какие замеры запустить: {', '.join(sorted(BENCHMARKS))} (по умолчанию все)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"неизвестные замеры: {', '.join(unknown)}")
+    for name in args.names or sorted(BENCHMARKS):
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
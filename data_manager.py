@@ -1,60 +1,646 @@
-import json
+import functools
+import itertools
+import math
 import os
+import queue
+import threading
+
+from launch_history import LaunchHistory, history_path_for
+from program_launcher import LaunchError, LaunchPlanCache
+from program_record import Program
+from search_index import FuzzySearchSession, SearchIndex
+from storage import (
+    DEFAULT_BACKUP_COUNT, DEFAULT_SAVE_DELAY, DEFAULT_STORAGE, STORAGE_ENV_VAR,
+    create_storage
+)
+
+FREQUENT_LAUNCH_BOOST = 6
+FAVORITES_CATEGORY = "Избранное" # Псевдо-категория списка избранного в интерфейсе
+RECENT_CATEGORY = "Недавние" # Псевдо-категория последних запущенных программ
+RECENT_LIMIT = 30 # Сколько программ показывается в RECENT_CATEGORY
+CATEGORY_NAMES_KEY = "category_names" # Заголовок файла: имена категорий для быстрого старта
+LOAD_BATCH_PROGRAMS = 500 # Сколько программ фоновой загрузки индексируется за один вызов
+
+# Ключи сортировки списка программ: поле -> функция ключа
+SORT_KEYS = {
+    "name": lambda program: (program.get('name') or '').lower(),
+    "type": lambda program: ((program.get('type') or '').lower(), (program.get('name') or '').lower()),
+}
+# Сортировки по истории запусков (см. LaunchHistory.scores): большая оценка - выше в списке
+SCORED_SORT_KEYS = frozenset({"frecency", "recent"})
+
+
+def sort_programs(programs, sort_by=None, descending=False, scores=None):
+    """
+    Сортирует список программ на месте по ключу из SORT_KEYS (None - порядок добавления).
+    Для ключей из SCORED_SORT_KEYS нужны scores - словарь путь -> оценка;
+    программы без оценки идут после остальных, при равных оценках - по имени.
+    """
+    if sort_by in SCORED_SORT_KEYS:
+        scores = scores or {}
+        name_key = SORT_KEYS["name"]
+        programs.sort(key=lambda program: (-scores.get(program.get('path'), 0), name_key(program)), reverse=descending)
+        return programs
+    key = SORT_KEYS.get(sort_by)
+    if key is not None:
+        programs.sort(key=key, reverse=descending)
+    return programs
+
+
+def ordered_categories(loaded_data):
+    """
+    Категории прочитанного файла данных в порядке заголовка CATEGORY_NAMES_KEY
+    (в самом объекте "categories" последняя выбранная категория записана первой).
+    Без заголовка или при несовпадении с ним - в порядке файла.
+    """
+    categories = loaded_data.get("categories", {})
+    names = loaded_data.get(CATEGORY_NAMES_KEY)
+    if not isinstance(names, list) or len(names) != len(categories) or not all(name in categories for name in names):
+        return categories
+    return {name: categories[name] for name in names}
+
+# Методы-изменения, которые записываются в журнал хранилища и повторяются при загрузке
+JOURNALED_OPERATIONS = frozenset({
+    "add_category", "rename_category", "delete_category",
+    "add_program", "add_programs", "update_program_details", "delete_program",
+    "add_favorite", "remove_favorite", "update_program_details_with_full_data",
+    "set_last_selected_category", "set_window_geometry", "record_launch",
+    "set_launch_profiles",
+})
 
 class DataManager:
-    def __init__(self, filename="launcher_data.json"):
+    def __init__(self, filename="launcher_data.json", save_delay=DEFAULT_SAVE_DELAY, backup_count=DEFAULT_BACKUP_COUNT, storage=None,
+                 defer_search_index=False):
+        """
+        storage - имя хранилища ("json", "journal") или готовый объект хранилища;
+        по умолчанию выбирается переменной окружения LAUNCHER_STORAGE (см. storage.create_storage).
+        defer_search_index - не строить поисковый индекс при загрузке (см. SearchIndex.rebuild),
+        а индексы записей категорий по путям и именам - до первого обращения к ним:
+        для коротких сеансов с одним запросом, например из командной строки.
+        """
         self.filename = filename
+        if storage is None or isinstance(storage, str):
+            storage = create_storage(filename, storage, backup_count=backup_count, save_delay=save_delay)
+        self.storage = storage
+        self._replaying = False
         self.data = {
             "categories": {},
             "last_selected_category": None,
             "window_geometry": "1000x600",
-            "favorites": [] 
+            "favorites": [],
+            "launch_counts": {}
         }
         self.current_category_name = None
+        self.search_index = SearchIndex()
+        self.defer_search_index = defer_search_index
+        self.launch_history = LaunchHistory(history_path_for(filename))
+        self.launch_plans = LaunchPlanCache() # Планы запуска по пути, сбрасываются при правке записи
 
-    def load_data(self):
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    loaded_data = json.load(f)
-                    
-                    # Инициализируем отсутствующие ключи с значениями по умолчанию
-                    self.data["categories"] = loaded_data.get("categories", {})
-                    self.data["last_selected_category"] = loaded_data.get("last_selected_category", None)
-                    self.data["window_geometry"] = loaded_data.get("window_geometry", "1000x600")
-                    self.data["favorites"] = loaded_data.get("favorites", []) 
-                    
-                    # Обеспечиваем наличие всех полей для существующих программ
-                    for category, programs in self.data["categories"].items():
-                        for program in programs:
-                            self._ensure_program_fields(program)
-                    for program in self.data["favorites"]:
-                        self._ensure_program_fields(program)
-
-            except json.JSONDecodeError:
+        # Вторичные индексы для поиска за O(1); поддерживаются при каждом изменении данных
+        # Списки, а не одиночные записи: импорт и правка могут создать дубликаты
+        self._programs_by_path = {} # путь -> [записи в категориях]
+        self._programs_by_category_path = {} # (категория, путь) -> [записи]
+        self._programs_by_category_name = {} # (категория, имя) -> [записи]
+        self._category_by_key = {} # ключ записи (program_key) -> категория
+        self._favorites_by_path = {} # путь -> [записи в избранном]
+        self._unindexed_categories = [] # (категория, записи) для отложенных индексов (см. _rebuild_indexes)
+
+        # Отложенная загрузка: категории разбираются в фоновом потоке и забираются
+        # в данные и индексы через integrate_loaded_categories
+        self._pending_categories = set()
+        self._loaded_categories = None # queue.Queue с (имя, программы)
+        self._integrating = None # [имя, программы, сколько уже проиндексировано]
+        self._save_after_load = False
+
+    def load_data(self, defer_categories=False):
+        """
+        Загружает данные из хранилища. При defer_categories сразу читаются только
+        настройки, избранное, имена категорий и последняя выбранная категория,
+        а остальные категории разбираются в фоне (см. integrate_loaded_categories).
+        """
+        if defer_categories and self._load_data_deferred():
+            return
+        try:
+            loaded_data, source = self.storage.load()
+        except Exception as e:
+            print(f"Неожиданная ошибка при загрузке данных: {e}")
+            loaded_data, source = None, None
+
+        if loaded_data is None:
+            if os.path.exists(self.filename):
+                # Файл есть, но ни он, ни резервные копии не читаются - откладываем его в сторону,
+                # чтобы следующее сохранение не вытеснило его в резервные копии
                 print(f"Ошибка чтения JSON из {self.filename}. Создан новый пустой файл.")
-                self.data = {"categories": {}, "last_selected_category": None, "window_geometry": "1000x600", "favorites": []}
-            except Exception as e:
-                print(f"Неожиданная ошибка при загрузке данных: {e}")
-                self.data = {"categories": {}, "last_selected_category": None, "window_geometry": "1000x600", "favorites": []}
+                self._set_aside_corrupt_file()
+            self.data = {"categories": {}, "last_selected_category": None, "window_geometry": "1000x600", "favorites": [], "launch_counts": {}}
+            self._rebuild_indexes()
+            self._replay_journal()
+            try:
+                self.save_data()
+            except OSError as e:
+                print(f"Ошибка при сохранении данных: {e}") # Данные в памяти есть, запись повторится при изменении
+            return
+
+        if source != self.filename:
+            print(f"Файл {self.filename} поврежден или отсутствует. Данные восстановлены из резервной копии {source}.")
+            self._set_aside_corrupt_file()
+
+        try:
+            # Инициализируем отсутствующие ключи с значениями по умолчанию;
+            # словари программ превращаются в компактные записи (поля по умолчанию - там же)
+            self.data["categories"] = {
+                name: [Program(program) for program in programs]
+                for name, programs in ordered_categories(loaded_data).items()
+            }
+            self.data["last_selected_category"] = loaded_data.get("last_selected_category", None)
+            self.data["window_geometry"] = loaded_data.get("window_geometry", "1000x600")
+            self.data["favorites"] = [Program(program) for program in loaded_data.get("favorites", [])]
+            self.data["launch_counts"] = loaded_data.get("launch_counts", {})
+        except Exception as e:
+            print(f"Неожиданная ошибка при загрузке данных: {e}")
+            self.data = {"categories": {}, "last_selected_category": None, "window_geometry": "1000x600", "favorites": [], "launch_counts": {}}
+        self._rebuild_indexes()
+        self._share_favorite_records()
+        self._replay_journal()
+
+    def _load_data_deferred(self):
+        """
+        Быстрый старт: читает порциями начало файла до "categories" и, если в нем есть
+        заголовок с именами категорий, запускает фоновый разбор категорий - фоновый
+        поток дочитывает тот же открытый файл. Возвращает False, если нужна обычная
+        полная загрузка.
+        """
+        try:
+            head = self.storage.load_head("categories")
+        except (OSError, ValueError) as e:
+            print(f"Быстрая загрузка недоступна, файл будет прочитан целиком: {e}")
+            return False
+        if head is None:
+            return False
+        loaded_data, reader = head
+        category_names = loaded_data.get(CATEGORY_NAMES_KEY)
+        if reader is None:
+            return False
+        if not isinstance(category_names, list):
+            reader.file.close()
+            return False
+
+        # Последняя выбранная категория записана первой (см. _snapshot) - ее читаем сразу,
+        # чтобы показать вместе с окном; остальные категории дочитывает фоновый поток
+        last_category = loaded_data.get("last_selected_category", None)
+        early_programs = None
+        try:
+            names = reader.iter_object()
+            name = next(names, None)
+            if name is not None and name == last_category and name in category_names:
+                early_programs = [Program(program) for program in reader.iter_array()]
+                name = next(names, None)
+        except (OSError, ValueError) as e:
+            reader.file.close()
+            print(f"Быстрая загрузка недоступна, файл будет прочитан целиком: {e}")
+            return False
+
+        self.data = {
+            "categories": {name: [] for name in category_names},
+            "last_selected_category": last_category,
+            "window_geometry": loaded_data.get("window_geometry", "1000x600"),
+            "favorites": [Program(program) for program in loaded_data.get("favorites", [])],
+            "launch_counts": loaded_data.get("launch_counts", {})
+        }
+        self._pending_categories = set(self.data["categories"])
+        if early_programs is not None:
+            self.data["categories"][last_category] = early_programs
+            self._pending_categories.discard(last_category)
+        self._rebuild_indexes()
+        self._share_favorite_records()
+
+        if self._pending_categories:
+            self._loaded_categories = queue.Queue()
+            threading.Thread(
+                target=self._parse_categories, args=(reader, names, name),
+                name="launcher-load", daemon=True
+            ).start()
         else:
-            self.save_data()
+            reader.file.close()
+        return True
+
+    def _parse_categories(self, reader, names, name):
+        """
+        Фоновый поток: дочитывает категории из открытого файла по одной, начиная
+        с уже прочитанного ключа name, и передает их через очередь.
+        """
+        try:
+            with reader.file:
+                while name is not None:
+                    self._loaded_categories.put((name, [Program(program) for program in reader.iter_array()]))
+                    name = next(names, None)
+        except Exception as e:
+            self._loaded_categories.put((None, e))
+            return
+        self._loaded_categories.put(None)
+
+    def is_loading(self):
+        """True, пока часть категорий еще загружается в фоне."""
+        return bool(self._pending_categories)
+
+    def integrate_loaded_categories(self, max_programs=LOAD_BATCH_PROGRAMS):
+        """
+        Переносит разобранные в фоне категории в данные и индексы, не более
+        max_programs программ за вызов (None - дождаться и перенести все).
+        Вызывается из потока интерфейса. Возвращает имена категорий,
+        загрузка которых завершилась.
+        """
+        finished = []
+        budget = max_programs
+        while self._pending_categories and (budget is None or budget > 0):
+            if self._integrating is None:
+                try:
+                    item = self._loaded_categories.get(block=budget is None)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Категории из заголовка, которых нет в файле, остаются пустыми
+                    finished.extend(self._pending_categories)
+                    self._pending_categories.clear()
+                    break
+                name, programs = item
+                if name is None:
+                    return self._reload_after_stream_error(programs)
+                if name not in self._pending_categories or not isinstance(programs, list):
+                    continue
+                self._integrating = [name, programs, 0]
+
+            name, programs, start = self._integrating
+            end = len(programs) if budget is None else min(len(programs), start + budget)
+            chunk = programs[start:end]
+            for program in chunk:
+                self._index_program(name, program)
+            self.search_index.add_many(chunk)
+            if self._favorites_by_path:
+                for program in chunk:
+                    if program.get('path') in self._favorites_by_path:
+                        self._share_favorite_record(program)
+            if budget is not None:
+                budget -= end - start
+            if end < len(programs):
+                self._integrating[2] = end
+                continue
+            self._integrating = None
+            self.data["categories"][name] = programs
+            self._pending_categories.discard(name)
+            finished.append(name)
+
+        if not self._pending_categories:
+            self._loaded_categories = None
+            if self._save_after_load:
+                self._save_after_load = False
+                self.schedule_save()
+        return finished
+
+    def _reload_after_stream_error(self, error):
+        """Фоновый разбор не удался - читаем файл (или резервную копию) целиком."""
+        print(f"Ошибка фоновой загрузки данных: {error}. Данные будут загружены заново.")
+        pending = list(self._pending_categories)
+        self._pending_categories.clear()
+        self._loaded_categories = None
+        self._integrating = None
+        self.load_data()
+        return pending
+
+    def _finish_loading(self):
+        """Дожидается фоновой загрузки: нужен перед операциями над всеми данными."""
+        if self._pending_categories:
+            self.integrate_loaded_categories(max_programs=None)
+
+    def _replay_journal(self):
+        """Повторяет изменения из журнала хранилища, сделанные после снимка."""
+        self._replaying = True
+        try:
+            self.storage.replay(self._apply_journal_record)
+        finally:
+            self._replaying = False
+
+    def _apply_journal_record(self, operation, args):
+        if operation not in JOURNALED_OPERATIONS:
+            raise ValueError(f"неизвестная операция {operation!r}")
+        if operation == "add_favorite":
+            # В живой сессии избранное - та же запись, что и в категории
+            program = self._first_in_index(self._programs_by_path, args[0].get('path'))
+            args = [program if program is not None else Program(args[0])]
+        getattr(self, operation)(*args)
+
+    def _journal(self, operation, *args):
+        """Передает успешное изменение в журнал хранилища (при повторе журнала - нет)."""
+        if not self._replaying:
+            self.storage.record(operation, list(args))
+
+    def _set_aside_corrupt_file(self):
+        if os.path.exists(self.filename):
+            try:
+                os.replace(self.filename, self.filename + ".corrupt")
+            except OSError as e:
+                print(f"Не удалось переименовать поврежденный файл {self.filename}: {e}")
 
     def save_data(self):
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=4, ensure_ascii=False)
-
-    def _ensure_program_fields(self, program):
-        """Гарантирует, что у словаря программы есть все необходимые поля."""
-        if "note" not in program:
-            program["note"] = ""
-        if "arguments" not in program:
-            program["arguments"] = ""
-        if "working_directory" not in program:
-            program["working_directory"] = ""
-        if "type" not in program: # На случай, если старые записи не имели типа
-            program["type"] = "exe" # По умолчанию
-        return program
+        """Синхронно и атомарно сохраняет полный снимок данных (отменяет отложенное сохранение)."""
+        self._finish_loading()
+        self.storage.save(self._snapshot)
+
+    def schedule_save(self):
+        """
+        Планирует сохранение в фоне: серия изменений подряд дает одну запись
+        после короткой паузы. Снимок данных берется сразу, поэтому дальнейшие
+        изменения в памяти не мешают фоновой записи.
+        Журнальное хранилище вместо этого дописывает только сами изменения.
+        Во время фоновой загрузки сохранение откладывается до ее окончания.
+        """
+        if self._pending_categories:
+            self._save_after_load = True
+            return
+        self.storage.schedule_save(self._snapshot)
+
+    def close(self):
+        """
+        Дописывает отложенные сохранения и останавливает фоновые потоки записи.
+        Ошибка записи передается вызывающему; история запусков тогда остается
+        открытой, чтобы закрытие можно было повторить.
+        """
+        self.storage.close()
+        self.launch_history.close()
+
+    def _snapshot(self):
+        """
+        Копия данных для записи: записи программ превращаются в словари, строки разделяются.
+        Категории идут последними, а перед ними - заголовок с их именами,
+        чтобы быстрый старт мог прочитать начало файла без самих категорий.
+        Последняя выбранная категория записывается первой: быстрый старт показывает
+        ее, не дочитывая файл, а порядок категорий восстанавливается по заголовку.
+        """
+        snapshot = {key: value for key, value in self.data.items() if key != "categories"}
+        snapshot["favorites"] = [program.to_dict() for program in self.data["favorites"]]
+        snapshot["launch_counts"] = dict(self.data.get("launch_counts", {}))
+        snapshot[CATEGORY_NAMES_KEY] = list(self.data["categories"])
+        names = snapshot[CATEGORY_NAMES_KEY]
+        last_category = self.data.get("last_selected_category")
+        if last_category in self.data["categories"]:
+            names = [last_category] + [name for name in names if name != last_category]
+        snapshot["categories"] = {
+            name: [program.to_dict() for program in self.data["categories"][name]]
+            for name in names
+        }
+        return snapshot
+
+    def _rebuild_indexes(self):
+        """
+        Полностью перестраивает вторичные и поисковый индексы по категориям и избранному.
+        При defer_search_index индексы записей категорий по путям и именам строятся
+        при первом обращении (см. _index_categories).
+        """
+        self._category_by_key = {}
+        self._favorites_by_path = {}
+        self.launch_plans.clear()
+        key = SearchIndex.key
+        for category_name, programs in self.data["categories"].items():
+            self._category_by_key.update(zip(map(key, programs), itertools.repeat(category_name)))
+        # Копии списков: записи, добавленные в категории позже, индексируются сами (_index_program)
+        self._unindexed_categories = [(name, list(programs)) for name, programs in self.data["categories"].items()]
+        for name in ("_programs_by_path", "_programs_by_category_path", "_programs_by_category_name"):
+            self.__dict__.pop(name, None)
+        if not self.defer_search_index:
+            self._index_categories()
+        for program in self.data["favorites"]:
+            self._favorites_by_path.setdefault(program.get('path'), []).append(program)
+
+        all_programs = [program for programs in self.data["categories"].values() for program in programs]
+        all_programs.extend(self.data["favorites"])
+        self.search_index.rebuild(all_programs, defer=self.defer_search_index)
+
+    def _index_categories(self):
+        """
+        Строит индексы записей категорий по путям и именам по спискам, запомненным
+        _rebuild_indexes. Возвращает словарь индексов по именам атрибутов.
+        """
+        by_path = {}
+        by_category_path = {}
+        by_category_name = {}
+        # То же, что _index_program, но без сброса планов запуска (кэш очищен при перестроении)
+        # и без поиска атрибутов на каждой записи: это заметная часть загрузки большой библиотеки
+        for category_name, programs in self._unindexed_categories:
+            for program in programs:
+                path = program.get('path')
+                by_path.setdefault(path, []).append(program)
+                by_category_path.setdefault((category_name, path), []).append(program)
+                by_category_name.setdefault((category_name, program.get('name')), []).append(program)
+        self._unindexed_categories = []
+        indexes = {
+            "_programs_by_path": by_path,
+            "_programs_by_category_path": by_category_path,
+            "_programs_by_category_name": by_category_name,
+        }
+        self.__dict__.update(indexes)
+        return indexes
+
+    # Отложенные индексы (см. _rebuild_indexes): пока их нет в атрибутах экземпляра,
+    # первое обращение к любому из них строит все три
+    @functools.cached_property
+    def _programs_by_path(self):
+        return self._index_categories()["_programs_by_path"]
+
+    @functools.cached_property
+    def _programs_by_category_path(self):
+        return self._index_categories()["_programs_by_category_path"]
+
+    @functools.cached_property
+    def _programs_by_category_name(self):
+        return self._index_categories()["_programs_by_category_name"]
+
+    def _share_favorite_records(self):
+        """Связывает избранное с первыми записями категорий с тем же путем (см. _share_favorite_record)."""
+        if not self._favorites_by_path:
+            return
+        # Просмотр категорий, а не _programs_by_path: он может быть еще не построен
+        first_by_path = {}
+        for programs in self.data["categories"].values():
+            for program in programs:
+                path = program.get('path')
+                if path in self._favorites_by_path and path not in first_by_path:
+                    first_by_path[path] = program
+        for program in first_by_path.values():
+            self._share_favorite_record(program)
+
+    def _share_favorite_record(self, program):
+        """
+        В файле избранное хранится отдельными копиями записей. Если копия совпадает
+        с записью категории, в избранное кладется сама запись категории - как после
+        add_favorite в живой сессии, - и копия перестает занимать память.
+        """
+        favorites = self._favorites_by_path.get(program.get('path'), [])
+        for i, favorite in enumerate(favorites):
+            if favorite is program or not favorite.same_fields(program):
+                continue
+            favorites[i] = program
+            self.data["favorites"] = [program if p is favorite else p for p in self.data["favorites"]]
+            self.search_index.remove(favorite)
+            self.search_index.add(program)
+
+    def _index_program(self, category_name, program):
+        """Добавляет запись категории во вторичные индексы (без поискового индекса)."""
+        path = program.get('path')
+        self.launch_plans.invalidate(path) # Запись с этим путем могла стать первой в get_program_data_by_path
+        self._programs_by_path.setdefault(path, []).append(program)
+        self._programs_by_category_path.setdefault((category_name, path), []).append(program)
+        self._programs_by_category_name.setdefault((category_name, program.get('name')), []).append(program)
+        self._category_by_key[self.program_key(program)] = category_name
+
+    def _unindex_program(self, category_name, program):
+        """Удаляет запись категории из вторичных индексов (без поискового индекса)."""
+        path = program.get('path')
+        self.launch_plans.invalidate(path)
+        self._discard_from_index(self._programs_by_path, path, program)
+        self._discard_from_index(self._programs_by_category_path, (category_name, path), program)
+        self._discard_from_index(self._programs_by_category_name, (category_name, program.get('name')), program)
+        self._category_by_key.pop(self.program_key(program), None)
+
+    @staticmethod
+    def _discard_from_index(index, key, program):
+        programs = index.get(key)
+        if programs is None:
+            return
+        programs[:] = [p for p in programs if p is not program]
+        if not programs:
+            del index[key]
+
+    @staticmethod
+    def _first_in_index(index, key):
+        programs = index.get(key)
+        return programs[0] if programs else None
+
+    def search_program_keys(self, query, programs=None):
+        """
+        Возвращает множество ключей (см. program_key) программ, у которых query
+        встречается в имени, заметке, аргументах или пути.
+        programs ограничивает поиск переданным списком (например, текущей категорией).
+        """
+        if programs is None:
+            self._finish_loading()
+        return self.search_index.search_keys(query, programs)
+
+    def search_programs(self, query, programs=None):
+        """Возвращает список программ, подходящих под query (см. search_program_keys)."""
+        if programs is None:
+            self._finish_loading()
+        return self.search_index.search(query, programs)
+
+    def fuzzy_session(self):
+        """Сессия поиска по мере набора для fuzzy_search(session=...) (см. FuzzySearchSession)."""
+        return FuzzySearchSession(self.search_index)
+
+    def fuzzy_search(self, query, limit=50, session=None):
+        """
+        Нечеткий поиск сразу по всем категориям и избранному.
+        Возвращает до limit кортежей (оценка, программа, категория), лучшие первыми.
+        Часто запускаемые программы получают прибавку к оценке.
+        Одна и та же программа (по пути) возвращается один раз.
+        session - сессия из fuzzy_session(): запрос, дописанный к предыдущему, ищется
+        только среди его совпадений.
+        """
+        self._finish_loading()
+        launch_counts = self.data.get("launch_counts", {})
+
+        def launch_boost(program):
+            count = launch_counts.get(program.get('path'), 0)
+            return FREQUENT_LAUNCH_BOOST * math.log1p(count) if count else 0
+
+        # Берем с запасом: дубликаты из избранного будут отброшены
+        searcher = session if session is not None else self.search_index
+        ranked = searcher.fuzzy_search(query, limit * 2, boost=launch_boost)
+
+        results = []
+        seen_paths = set()
+        for score, program in ranked:
+            path = program.get('path')
+            if path in seen_paths:
+                continue
+            seen_paths.add(path)
+            results.append((score, program, self._category_by_key.get(self.program_key(program), FAVORITES_CATEGORY)))
+            if len(results) >= limit:
+                break
+        return results
+
+    def record_launch(self, program_path, arguments=""):
+        """
+        Учитывает запуск программы (для ранжирования в поиске) и добавляет его в историю.
+        Возвращает запись истории (launch_history.LaunchRecord) или None при повторе журнала.
+        """
+        launch_counts = self.data.setdefault("launch_counts", {})
+        launch_counts[program_path] = launch_counts.get(program_path, 0) + 1
+        self._journal("record_launch", program_path)
+        if self._replaying:
+            return None # История хранится отдельно и уже содержит этот запуск
+        return self.launch_history.record_launch(program_path, arguments)
+
+    def get_launch_plan(self, program_path, profile_name=None, fs=os.path):
+        """
+        План запуска программы (program_launcher.LaunchRequest) с профилем profile_name.
+        Собирается при первом запуске после загрузки или правки записи, дальше берется
+        из кэша без обращения к диску. fs - см. program_launcher.resolve_launch.
+        Ошибки - program_launcher.LaunchError.
+        """
+        plan = self.launch_plans.get(program_path, profile_name)
+        if plan is not None:
+            return plan
+        program = self.get_program_data_by_path(program_path)
+        if program is None:
+            raise LaunchError(f"Программа {program_path} не найдена в лаунчере.")
+        return self.launch_plans.build(program, profile_name, fs)
+
+    def note_file_changed(self, program_path):
+        """
+        Файл программы или ее каталог изменился на диске (см. file_watcher): сбрасывает
+        кэшированный план запуска. Возвращает True, если программа есть в лаунчере.
+        """
+        self.launch_plans.invalidate(program_path)
+        return self.get_program_data_by_path(program_path) is not None
+
+    def get_sort_scores(self, sort_by):
+        """Оценки для сортировок из SCORED_SORT_KEYS (путь -> оценка) или None для обычных."""
+        if sort_by in SCORED_SORT_KEYS:
+            return self.launch_history.scores(sort_by)
+        return None
+
+    def get_recent_programs(self, limit=RECENT_LIMIT):
+        """Последние запущенные программы, которые еще есть в лаунчере, - самые свежие первыми."""
+        programs = []
+        for path in self.launch_history.recent_paths(limit):
+            program = self.get_program_data_by_path(path)
+            if program is not None:
+                programs.append(program)
+        return programs
+
+    def get_program_category(self, program):
+        """Категория записи программы (FAVORITES_CATEGORY для записи только из избранного)."""
+        return self._category_by_key.get(self.program_key(program), FAVORITES_CATEGORY)
+
+    @staticmethod
+    def program_key(program):
+        """Ключ записи программы в поисковом индексе."""
+        return SearchIndex.key(program)
+
+    def _update_program_record(self, program, fields):
+        """
+        Обновляет поля записи, сохраняя согласованность индексов.
+        Запись избранного может быть тем же словарем, что и запись категории,
+        поэтому категория определяется по самой записи.
+        """
+        category_name = self._category_by_key.get(self.program_key(program))
+        if category_name is not None:
+            self._unindex_program(category_name, program)
+        self.launch_plans.invalidate(program.get('path'))
+        program.update(fields)
+        self.launch_plans.invalidate(program.get('path'))
+        if category_name is not None:
+            self._index_program(category_name, program)
+        self.search_index.update(program)
 
     def get_categories(self):
         return list(self.data["categories"].keys())
@@ -62,50 +648,138 @@ class DataManager:
     def add_category(self, category_name):
         if category_name not in self.data["categories"]:
             self.data["categories"][category_name] = []
+            self._journal("add_category", category_name)
             return True
         return False
 
     def rename_category(self, old_name, new_name):
+        if old_name in self._pending_categories:
+            self._finish_loading()
         if old_name in self.data["categories"] and new_name not in self.data["categories"]:
-            self.data["categories"][new_name] = self.data["categories"].pop(old_name)
+            programs = self.data["categories"].pop(old_name)
+            self.data["categories"][new_name] = programs
+            # Записи не меняются - переносим только ключи, зависящие от категории
+            for program in programs:
+                for index, field in ((self._programs_by_category_path, 'path'), (self._programs_by_category_name, 'name')):
+                    entries = index.pop((old_name, program.get(field)), None)
+                    if entries is not None:
+                        index[(new_name, program.get(field))] = entries
+                self._category_by_key[self.program_key(program)] = new_name
             if self.data["last_selected_category"] == old_name:
                 self.data["last_selected_category"] = new_name
             if self.current_category_name == old_name:
                 self.current_category_name = new_name
+            self._journal("rename_category", old_name, new_name)
             return True
         return False
 
     def delete_category(self, category_name):
+        if category_name in self._pending_categories:
+            self._finish_loading()
         if category_name in self.data["categories"]:
+            for program in self.data["categories"][category_name]:
+                self._unindex_program(category_name, program)
+                self.search_index.remove(program)
             del self.data["categories"][category_name]
             if self.data["last_selected_category"] == category_name:
                 self.data["last_selected_category"] = None
             if self.current_category_name == category_name:
                 self.current_category_name = None
+            self._journal("delete_category", category_name)
             return True
         return False
 
     def get_programs_in_category(self, category_name):
         return self.data["categories"].get(category_name, [])
 
+    def list_programs(self, category_name, sort_by=None, descending=False):
+        """
+        Возвращает новый отсортированный список программ категории
+        (FAVORITES_CATEGORY - список избранного, RECENT_CATEGORY - последние запущенные).
+        sort_by - ключ из SORT_KEYS или SCORED_SORT_KEYS.
+        """
+        if category_name == FAVORITES_CATEGORY:
+            programs = list(self.get_favorites())
+        elif category_name == RECENT_CATEGORY:
+            programs = self.get_recent_programs()
+        else:
+            programs = list(self.get_programs_in_category(category_name))
+        return sort_programs(programs, sort_by, descending, self.get_sort_scores(sort_by))
+
+    def get_all_program_paths(self):
+        """Множество путей всех программ в категориях и избранном."""
+        self._finish_loading()
+        paths = set(self._programs_by_path)
+        paths.update(self._favorites_by_path)
+        return paths
+
+    def get_launch_targets(self):
+        """
+        Пути программ и их рабочие каталоги (путь -> каталог или "") для фоновой
+        проверки путей; берутся те же записи, что вернет get_program_data_by_path.
+        Категории, которые еще грузятся в фоне, не дожидаются.
+        """
+        targets = {path: programs[0].get('working_directory') or "" for path, programs in self._favorites_by_path.items()}
+        for path, programs in self._programs_by_path.items():
+            targets[path] = programs[0].get('working_directory') or ""
+        return targets
+
     def add_program(self, category_name, program_name, program_path, program_type="exe", arguments="", working_directory=""):
+        if category_name in self._pending_categories:
+            self._finish_loading()
         if category_name in self.data["categories"]:
-            for program in self.data["categories"][category_name]:
-                if program.get('name') == program_name or program.get('path') == program_path:
-                    return False 
+            if ((category_name, program_name) in self._programs_by_category_name
+                    or (category_name, program_path) in self._programs_by_category_path):
+                return False 
             
-            new_program_data = {
+            new_program_data = Program({
                 "name": program_name,
                 "path": program_path,
                 "type": program_type,
                 "note": "",
                 "arguments": arguments,
                 "working_directory": working_directory
-            }
+            })
             self.data["categories"][category_name].append(new_program_data)
+            self._index_program(category_name, new_program_data)
+            self.search_index.add(new_program_data)
+            self._journal("add_program", category_name, program_name, program_path, program_type, arguments, working_directory)
             return True
         return False
     
+    def add_programs(self, category_name, programs):
+        """
+        Добавляет пачку программ (словари полей, см. folder_scanner) в категорию
+        одной записью журнала. Программы с занятым в категории именем или путем
+        пропускаются. Возвращает число добавленных.
+        """
+        if category_name in self._pending_categories:
+            self._finish_loading()
+        category = self.data["categories"].get(category_name)
+        if category is None:
+            return 0
+        added = []
+        for fields in programs:
+            program_name, program_path = fields.get('name'), fields.get('path')
+            if ((category_name, program_name) in self._programs_by_category_name
+                    or (category_name, program_path) in self._programs_by_category_path):
+                continue
+            new_program_data = Program({
+                "name": program_name,
+                "path": program_path,
+                "type": fields.get('type') or "exe",
+                "note": fields.get('note', ""),
+                "arguments": fields.get('arguments', ""),
+                "working_directory": fields.get('working_directory', "")
+            })
+            category.append(new_program_data)
+            self._index_program(category_name, new_program_data)
+            added.append(new_program_data)
+        if added:
+            self.search_index.add_many(added)
+            self._journal("add_programs", category_name, [program.to_dict() for program in added])
+        return len(added)
+
     def update_program_details(self, category_name, old_program_path, new_program_name, new_program_path):
         """
         Обновляет имя и/или путь к программе в указанной категории.
@@ -113,33 +787,40 @@ class DataManager:
         Он также обновит путь в избранном, если программа там есть.
         """
         program_updated = False
+        if category_name in self._pending_categories:
+            self._finish_loading()
         
         # Обновляем в текущей категории
-        if category_name in self.data["categories"]:
-            for program in self.data["categories"][category_name]:
-                if program.get('path') == old_program_path:
-                    program['name'] = new_program_name
-                    program['path'] = new_program_path
-                    program_updated = True
-                    break
+        program = self._first_in_index(self._programs_by_category_path, (category_name, old_program_path))
+        if program is not None:
+            self._update_program_record(program, {'name': new_program_name, 'path': new_program_path})
+            program_updated = True
         
         # Также обновляем в избранном, если программа там есть
-        for fav_program in self.data["favorites"]:
-            if fav_program.get('path') == old_program_path:
-                fav_program['name'] = new_program_name
-                fav_program['path'] = new_program_path
-                # Note, arguments, working_directory остаются прежними,
-                # так как они управляются update_program_details_with_full_data
+        for fav_program in self._favorites_by_path.pop(old_program_path, []):
+            self._update_program_record(fav_program, {'name': new_program_name, 'path': new_program_path})
+            self._favorites_by_path.setdefault(new_program_path, []).append(fav_program)
+            # Note, arguments, working_directory остаются прежними,
+            # так как они управляются update_program_details_with_full_data
 
+        self._journal("update_program_details", category_name, old_program_path, new_program_name, new_program_path)
         return program_updated
 
 
     def delete_program(self, category_name, program_name):
-        if category_name in self.data["categories"]:
+        if category_name in self._pending_categories:
+            self._finish_loading()
+        if (category_name, program_name) in self._programs_by_category_name:
             initial_len = len(self.data["categories"][category_name])
-            self.data["categories"][category_name] = [
-                p for p in self.data["categories"][category_name] if p.get('name') != program_name
-            ]
+            remaining = []
+            for p in self.data["categories"][category_name]:
+                if p.get('name') != program_name:
+                    remaining.append(p)
+                else:
+                    self._unindex_program(category_name, p)
+                    self.search_index.remove(p)
+            self.data["categories"][category_name] = remaining
+            self._journal("delete_program", category_name, program_name)
             return len(self.data["categories"][category_name]) < initial_len
         return False
 
@@ -150,14 +831,18 @@ class DataManager:
         return self.current_category_name
 
     def set_last_selected_category(self, category_name):
-        self.data["last_selected_category"] = category_name
+        if self.data["last_selected_category"] != category_name:
+            self.data["last_selected_category"] = category_name
+            self._journal("set_last_selected_category", category_name)
 
     def get_last_selected_category(self):
         return self.data["last_selected_category"]
 
     def set_window_geometry(self, geometry_string):
         """Сохраняет строку геометрии окна."""
-        self.data["window_geometry"] = geometry_string
+        if self.data.get("window_geometry") != geometry_string:
+            self.data["window_geometry"] = geometry_string
+            self._journal("set_window_geometry", geometry_string)
 
     def get_window_geometry(self):
         """Возвращает сохраненную строку геометрии окна."""
@@ -166,22 +851,35 @@ class DataManager:
     def add_favorite(self, program_data):
         """
         Добавляет программу в список избранных.
-        program_data должен быть полным словарем данных программы.
+        program_data - запись программы (например, из get_program_data_by_path):
+        в избранное попадает она сама, а не копия. Словарь превращается в новую запись.
         """
-        for fav_program in self.data["favorites"]:
-            if fav_program.get('path') == program_data.get('path'):
-                return False
+        if program_data.get('path') in self._favorites_by_path:
+            return False
         
-        self._ensure_program_fields(program_data) # Гарантируем наличие всех полей
+        if not isinstance(program_data, Program):
+            program_data = Program(program_data) # Заодно дополняет поля по умолчанию
         self.data["favorites"].append(program_data)
+        self._favorites_by_path[program_data.get('path')] = [program_data]
+        self.launch_plans.invalidate(program_data.get('path'))
+        self.search_index.add(program_data)
+        self._journal("add_favorite", program_data.to_dict())
         return True
 
     def remove_favorite(self, program_path):
         """Удаляет программу из списка избранных по пути."""
+        if not self._favorites_by_path.pop(program_path, None):
+            return False
+        self.launch_plans.invalidate(program_path)
         initial_len = len(self.data["favorites"])
-        self.data["favorites"] = [
-            p for p in self.data["favorites"] if p.get('path') != program_path
-        ]
+        remaining = []
+        for p in self.data["favorites"]:
+            if p.get('path') != program_path:
+                remaining.append(p)
+            else:
+                self.search_index.remove(p)
+        self.data["favorites"] = remaining
+        self._journal("remove_favorite", program_path)
         return len(self.data["favorites"]) < initial_len
 
     def get_favorites(self):
@@ -190,31 +888,33 @@ class DataManager:
     
     def is_favorite(self, program_path):
         """Проверяет, является ли программа избранной по пути."""
-        for fav_program in self.data["favorites"]:
-            if fav_program.get('path') == program_path:
-                return True
-        return False
+        return program_path in self._favorites_by_path
 
     def get_program_data_by_path(self, program_path):
         """
-        Ищет и возвращает полный словарь данных программы по ее пути
+        Ищет и возвращает запись программы (см. program_record.Program) по ее пути
         как в категориях, так и в избранном.
         Возвращает None, если программа не найдена.
         """
-        for category, programs in self.data["categories"].items():
-            for program in programs:
-                if program.get('path') == program_path:
-                    return self._ensure_program_fields(program) # Убедимся, что все поля есть
-        
-        for program in self.data["favorites"]:
-            if program.get('path') == program_path:
-                return self._ensure_program_fields(program) # Убедимся, что все поля есть
+        programs = self._programs_by_path.get(program_path)
+        if programs:
+            return programs[0]
         
+        program = self._first_in_index(self._favorites_by_path, program_path)
+        if program is not None:
+            return program
+
+        if self._pending_categories:
+            # Программа может быть в еще не загруженной категории
+            self._finish_loading()
+            return self.get_program_data_by_path(program_path)
         return None
 
-    def update_program_details_with_full_data(self, program_path, note=None, arguments=None, working_directory=None):
+    def update_program_details_with_full_data(self, program_path, note=None, arguments=None, working_directory=None,
+                                              warm=None, single_instance=None):
         """
-        Обновляет заметку, аргументы и рабочий каталог для программы, найденной по ее пути.
+        Обновляет заметку, аргументы, рабочий каталог и флаги запуска (warm - теплый запуск,
+        single_instance - один экземпляр) для программы, найденной по ее пути.
         Если соответствующее значение None, оно не обновляется.
         """
         program = self.get_program_data_by_path(program_path)
@@ -225,25 +925,95 @@ class DataManager:
                 program['arguments'] = arguments
             if working_directory is not None:
                 program['working_directory'] = working_directory
+            # Флаги хранятся, только если их хоть раз включали, - остальные записи не меняются
+            if warm is not None and (warm or 'warm' in program):
+                program['warm'] = warm
+            if single_instance is not None and (single_instance or 'single_instance' in program):
+                program['single_instance'] = single_instance
+            self.launch_plans.invalidate(program_path)
+            self.search_index.update(program)
+            self._journal("update_program_details_with_full_data", program_path, note, arguments, working_directory,
+                          warm, single_instance)
             return True
         return False
 
+    def set_launch_profiles(self, program_path, profiles, active_profile=None):
+        """
+        Заменяет профили запуска программы (список словарей, см. program_launcher.normalize_profile)
+        и профиль по умолчанию (имя или None - запуск без профиля).
+        """
+        program = self.get_program_data_by_path(program_path)
+        if not program:
+            return False
+        if profiles or 'profiles' in program:
+            program['profiles'] = [dict(profile) for profile in profiles]
+        if active_profile or 'active_profile' in program:
+            program['active_profile'] = active_profile
+        self.launch_plans.invalidate(program_path)
+        self._journal("set_launch_profiles", program_path, profiles, active_profile)
+        return True
+
     def get_all_data(self):
-        """Возвращает все сохраненные данные."""
-        return self.data
+        """Возвращает все сохраненные данные в формате launcher_data.json (программы - словарями)."""
+        self._finish_loading()
+        all_data = dict(self.data)
+        all_data["categories"] = {
+            name: [program.to_dict() for program in programs]
+            for name, programs in self.data["categories"].items()
+        }
+        all_data["favorites"] = [program.to_dict() for program in self.data["favorites"]]
+        return all_data
+
+    def get_export_settings(self):
+        """Настройки для экспорта (см. launcher_archive): последняя категория, геометрия окна, счетчики запусков."""
+        return {
+            "last_selected_category": self.data.get("last_selected_category"),
+            "window_geometry": self.data.get("window_geometry", "1000x600"),
+            "launch_counts": dict(self.data.get("launch_counts", {})),
+        }
+
+    def iter_export_programs(self, category_name):
+        """Программы категории (FAVORITES_CATEGORY - избранное) словарями по одной, в порядке хранения."""
+        self._finish_loading()
+        if category_name == FAVORITES_CATEGORY:
+            programs = self.data["favorites"]
+        else:
+            programs = self.data["categories"].get(category_name, ())
+        for program in programs:
+            yield program.to_dict()
+
+    def find_program(self, category_name, program_path):
+        """Запись программы категории с путем program_path (та, что обновит импорт) или None."""
+        if category_name in self._pending_categories:
+            self._finish_loading()
+        return self._first_in_index(self._programs_by_category_path, (category_name, program_path))
+
+    def find_favorite(self, program_path):
+        """Запись избранного с путем program_path или None."""
+        return self._first_in_index(self._favorites_by_path, program_path)
+
+    def count_programs(self):
+        """Число записей программ во всех категориях (без избранного)."""
+        self._finish_loading()
+        return sum(len(programs) for programs in self.data["categories"].values())
 
     def import_all_data(self, imported_data, strategy="merge"):
         """
         Импортирует данные из внешнего источника.
         strategy: "replace" (заменяет все текущие данные) или "merge" (объединяет данные).
         """
+        self._finish_loading()
+        # Импорт не выражается одной записью журнала - следующее сохранение запишет полный снимок
+        self.storage.mark_dirty()
         if strategy == "replace":
             self.data = {
                 "categories": {},
                 "last_selected_category": None,
                 "window_geometry": self.data["window_geometry"], # Сохраняем текущую геометрию окна
-                "favorites": []
+                "favorites": [],
+                "launch_counts": self.data.get("launch_counts", {})
             }
+            self._rebuild_indexes()
 
         # Импорт категорий
         for category_name, programs_list in imported_data.get("categories", {}).items():
@@ -251,26 +1021,46 @@ class DataManager:
                 self.data["categories"][category_name] = []
             
             for imported_program in programs_list:
-                self._ensure_program_fields(imported_program) # Убедимся, что импортированная программа имеет все поля
-                existing_program = next((p for p in self.data["categories"][category_name] if p.get('path') == imported_program.get('path')), None)
+                imported_program = Program(imported_program) # Заодно дополняет поля по умолчанию
+                existing_program = self._first_in_index(self._programs_by_category_path, (category_name, imported_program.get('path')))
                 if existing_program:
                     # Обновляем существующую программу
-                    existing_program.update(imported_program)
+                    self._update_program_record(existing_program, imported_program)
                 else:
                     self.data["categories"][category_name].append(imported_program)
+                    self._index_program(category_name, imported_program)
+                    self.search_index.add(imported_program)
 
         # Импорт избранного
         for imported_favorite in imported_data.get("favorites", []):
-            self._ensure_program_fields(imported_favorite) # Убедимся, что импортированное избранное имеет все поля
-            existing_favorite = next((f for f in self.data["favorites"] if f.get('path') == imported_favorite.get('path')), None)
+            imported_favorite = Program(imported_favorite) # Заодно дополняет поля по умолчанию
+            existing_favorite = self._first_in_index(self._favorites_by_path, imported_favorite.get('path'))
             if existing_favorite:
                 # Обновляем существующее избранное
-                existing_favorite.update(imported_favorite)
+                self._update_program_record(existing_favorite, imported_favorite)
             else:
                 self.data["favorites"].append(imported_favorite)
+                self._favorites_by_path[imported_favorite.get('path')] = [imported_favorite]
+                self.launch_plans.invalidate(imported_favorite.get('path'))
+                self.search_index.add(imported_favorite)
 
         # Обновляем last_selected_category, если он есть в импортированных данных
         if "last_selected_category" in imported_data and imported_data["last_selected_category"] in self.data["categories"]:
             self.data["last_selected_category"] = imported_data["last_selected_category"]
         elif "last_selected_category" in self.data and self.data["last_selected_category"] not in self.data["categories"]:
-             self.data["last_selected_category"] = None # Сбрасываем, если категория больше не существует
\ No newline at end of file
+             self.data["last_selected_category"] = None # Сбрасываем, если категория больше не существует
+
+
+def open_data_manager(filename="launcher_data.json", backend=None, defer_search_index=False):
+    """
+    Создает менеджер данных для выбранного хранилища: "sqlite" - база SQLite
+    рядом с filename (см. sqlite_data_manager), иначе DataManager с хранилищем
+    "json" или "journal". По умолчанию хранилище задает переменная окружения
+    LAUNCHER_STORAGE. defer_search_index - см. DataManager (SQLite ищет в самой базе).
+    """
+    if backend is None:
+        backend = os.environ.get(STORAGE_ENV_VAR, DEFAULT_STORAGE)
+    if backend == "sqlite":
+        from sqlite_data_manager import SqliteDataManager
+        return SqliteDataManager(filename)
+    return DataManager(filename, storage=backend, defer_search_index=defer_search_index)
@@ -0,0 +1,361 @@
+"""
+Слежение за файлами программ: обновленный, удаленный или перемещенный файл
+замечается сразу, а не при следующей полной перерисовке.
+
+На Linux используется inotify (через ctypes, без сторонних пакетов) - по одному
+наблюдению на каталог, в котором лежат программы. Наблюдений в системе мало
+(fs.inotify.max_user_watches), поэтому лаунчер берет не больше WATCH_SHARE от лимита,
+а если каталогов больше, объединяет соседние каталоги в наблюдение за общим
+родителем: оно замечает, что каталог программы целиком заменили, удалили или
+переименовали (так обновляются многие программы), а файлы внутри таких каталогов
+опрашиваются раз в POLL_INTERVAL секунд. На других системах и при недоступном
+inotify опрашиваются все файлы.
+
+Поток "file-watcher" только копит пути изменившихся программ;
+интерфейс забирает их через take_changes из своего потока.
+"""
+import errno
+import os
+import sys
+import threading
+import time
+
+POLL_INTERVAL = 30.0 # Как часто опрашивать файлы без наблюдения inotify, секунд
+WATCH_SHARE = 0.25 # Какую долю лимита наблюдений inotify может занять лаунчер
+MAX_WATCHES = 8192
+DEFAULT_WATCH_LIMIT = 8192 # Если лимит не удалось прочитать
+
+# Флаги inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+_ENTRY_EVENTS = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_FILE_EVENTS = _ENTRY_EVENTS | IN_ATTRIB | IN_CLOSE_WRITE
+_SELF_EVENTS = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+_EVENT_HEADER_SIZE = 16 # int wd, uint32 mask, cookie, len
+
+
+def inotify_watch_limit():
+    try:
+        with open("/proc/sys/fs/inotify/max_user_watches") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return DEFAULT_WATCH_LIMIT
+
+
+def plan_watches(directories, budget):
+    """
+    Раскладывает каталоги программ по наблюдениям не больше budget штук: пока их
+    больше, каталоги с общим родителем (самую большую группу) заменяет наблюдение
+    за родителем. Возвращает (direct, parents, polled): direct - каталоги
+    с собственным наблюдением, parents - объединяющие родители, polled - каталоги
+    программ без собственного наблюдения, файлы которых нужно опрашивать.
+    """
+    directories = set(directories)
+    watched = set(directories)
+    parents = set()
+    while len(watched) > budget:
+        children = {}
+        for directory in watched:
+            parent = os.path.dirname(directory)
+            if parent and parent != directory:
+                children.setdefault(parent, []).append(directory)
+        parent, siblings = max(children.items(), key=lambda item: len(item[1]), default=(None, []))
+        if len(siblings) < 2:
+            break # Объединять больше нечего
+        watched.difference_update(siblings)
+        parents.difference_update(siblings)
+        watched.add(parent)
+        parents.add(parent)
+    for directory in sorted(watched)[budget:]:
+        # Не поместившиеся наблюдения отбрасываются - их каталоги только опрашиваются
+        watched.discard(directory)
+        parents.discard(directory)
+    return watched - parents, parents, directories - watched
+
+
+def file_signature(path):
+    """(время изменения, размер) файла или None, если его нет или он недоступен."""
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class _Inotify:
+    """Минимальная обертка над inotify из libc."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._ctypes = ctypes
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = self._ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def remove_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """[(wd, mask, имя)] из уже пришедших событий."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER_SIZE <= len(data):
+            wd, mask, _, name_length = (int.from_bytes(data[offset + i:offset + i + 4], sys.byteorder, signed=(i == 0))
+                                        for i in (0, 4, 8, 12))
+            name = data[offset + _EVENT_HEADER_SIZE:offset + _EVENT_HEADER_SIZE + name_length].rstrip(b"\0")
+            events.append((wd, mask, os.fsdecode(name)))
+            offset += _EVENT_HEADER_SIZE + name_length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """
+    Следит за файлами программ. set_paths задает пути (из потока интерфейса),
+    take_changes возвращает пути программ, изменившихся с прошлого вызова.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, max_watches=None, use_inotify=True):
+        self.poll_interval = poll_interval
+        self.max_watches = max_watches
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.backend = None # "inotify" или "polling", известно после start
+        self._lock = threading.Lock()
+        self._paths = set()
+        self._paths_changed = False
+        self._changes = set()
+        self._closed = False
+        self._thread = None
+        self._wake_event = threading.Event()
+        self._wake_pipe = None
+        self._inotify = None
+        # Состояние потока наблюдения
+        self._by_directory = {} # каталог -> пути программ в нем
+        self._watches = {} # wd -> (каталог, объединяющий ли это родитель)
+        self._watched = {} # каталог -> wd
+        self._signatures = {} # опрашиваемый путь -> file_signature
+
+    def start(self):
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._wake_pipe = os.pipe()
+                self.backend = "inotify"
+            except (OSError, AttributeError) as e:
+                print(f"inotify недоступен ({e}), изменения файлов будут замечаться опросом.")
+                self._inotify = None
+        if self._inotify is None:
+            self.backend = "polling"
+        self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def set_paths(self, paths):
+        """Задает пути программ, за которыми нужно следить."""
+        paths = set(path for path in paths if path)
+        with self._lock:
+            if paths == self._paths:
+                return # Наблюдения уже такие, перестраивать нечего
+            self._paths = paths
+            self._paths_changed = True
+        self._wake()
+
+    def add_path(self, path):
+        """Добавляет путь программы (например, после правки записи)."""
+        with self._lock:
+            if not path or path in self._paths:
+                return
+            self._paths.add(path)
+            self._paths_changed = True
+        self._wake()
+
+    def take_changes(self):
+        """Пути программ, файлы которых изменились, появились или пропали с прошлого вызова."""
+        with self._lock:
+            changes, self._changes = self._changes, set()
+        return changes
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _wake(self):
+        if self._wake_pipe is not None:
+            try:
+                os.write(self._wake_pipe[1], b"x")
+            except OSError:
+                pass
+        self._wake_event.set()
+
+    def _report(self, paths):
+        if paths:
+            with self._lock:
+                self._changes.update(paths)
+
+    # Поток наблюдения
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        return
+                    paths = set(self._paths) if self._paths_changed else None
+                    self._paths_changed = False
+                if paths is not None:
+                    self._rebuild(paths)
+                timeout = max(0.0, next_poll - time.monotonic())
+                if self._inotify is not None:
+                    self._wait_inotify(timeout)
+                else:
+                    self._wake_event.wait(timeout)
+                    self._wake_event.clear()
+                if time.monotonic() >= next_poll:
+                    self._poll()
+                    next_poll = time.monotonic() + self.poll_interval
+        except Exception as e:
+            print(f"Ошибка слежения за файлами программ: {e}")
+        finally:
+            self._close_handles()
+
+    def _wait_inotify(self, timeout):
+        import select
+
+        readable, _, _ = select.select([self._inotify.fd, self._wake_pipe[0]], [], [], timeout)
+        if self._wake_pipe[0] in readable:
+            try:
+                os.read(self._wake_pipe[0], 4096)
+            except OSError:
+                pass
+        if self._inotify.fd in readable:
+            for wd, mask, name in self._inotify.read_events():
+                self._on_event(wd, mask, name)
+
+    def _on_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Очередь событий переполнилась - изменилось что угодно
+            self._report(path for paths in self._by_directory.values() for path in paths)
+            return
+        watch = self._watches.get(wd)
+        if watch is None:
+            return
+        directory, is_parent = watch
+        if mask & _SELF_EVENTS:
+            # Сам наблюдаемый каталог удален или перемещен - затронуто все внутри
+            self._report(self._paths_under(directory))
+            if not mask & IN_IGNORED:
+                # После переименования наблюдение осталось бы на старом каталоге (app.old),
+                # а не на новом с тем же путем
+                self._inotify.remove_watch(wd)
+            # Пока наблюдение не поставлено заново, каталоги опрашиваются
+            del self._watches[wd]
+            self._watched.pop(directory, None)
+            for path in self._paths_under(directory):
+                self._signatures.setdefault(path, file_signature(path))
+            with self._lock:
+                self._paths_changed = True # Следующий проход цикла поставит наблюдение по пути
+            return
+        full_path = os.path.join(directory, name)
+        affected = [path for path in self._by_directory.get(directory, ()) if path == full_path]
+        if is_parent:
+            affected.extend(self._paths_under(full_path)) # Заменен, удален или переименован каталог программ
+        self._report(affected)
+
+    def _paths_under(self, directory):
+        prefix = directory.rstrip(os.sep) + os.sep
+        return [path for child, paths in self._by_directory.items()
+                if child == directory or child.startswith(prefix) for path in paths]
+
+    def _rebuild(self, paths):
+        by_directory = {}
+        for path in paths:
+            by_directory.setdefault(os.path.dirname(path), set()).add(path)
+        self._by_directory = by_directory
+        if self._inotify is None:
+            polled = set(by_directory)
+            direct, parents = set(), set()
+        else:
+            limit = self.max_watches or min(MAX_WATCHES, int(inotify_watch_limit() * WATCH_SHARE))
+            direct, parents, polled = plan_watches(by_directory, max(1, limit))
+
+        wanted = {directory: False for directory in direct}
+        wanted.update((parent, True) for parent in parents)
+        for directory, wd in list(self._watched.items()):
+            if wanted.get(directory) != self._watches[wd][1]:
+                self._inotify.remove_watch(wd)
+                del self._watches[wd]
+                del self._watched[directory]
+        for directory, is_parent in wanted.items():
+            if directory in self._watched:
+                continue
+            # Объединяющему родителю хватает событий о записях, если в нем самом нет программ
+            mask = _ENTRY_EVENTS if is_parent and directory not in by_directory else _FILE_EVENTS
+            try:
+                wd = self._inotify.add_watch(directory, mask)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    print("Закончился лимит наблюдений inotify - остальные каталоги программ будут опрашиваться.")
+                # Каталога нет (программа удалена) или нет доступа - его появление заметит опрос
+                polled.add(directory)
+                continue
+            self._watches[wd] = (directory, is_parent)
+            self._watched[directory] = wd
+
+        polled_paths = set()
+        for directory in polled:
+            polled_paths.update(by_directory.get(directory, ()))
+        signatures = {}
+        for path in polled_paths:
+            signatures[path] = self._signatures[path] if path in self._signatures else file_signature(path)
+        self._signatures = signatures
+
+    def _poll(self):
+        changed = []
+        for path, signature in list(self._signatures.items()):
+            current = file_signature(path)
+            if current != signature:
+                self._signatures[path] = current
+                changed.append(path)
+        self._report(changed)
+        if self._inotify is not None and any(os.path.dirname(path) not in self._watched for path in changed):
+            # Каталог программы мог появиться снова - попробовать поставить на него наблюдение
+            with self._lock:
+                self._paths_changed = True
+
+    def _close_handles(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._wake_pipe is not None:
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
@@ -0,0 +1,277 @@
+"""
+Массовое добавление программ: обход папок (или папок меню приложений) с
+определением типа, имени и отбрасыванием уже добавленных путей.
+
+Обход - конвейер в пуле потоков: каждая задача читает один каталог через
+os.scandir, разбирает его файлы (включая чтение .desktop) и возвращает
+найденные программы и подкаталоги; поток "folder-scan" ставит подкаталоги
+в пул (не больше SCAN_WORKERS * 4 задач сразу), отбрасывает дубликаты и копит
+программы в очереди. Интерфейс забирает их порциями через poll() и добавляет
+в категорию пачками (add_programs менеджера данных), поэтому десятки тысяч
+файлов не подвешивают окно. Счетчики хода - в progress(), остановка - cancel().
+"""
+import os
+import queue
+import sys
+import threading
+
+SCAN_WORKERS = 8
+SCAN_BATCH = 1000 # Программ в одной порции poll() по умолчанию
+
+# Расширение -> тип записи (как в диалоге добавления программы)
+PROGRAM_TYPES = {
+    ".exe": "exe",
+    ".py": "script", ".bat": "script", ".ps1": "script",
+    ".doc": "document", ".docx": "document", ".pdf": "document", ".txt": "document",
+    ".url": "link", ".lnk": "link",
+    ".desktop": "exe",
+}
+SKIPPED_DIRECTORIES = frozenset({"__pycache__", "node_modules", "$recycle.bin"})
+SKIPPED_NAME_PREFIXES = ("unins", "uninstall") # Деинсталляторы рядом с программами
+# Коды полей в Exec= файлов .desktop (спецификация Desktop Entry), которые лаунчер не подставляет
+_DESKTOP_FIELD_CODES = frozenset({"%f", "%F", "%u", "%U", "%d", "%D", "%n", "%N", "%i", "%c", "%k", "%v", "%m"})
+
+
+def application_directories():
+    """Папки меню приложений текущей системы, которые есть на диске."""
+    if sys.platform == "win32":
+        candidates = [os.path.join(os.environ.get(variable, ""), "Microsoft", "Windows", "Start Menu", "Programs")
+                      for variable in ("APPDATA", "PROGRAMDATA") if os.environ.get(variable)]
+    else:
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+        candidates = [os.path.join(directory, "applications") for directory in [data_home, *data_dirs.split(":")] if directory]
+    seen = set()
+    directories = []
+    for directory in candidates:
+        key = os.path.normcase(os.path.normpath(directory))
+        if key not in seen and os.path.isdir(directory):
+            seen.add(key)
+            directories.append(directory)
+    return directories
+
+
+def path_key(path):
+    """Ключ пути для поиска дубликатов: одинаковый для вариантов записи одного пути."""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def read_desktop_entry(path):
+    """
+    Разбирает файл .desktop: словарь программы (имя, путь к исполняемому файлу, аргументы,
+    рабочий каталог, заметка) или None, если это не видимое приложение или Exec не разобрать.
+    """
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = f.read(65536).splitlines()
+    except OSError:
+        return None
+    fields = {}
+    in_entry = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            in_entry = line == "[Desktop Entry]"
+        elif in_entry and "=" in line and not line.startswith("#"):
+            key, value = line.split("=", 1)
+            fields.setdefault(key.strip(), value.strip())
+    if fields.get("Type", "Application") != "Application":
+        return None
+    if fields.get("NoDisplay", "").lower() == "true" or fields.get("Hidden", "").lower() == "true":
+        return None
+    import shlex
+    import shutil
+
+    try:
+        argv = [arg.replace("%%", "%") for arg in shlex.split(fields.get("Exec", "")) if arg not in _DESKTOP_FIELD_CODES]
+    except ValueError:
+        return None
+    if not argv:
+        return None
+    executable = argv[0] if os.path.isabs(argv[0]) else shutil.which(argv[0])
+    if not executable:
+        return None
+    return {
+        "name": fields.get("Name") or os.path.splitext(os.path.basename(path))[0],
+        "path": executable,
+        "type": "exe",
+        "note": fields.get("Comment", ""),
+        "arguments": shlex.join(argv[1:]),
+        "working_directory": fields.get("Path", ""),
+    }
+
+
+def classify_entry(entry):
+    """Программа (словарь полей) для файла os.DirEntry или None, если файл не подходит."""
+    name = entry.name
+    stem, extension = os.path.splitext(name)
+    lower_stem = stem.lower()
+    if lower_stem.startswith(SKIPPED_NAME_PREFIXES):
+        return None
+    extension = extension.lower()
+    if extension == ".desktop":
+        return read_desktop_entry(entry.path)
+    program_type = PROGRAM_TYPES.get(extension)
+    if program_type is None:
+        if extension or sys.platform == "win32" or name.startswith("."):
+            return None
+        # Исполняемый файл Unix без расширения
+        try:
+            if not entry.stat().st_mode & 0o111:
+                return None
+        except OSError:
+            return None
+        program_type = "exe"
+    return {"name": stem, "path": entry.path, "type": program_type,
+            "note": "", "arguments": "", "working_directory": ""}
+
+
+def scan_directory(directory, descend=True):
+    """
+    Читает один каталог: (программы, подкаталоги, число файлов, ошибка или None).
+    Ссылки на каталоги не обходятся, чтобы не зациклиться.
+    """
+    programs = []
+    subdirectories = []
+    files = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if descend and not entry.name.startswith(".") and entry.name.lower() not in SKIPPED_DIRECTORIES:
+                            subdirectories.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                files += 1
+                program = classify_entry(entry)
+                if program is not None:
+                    programs.append(program)
+    except OSError as e:
+        return programs, subdirectories, files, f"{directory}: {e.strerror or e}"
+    return programs, subdirectories, files, None
+
+
+class ScanProgress:
+    """Счетчики обхода: каталоги, файлы, найденные программы, дубликаты, ошибки чтения."""
+    __slots__ = ("directories", "files", "found", "duplicates", "errors")
+
+    def __init__(self):
+        self.directories = 0
+        self.files = 0
+        self.found = 0
+        self.duplicates = 0
+        self.errors = []
+
+    def copy(self):
+        progress = ScanProgress()
+        progress.directories = self.directories
+        progress.files = self.files
+        progress.found = self.found
+        progress.duplicates = self.duplicates
+        progress.errors = list(self.errors)
+        return progress
+
+
+class FolderScan:
+    """
+    Обход папок roots в фоне. known_paths - пути, которые уже есть в лаунчере,
+    known_names - занятые имена в целевой категории (повторы получают имя
+    родительской папки в скобках). max_depth - глубина обхода (None - без ограничений).
+    """
+
+    def __init__(self, roots, known_paths=(), known_names=(), workers=SCAN_WORKERS, max_depth=None):
+        self.roots = list(roots)
+        self.workers = max(1, int(workers))
+        self.max_depth = max_depth
+        self.done = False
+        self._known = {path_key(path) for path in known_paths if path} # Индекс путей для отбрасывания дубликатов
+        self._names = set(known_names)
+        self._pending = queue.Queue()
+        self._progress = ScanProgress()
+        self._progress_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="folder-scan", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Прекращает обход; уже найденные программы остаются в poll()."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def progress(self):
+        """Снимок счетчиков (ScanProgress)."""
+        with self._progress_lock:
+            return self._progress.copy()
+
+    def poll(self, limit=SCAN_BATCH):
+        """Не больше limit новых программ (словари полей) с прошлого вызова."""
+        programs = []
+        while len(programs) < limit:
+            try:
+                programs.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return programs
+
+    def _run(self):
+        from collections import deque
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="folder-scan")
+        try:
+            waiting = deque((root, 0) for root in self.roots)
+            running = {}
+            while (waiting or running) and not self._cancelled.is_set():
+                while waiting and len(running) < self.workers * 4:
+                    directory, depth = waiting.popleft()
+                    descend = self.max_depth is None or depth < self.max_depth
+                    running[executor.submit(scan_directory, directory, descend)] = depth
+                done, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = running.pop(future)
+                    programs, subdirectories, files, error = future.result()
+                    waiting.extend((subdirectory, depth + 1) for subdirectory in subdirectories)
+                    self._accept(programs, files, error)
+        except Exception as e:
+            print(f"Ошибка обхода папок: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.done = True
+
+    def _accept(self, programs, files, error):
+        """Отбрасывает дубликаты и кладет новые программы в очередь (только поток обхода)."""
+        found = duplicates = 0
+        for program in programs:
+            key = path_key(program["path"])
+            if key in self._known:
+                duplicates += 1
+                continue
+            self._known.add(key)
+            name = program["name"]
+            if name in self._names:
+                name = f"{name} ({os.path.basename(os.path.dirname(program['path']))})"
+                if name in self._names:
+                    duplicates += 1 # Имя занято и с папкой - такую запись категория не примет
+                    continue
+                program["name"] = name
+            self._names.add(name)
+            self._pending.put(program)
+            found += 1
+        with self._progress_lock:
+            progress = self._progress
+            progress.directories += 1
+            progress.files += files
+            progress.found += found
+            progress.duplicates += duplicates
+            if error is not None:
+                progress.errors.append(error)
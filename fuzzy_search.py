@@ -0,0 +1,156 @@
+"""
+Нечеткий (fuzzy) поиск в стиле лаунчеров: символы запроса должны встречаться
+в названии по порядку, но не обязательно подряд. Совпадения в начале слов,
+на границах camelCase и в имени файла ценятся выше.
+"""
+import os
+import re
+
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_FIRST_CHAR = 10
+BONUS_WORD_START = 8
+BONUS_CAMEL_CASE = 7
+BONUS_CONSECUTIVE = 4
+BASENAME_WEIGHT = 0.9
+
+# Начало слова (после разделителя), переход camelCase и начало числа
+_BOUNDARY_RE = re.compile(
+    r"(?P<word>(?<=[ _\-.\\/()\[\]])[^ _\-.\\/()\[\]])"
+    r"|(?P<camel>(?<=[a-zа-яё])[A-ZА-ЯЁ])"
+    r"|(?P<digit>(?<![0-9])[0-9])"
+)
+
+
+def _position_bonuses(text):
+    """Бонусы за совпадение в особых позициях строки: {позиция: бонус}."""
+    bonuses = {
+        match.start(): BONUS_CAMEL_CASE if match.lastgroup == "camel" else BONUS_WORD_START
+        for match in _BOUNDARY_RE.finditer(text)
+    }
+    if text:
+        bonuses[0] = BONUS_FIRST_CHAR
+    return bonuses
+
+
+def prepare_target(text):
+    """Предвычисляет строку для поиска: (в нижнем регистре, бонусы позиций)."""
+    return text.lower(), _position_bonuses(text)
+
+
+def boundary_chars(targets):
+    """Символы (в нижнем регистре), с которых начинается слово в целях поиска."""
+    return {text[position] for text, bonuses in targets for position in bonuses}
+
+
+def target_texts(name, path):
+    """Строки целей поиска программы: название и имя файла без расширения (если оно другое)."""
+    basename = os.path.splitext(os.path.basename(path.replace("\\", "/")))[0]
+    if basename and basename.lower() != name.lower():
+        return name, basename
+    return (name,)
+
+
+def prepare_program(program):
+    """Предвычисленные цели поиска для программы: название и имя файла без расширения."""
+    return [prepare_target(text) for text in target_texts(program.get("name", "") or "", program.get("path", "") or "")]
+
+
+def score_target(query, target):
+    """
+    Оценивает совпадение запроса (в нижнем регистре) с подготовленной строкой.
+    Возвращает None, если символы запроса не встречаются в строке по порядку.
+    """
+    text, bonuses = target
+    # Прямой проход: самое раннее окончание совпадения
+    end = -1
+    for ch in query:
+        end = text.find(ch, end + 1)
+        if end < 0:
+            return None
+    # Обратный проход: самое позднее начало, дающее самое короткое окно
+    start = end + 1
+    for ch in reversed(query):
+        start = text.rfind(ch, 0, start)
+
+    score = 0
+    position = start - 1
+    previous_match = -2
+    for ch in query:
+        position = text.find(ch, position + 1)
+        score += SCORE_MATCH + bonuses.get(position, 0)
+        if position == previous_match + 1:
+            score += BONUS_CONSECUTIVE
+        elif previous_match >= 0:
+            score += SCORE_GAP_START + SCORE_GAP_EXTENSION * (position - previous_match - 2)
+        previous_match = position
+    # Небольшой штраф за позднее начало совпадения
+    score += SCORE_GAP_EXTENSION * min(start, 10)
+    return score
+
+
+def score_program(query, targets):
+    """Лучшая оценка среди целей программы (имя файла весит чуть меньше названия)."""
+    best = None
+    for i, target in enumerate(targets):
+        score = score_target(query, target)
+        if score is None:
+            continue
+        if i > 0:
+            score *= BASENAME_WEIGHT
+        if best is None or score > best:
+            best = score
+    return best
+
+
+def _bonus_at(text, position):
+    """Бонус позиции строки - то же, что _position_bonuses(text).get(position, 0)."""
+    if position == 0:
+        return BONUS_FIRST_CHAR
+    match = _BOUNDARY_RE.match(text, position)
+    if match is None:
+        return 0
+    return BONUS_CAMEL_CASE if match.lastgroup == "camel" else BONUS_WORD_START
+
+
+def _score_char(ch, text):
+    """
+    (оценка, начинает ли ch слово) для запроса из одного символа без prepare_target:
+    оценка - как score_target(ch, prepare_target(text)) (первое вхождение ch), а слово
+    может начинаться и с любого следующего вхождения.
+    """
+    lowered = text.lower()
+    position = lowered.find(ch)
+    if position < 0:
+        return None, False
+    bonus = _bonus_at(text, position)
+    score = SCORE_MATCH + bonus + SCORE_GAP_EXTENSION * min(position, 10)
+    while not bonus:
+        position = lowered.find(ch, position + 1)
+        if position < 0:
+            return score, False
+        bonus = _bonus_at(text, position)
+    return score, True
+
+
+def score_texts_char(ch, texts):
+    """
+    Оценка программы с целями поиска texts (см. target_texts) для запроса из одного
+    символа ch (в нижнем регистре) или None, если ни в одной цели с ch не начинается
+    слово. Совпадает с score_program(ch, prepare_program(программа)) при
+    ch in boundary_chars(...), но не разбирает границы слов во всей строке -
+    для просмотра всех записей.
+    """
+    best = None
+    starts_word = False
+    for i, text in enumerate(texts):
+        score, starts = _score_char(ch, text)
+        if score is None:
+            continue
+        starts_word = starts_word or starts
+        if i > 0:
+            score *= BASENAME_WEIGHT
+        if best is None or score > best:
+            best = score
+    return best if starts_word else None
@@ -1,71 +1,307 @@
 import os
 import sys
-from PIL import Image, ImageTk
+import importlib.util
 import io
+import sqlite3
+import threading
+import time
 import traceback
 import tkinter as tk
 
-# Попытка импорта icoextract
-try:
-    from icoextract import IconExtractor
-except ImportError:
-    IconExtractor = None
+# PIL и icoextract (вместе с pefile) импортируются при первом обращении к иконкам,
+# а не при старте лаунчера. Здесь только проверяем, что они установлены.
+if importlib.util.find_spec("PIL") is None:
+    raise ImportError("Не найдена библиотека Pillow (PIL)")
+
+IconExtractor = None
+_icoextract_available = importlib.util.find_spec("icoextract") is not None
+if not _icoextract_available:
     print("Предупреждение: Библиотека 'icoextract' не найдена. Извлечение иконок может быть недоступно.")
     print("Установите ее командой: pip install icoextract")
+_import_lock = threading.Lock()
+
+ICON_CACHE_FILENAME = "launcher_icons.db"
+DEFAULT_ICON_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+def file_signature(path):
+    """Возвращает (mtime_ns, size) файла или None, если файл недоступен."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 
-def get_icon_from_exe(exe_path, size=(32, 32)):
+def icon_cache_path_for(data_filename):
+    """Возвращает путь к файлу кэша иконок рядом с файлом данных лаунчера."""
+    data_dir = os.path.dirname(os.path.abspath(data_filename))
+    return os.path.join(data_dir, ICON_CACHE_FILENAME)
+
+
+class IconCache:
     """
-    Извлекает иконку из исполняемого файла (.exe) и возвращает ее как объект PhotoImage Tkinter.
-    Использует библиотеку icoextract.
+    Постоянный кэш иконок на диске.
+    Хранит уже уменьшенные PNG-изображения в одном файле SQLite.
+    Запись привязана к пути, mtime и размеру файла, а также к размеру иконки:
+    если исполняемый файл изменился, запись считается устаревшей и перезаписывается.
+    При превышении max_bytes удаляются давно не использованные записи (LRU).
     """
-    if IconExtractor is None:
-        print("Ошибка: icoextract не импортирован. Невозможно извлечь иконку.")
+
+    def __init__(self, cache_path, max_bytes=DEFAULT_ICON_CACHE_MAX_BYTES):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pending_touches = False
+        self._total_bytes = 0 # Сумма размеров PNG в кэше: считается при открытии, дальше ведется при записи и удалении
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS icons ("
+                "path TEXT NOT NULL, width INTEGER NOT NULL, height INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, file_size INTEGER NOT NULL, "
+                "png BLOB NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (path, width, height))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS icons_last_used ON icons (last_used)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(png)), 0) FROM icons").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Ошибка открытия кэша иконок {cache_path}: {e}. Кэш отключен.")
+            self._conn = None
+
+    def get_png(self, path, size, signature=None):
+        """Возвращает PNG-байты из кэша или None, если записи нет или она устарела."""
+        if signature is None:
+            signature = file_signature(path)
+            if signature is None:
+                return None
+        with self._lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT mtime_ns, file_size, png FROM icons WHERE path = ? AND width = ? AND height = ?",
+                (path, size[0], size[1])
+            ).fetchone()
+            if row is None:
+                return None
+            if (row[0], row[1]) != signature:
+                # Файл изменился - запись больше не действительна
+                self._conn.execute(
+                    "DELETE FROM icons WHERE path = ? AND width = ? AND height = ?",
+                    (path, size[0], size[1])
+                )
+                self._conn.commit()
+                self._total_bytes -= len(row[2])
+                return None
+            self._conn.execute(
+                "UPDATE icons SET last_used = ? WHERE path = ? AND width = ? AND height = ?",
+                (time.time(), path, size[0], size[1])
+            )
+            self._pending_touches = True
+            return row[2]
+
+    def put_png(self, path, size, png_bytes, signature=None):
+        """Сохраняет PNG-байты иконки и при необходимости вытесняет старые записи."""
+        if signature is None:
+            signature = file_signature(path)
+            if signature is None:
+                return
+        with self._lock:
+            if self._conn is None:
+                return
+            replaced = self._conn.execute(
+                "SELECT LENGTH(png) FROM icons WHERE path = ? AND width = ? AND height = ?",
+                (path, size[0], size[1])
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO icons (path, width, height, mtime_ns, file_size, png, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size[0], size[1], signature[0], signature[1], sqlite3.Binary(png_bytes), time.time())
+            )
+            self._total_bytes += len(png_bytes) - (replaced[0] if replaced else 0)
+            self._evict_locked()
+            self._conn.commit()
+            self._pending_touches = False
+
+    def iter_png(self, batch_size=200):
+        """
+        Все записи кэша (путь, ширина, высота, PNG-байты) - для архива экспорта.
+        Читаются страницами, блокировка не держится между ними.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                if self._conn is None:
+                    return
+                rows = self._conn.execute(
+                    "SELECT rowid, path, width, height, png FROM icons WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, path, width, height, png_bytes in rows:
+                yield path, width, height, bytes(png_bytes)
+            last_rowid = rows[-1][0]
+
+    def invalidate(self, path):
+        """Удаляет все записи кэша для указанного пути."""
+        with self._lock:
+            if self._conn is None:
+                return
+            removed = self._conn.execute("SELECT COALESCE(SUM(LENGTH(png)), 0) FROM icons WHERE path = ?", (path,)).fetchone()[0]
+            self._conn.execute("DELETE FROM icons WHERE path = ?", (path,))
+            self._conn.commit()
+            self._total_bytes -= removed
+            self._pending_touches = False
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for path, width, height, blob_size in self._conn.execute(
+            "SELECT path, width, height, LENGTH(png) FROM icons ORDER BY last_used ASC"
+        ).fetchall():
+            self._conn.execute(
+                "DELETE FROM icons WHERE path = ? AND width = ? AND height = ?",
+                (path, width, height)
+            )
+            self._total_bytes -= blob_size
+            if self._total_bytes <= self.max_bytes:
+                break
+
+    def close(self):
+        """Сохраняет отметки использования и закрывает файл кэша."""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                if self._pending_touches:
+                    self._conn.commit()
+                self._conn.close()
+            except sqlite3.Error as e:
+                print(f"Ошибка при закрытии кэша иконок: {e}")
+            self._conn = None
+
+
+def _load_icon_extractor():
+    """Возвращает класс icoextract.IconExtractor (импортируется при первом вызове) или None."""
+    global IconExtractor, _icoextract_available
+    with _import_lock:
+        if IconExtractor is None and _icoextract_available:
+            try:
+                from icoextract import IconExtractor as extractor_class
+            except ImportError as e:
+                print(f"Ошибка импорта icoextract: {e}")
+                _icoextract_available = False
+            else:
+                IconExtractor = extractor_class
+    return IconExtractor
+
+
+def _extract_pil_image(exe_path, size):
+    """
+    Извлекает иконку из исполняемого файла и возвращает PIL.Image нужного размера.
+    Возвращает None, если иконку получить не удалось.
+    """
+    from PIL import Image
+
+    extractor = IconExtractor(exe_path)
+
+    # Попытка получить иконку с заданным размером
+    try:
+        # icoextract.get_icon() может вернуть BytesIO или PIL.Image
+        pil_image = extractor.get_icon(size[0])
+    except Exception:
+        pil_image = extractor.get_icon()
+
+    if not pil_image:
         return None
 
-    if not os.path.exists(exe_path):
+    # Преобразуем BytesIO в PIL Image, если необходимо
+    if isinstance(pil_image, io.BytesIO):
+        try:
+            pil_image = Image.open(pil_image)
+        except Exception as e:
+            print(f"Ошибка при открытии изображения из BytesIO: {e}")
+            return None
+
+    # Изменение размера PIL.Image до нужного, если он отличается
+    if pil_image.width != size[0] or pil_image.height != size[1]:
+        pil_image = pil_image.resize(size, Image.LANCZOS)
+    return pil_image
+
+
+def load_icon_image(exe_path, size=(32, 32), cache=None, signature=None):
+    """
+    Возвращает PIL.Image иконки нужного размера, не обращаясь к Tkinter,
+    поэтому функцию можно вызывать из фоновых потоков.
+    Если передан cache (IconCache), готовая иконка берется из него, а заново
+    декодируются только новые или измененные файлы.
+    """
+    if signature is None:
+        signature = file_signature(exe_path)
+    if signature is None:
         print(f"Файл не найден для извлечения иконки: {exe_path}")
         return None
 
+    if cache is not None:
+        png_bytes = cache.get_png(exe_path, size, signature)
+        if png_bytes:
+            from PIL import Image
+
+            try:
+                pil_image = Image.open(io.BytesIO(png_bytes))
+                pil_image.load()
+                return pil_image
+            except Exception as e:
+                print(f"Поврежденная запись кэша иконок для {exe_path}: {e}")
+                cache.invalidate(exe_path)
+
+    if _load_icon_extractor() is None:
+        print("Ошибка: icoextract не импортирован. Невозможно извлечь иконку.")
+        return None
+
     try:
-        extractor = IconExtractor(exe_path)
-        
-        # Попытка получить иконку с заданным размером
-        try:
-            # icoextract.get_icon() может вернуть BytesIO или PIL.Image
-            pil_image = extractor.get_icon(size[0])
-        except Exception: 
-            pil_image = extractor.get_icon() 
-            
-        if pil_image:
-            # Преобразуем BytesIO в PIL Image, если необходимо
-            if isinstance(pil_image, io.BytesIO):
-                try:
-                    pil_image = Image.open(pil_image)
-                except Exception as e:
-                    print(f"Ошибка при открытии изображения из BytesIO: {e}")
-                    return None
-
-            # Изменение размера PIL.Image до нужного, если он отличается
-            if pil_image.width != size[0] or pil_image.height != size[1]:
-                pil_image = pil_image.resize(size, Image.LANCZOS)
-            
-            # Конвертируем в формат PhotoImage Tkinter
-            tk_image = ImageTk.PhotoImage(pil_image)
-            return tk_image
-        else:
+        pil_image = _extract_pil_image(exe_path, size)
+        if pil_image is None:
             print(f"Не удалось извлечь иконку из {exe_path} с помощью icoextract.")
             return None
 
+        if cache is not None:
+            buffer = io.BytesIO()
+            pil_image.save(buffer, format="PNG")
+            cache.put_png(exe_path, size, buffer.getvalue(), signature)
+        return pil_image
+
     except Exception as e:
         print(f"Ошибка при извлечении иконки из {exe_path} с помощью icoextract: {e}")
-        print(traceback.format_exc()) 
+        print(traceback.format_exc())
         return None
 
+
+def get_icon_from_exe(exe_path, size=(32, 32), cache=None):
+    """
+    Извлекает иконку из исполняемого файла (.exe) и возвращает ее как объект PhotoImage Tkinter.
+    Использует библиотеку icoextract. Вызывать только из потока Tkinter.
+    """
+    pil_image = load_icon_image(exe_path, size, cache)
+    if pil_image is None:
+        return None
+    return photo_image_from_pil(pil_image)
+
+
+def photo_image_from_pil(pil_image):
+    """Конвертирует PIL.Image в PhotoImage Tkinter. Вызывать только из потока Tkinter."""
+    from PIL import ImageTk
+
+    return ImageTk.PhotoImage(pil_image)
+
 if __name__ == '__main__':
     # Пример использования (для тестирования модуля)
     test_exe_path = r"C:\Windows\notepad.exe" 
 
-    if IconExtractor is not None and os.path.exists(test_exe_path):
+    if _load_icon_extractor() is not None and os.path.exists(test_exe_path):
         root = tk.Tk()
         root.title("Тест извлечения иконки")
         root.geometry("200x200")
@@ -0,0 +1,222 @@
+"""
+История запусков программ и рейтинг frecency (частота запусков с учетом давности).
+Для каждой программы хранятся последние HISTORY_SIZE запусков (кольцевой буфер):
+время, аргументы, длительность работы и код выхода, если процесс удалось дождаться.
+Рейтинг обновляется за O(1) при каждом запуске: старое значение затухает вдвое
+за FRECENCY_HALF_LIFE секунд и к нему прибавляется единица.
+Запись на диск - отложенная и в фоновом потоке (storage.SaveScheduler),
+поэтому запуск программы никогда не ждет диска.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from storage import SaveScheduler, atomic_write_json, load_json_with_backups
+
+HISTORY_SUFFIX = ".history.json" # Файл истории: имя файла данных без расширения + суффикс
+LEGACY_HISTORY_FILENAME = "launcher_history.json" # Прежний общий файл истории на каталог
+DEFAULT_DATA_FILENAME = "launcher_data.json"
+HISTORY_FORMAT_VERSION = 1
+HISTORY_SIZE = 20 # Последних запусков на программу
+FRECENCY_HALF_LIFE = 7 * 24 * 3600 # Через неделю вклад запуска в рейтинг уменьшается вдвое
+HISTORY_SAVE_DELAY = 2.0 # Запуски идут сериями - пишем реже, чем основные данные
+
+
+def history_path_for(data_filename):
+    """
+    Путь к файлу истории запусков рядом с файлом данных лаунчера: у каждого файла
+    данных своя история (launcher_data.json -> launcher_data.history.json).
+    Файл данных по умолчанию продолжает вести прежний launcher_history.json,
+    если тот уже есть, а нового файла еще нет.
+    """
+    data_filename = os.path.abspath(data_filename)
+    data_dir, data_name = os.path.split(data_filename)
+    path = os.path.join(data_dir, os.path.splitext(data_name)[0] + HISTORY_SUFFIX)
+    legacy_path = os.path.join(data_dir, LEGACY_HISTORY_FILENAME)
+    if data_name == DEFAULT_DATA_FILENAME and not os.path.exists(path) and os.path.exists(legacy_path):
+        return legacy_path
+    return path
+
+
+class LaunchRecord:
+    """Один запуск. duration и exit_code - None, пока процесс работает или если его не дождаться."""
+    __slots__ = ("timestamp", "arguments", "duration", "exit_code")
+
+    def __init__(self, timestamp, arguments="", duration=None, exit_code=None):
+        self.timestamp = timestamp
+        self.arguments = arguments
+        self.duration = duration
+        self.exit_code = exit_code
+
+    def to_list(self):
+        return [self.timestamp, self.arguments, self.duration, self.exit_code]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values[:4])
+
+
+class ProgramHistory:
+    """История одной программы: кольцевой буфер запусков, общее число запусков и рейтинг."""
+    __slots__ = ("records", "launches", "frecency", "frecency_time")
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.records = deque(maxlen=size)
+        self.launches = 0
+        self.frecency = 0.0
+        self.frecency_time = 0.0
+
+    def add(self, record, half_life=FRECENCY_HALF_LIFE):
+        self.records.append(record)
+        self.launches += 1
+        self.frecency = self.frecency_at(record.timestamp, half_life) + 1.0
+        self.frecency_time = record.timestamp
+
+    def frecency_at(self, now, half_life=FRECENCY_HALF_LIFE):
+        if not self.frecency:
+            return 0.0
+        return self.frecency * math.pow(0.5, max(0.0, now - self.frecency_time) / half_life)
+
+    def last_launch(self):
+        return self.records[-1].timestamp if self.records else 0.0
+
+
+class LaunchHistory:
+    """
+    Хранилище истории запусков. Файл читается при первом обращении.
+    Методы можно вызывать из любого потока (record_exit - из потока, следящего за процессами).
+    """
+
+    def __init__(self, filename, size=HISTORY_SIZE, half_life=FRECENCY_HALF_LIFE, save_delay=HISTORY_SAVE_DELAY):
+        self.filename = filename
+        self.size = size
+        self.half_life = half_life
+        self._lock = threading.RLock()
+        self._programs = None # путь -> ProgramHistory, None - файл еще не прочитан
+        self._unmerged = [] # [(путь, LaunchRecord)] запусков до чтения файла
+        self._save_scheduler = SaveScheduler(self._write, save_delay)
+
+    def _loaded_programs(self):
+        """Записи истории по путям; файл читается без блокировки, чтобы не задерживать record_launch."""
+        with self._lock:
+            if self._programs is not None:
+                return self._programs
+        programs = self._read()
+        with self._lock:
+            if self._programs is None:
+                for program_path, record in self._unmerged:
+                    self._add(programs, program_path, record)
+                self._unmerged = []
+                self._programs = programs
+            return self._programs
+
+    def _add(self, programs, program_path, record):
+        history = programs.get(program_path)
+        if history is None:
+            history = programs[program_path] = ProgramHistory(self.size)
+        history.add(record, self.half_life)
+
+    def _read(self):
+        programs = {}
+        if not os.path.exists(self.filename):
+            return programs
+        data, _ = load_json_with_backups(self.filename, backup_count=0)
+        if not isinstance(data, dict):
+            print(f"Ошибка чтения истории запусков из {self.filename}. История начнется заново.")
+            return programs
+        try:
+            for path, entry in data.get("programs", {}).items():
+                history = ProgramHistory(self.size)
+                history.records.extend(LaunchRecord.from_list(values) for values in entry.get("history", []))
+                history.launches = entry.get("launches", len(history.records))
+                history.frecency = entry.get("frecency", 0.0)
+                history.frecency_time = entry.get("frecency_time", 0.0)
+                programs[path] = history
+        except (AttributeError, TypeError, ValueError) as e:
+            print(f"Ошибка разбора истории запусков из {self.filename}: {e}. История начнется заново.")
+            return {}
+        return programs
+
+    def record_launch(self, program_path, arguments="", timestamp=None):
+        """
+        Добавляет запуск в историю и планирует фоновую запись. Возвращает LaunchRecord;
+        длительность и код выхода дописывает record_exit, когда процесс завершится
+        (см. process_supervisor.ProcessSupervisor.add_exit_callback).
+        """
+        record = LaunchRecord(time.time() if timestamp is None else timestamp, arguments)
+        with self._lock:
+            if self._programs is None:
+                # Файл истории еще не прочитан - его прочитает поток записи, а не запуск программы
+                self._unmerged.append((program_path, record))
+            else:
+                self._add(self._programs, program_path, record)
+        self._save_scheduler.schedule(None)
+        return record
+
+    def record_exit(self, record, exit_code, end_time=None):
+        """Записывает код выхода и длительность работы для запуска record."""
+        with self._lock:
+            record.exit_code = exit_code
+            record.duration = max(0.0, (time.time() if end_time is None else end_time) - record.timestamp)
+        self._save_scheduler.schedule(None)
+
+    def get_history(self, program_path):
+        """Последние запуски программы (старые первыми)."""
+        with self._lock:
+            history = self._loaded_programs().get(program_path)
+            return list(history.records) if history else []
+
+    def frecency(self, program_path, now=None):
+        with self._lock:
+            history = self._loaded_programs().get(program_path)
+            return history.frecency_at(time.time() if now is None else now, self.half_life) if history else 0.0
+
+    def scores(self, kind, now=None):
+        """
+        Оценки программ для сортировки: "frecency" - рейтинг частоты с учетом давности,
+        "recent" - время последнего запуска. Возвращает словарь путь -> оценка.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            programs = self._loaded_programs()
+            if kind == "frecency":
+                return {path: history.frecency_at(now, self.half_life) for path, history in programs.items()}
+            if kind == "recent":
+                return {path: history.last_launch() for path, history in programs.items()}
+        raise ValueError(f"неизвестный вид оценки {kind!r}")
+
+    def recent_paths(self, limit):
+        """Пути последних запущенных программ, самые свежие первыми."""
+        with self._lock:
+            programs = self._loaded_programs()
+            ranked = sorted(programs, key=lambda path: programs[path].last_launch(), reverse=True)
+        return ranked[:limit]
+
+    def _snapshot(self):
+        self._loaded_programs()
+        with self._lock:
+            return {
+                "version": HISTORY_FORMAT_VERSION,
+                "programs": {
+                    path: {
+                        "launches": history.launches,
+                        "frecency": history.frecency,
+                        "frecency_time": history.frecency_time,
+                        "history": [record.to_list() for record in history.records],
+                    }
+                    for path, history in self._programs.items()
+                },
+            }
+
+    def _write(self, _):
+        # Снимок собирается здесь, в фоновом потоке записи, а не в момент запуска программы
+        try:
+            atomic_write_json(self.filename, self._snapshot(), backup_count=0)
+        except OSError as e:
+            print(f"Ошибка при сохранении истории запусков в {self.filename}: {e}")
+
+    def close(self):
+        """Дописывает отложенное сохранение и останавливает фоновый поток записи."""
+        self._save_scheduler.close()
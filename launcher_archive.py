@@ -0,0 +1,520 @@
+"""
+Экспорт и импорт данных лаунчера потоком, без чтения или сборки всего документа в памяти.
+
+Экспорт пишет тот же JSON, что и launcher_data.json (с отступом JSON_INDENT),
+по одной записи: программы берутся у менеджера данных через iter_export_programs,
+файл пишется во временный и переименовывается, как в atomic_write_json.
+Файлы .gz (и .zst, если в Python есть compression.zstd) сжимаются и дополнительно
+содержат иконки из кэша иконок (PNG в base64).
+
+Импорт читает файл порциями (storage.JsonStreamReader): поток "archive-read" разбирает
+записи, проверяет каждую (validate_program) и передает пачки по RECORD_BATCH через
+очередь на QUEUE_BATCHES пачек, так что память не зависит от размера архива.
+Менеджер данных трогает только поток интерфейса - в ArchiveImport.step, с бюджетом
+времени на вызов. Сначала импорт выполняется вхолостую (dry_run) и считает,
+сколько записей добавится, обновится и не изменится; затем тот же файл читается
+снова и пачки применяются через import_all_data менеджера (слияние по индексу пути).
+Стратегия "replace" копит записи архива и заменяет данные одним вызовом после
+конца файла: отмена или ошибка чтения оставляют данные нетронутыми.
+"""
+import base64
+import json
+import os
+import queue
+import threading
+import time
+
+from data_manager import FAVORITES_CATEGORY
+from program_record import DEFAULT_FIELDS
+from storage import JSON_INDENT, JsonStreamReader
+
+ARCHIVE_FORMAT = "launcher-archive"
+ARCHIVE_VERSION = 1
+RECORD_BATCH = 500 # Записей в одной пачке импорта
+QUEUE_BATCHES = 8 # Пачек в очереди между потоком чтения и интерфейсом
+MAX_REPORTED_ERRORS = 50
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSED_EXTENSIONS = (".gz", ".zst")
+
+_STRING_FIELDS = tuple(field for field, _ in DEFAULT_FIELDS)
+
+
+class ArchiveError(Exception):
+    """Архив нельзя прочитать или записать (формат, версия, сжатие)."""
+
+
+def zstd_available():
+    try:
+        from compression import zstd # noqa: F401 - Python 3.14+
+    except ImportError:
+        return False
+    return True
+
+
+def _zstd_module():
+    try:
+        from compression import zstd
+    except ImportError:
+        raise ArchiveError("Архивы .zst поддерживаются начиная с Python 3.14.") from None
+    return zstd
+
+
+def is_compressed_archive(path):
+    """Сжатый архив (с иконками) - по расширению файла."""
+    return path.lower().endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_archive(path, mode="r"):
+    """
+    Открывает архив как текст UTF-8. При чтении сжатие определяется по первым байтам,
+    при записи - по расширению (.gz, .zst).
+    """
+    if mode == "r":
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        if magic.startswith(GZIP_MAGIC):
+            import gzip
+
+            return gzip.open(path, "rt", encoding="utf-8")
+        if magic == ZSTD_MAGIC:
+            return _zstd_module().open(path, "rt", encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+    lower_path = path.lower()
+    if lower_path.endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if lower_path.endswith(".zst"):
+        return _zstd_module().open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def validate_program(record):
+    """Текст ошибки записи программы из архива или None, если запись годится."""
+    if not isinstance(record, dict):
+        return "запись не является объектом"
+    for field in ("name", "path"):
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f"нет поля '{field}'"
+    for field in _STRING_FIELDS:
+        if field in record and not isinstance(record[field], str):
+            return f"поле '{field}' должно быть строкой"
+    if "profiles" in record and not isinstance(record["profiles"], list):
+        return "поле 'profiles' должно быть списком"
+    return None
+
+
+def validate_icon(entry):
+    """Текст ошибки иконки из архива или None."""
+    if not isinstance(entry, dict) or not isinstance(entry.get("path"), str) or not isinstance(entry.get("png"), str):
+        return "иконка без пути или изображения"
+    if not all(isinstance(entry.get(field), int) and entry[field] > 0 for field in ("width", "height")):
+        return "у иконки нет размера"
+    return None
+
+
+# Экспорт
+
+def _dump(value, depth):
+    """JSON значения с отступами, как у вложенного значения json.dump(indent=JSON_INDENT) на глубине depth."""
+    text = json.dumps(value, ensure_ascii=False, indent=JSON_INDENT)
+    return text.replace("\n", "\n" + " " * (JSON_INDENT * depth))
+
+
+def _write_array(f, items, depth, counter):
+    """Пишет массив по одному элементу; counter - список из одного счетчика записанных элементов."""
+    indent = "\n" + " " * (JSON_INDENT * (depth + 1))
+    first = True
+    for item in items:
+        f.write(("[" if first else ",") + indent + _dump(item, depth + 1))
+        first = False
+        counter[0] += 1
+        if counter[0] % RECORD_BATCH == 0:
+            yield
+    f.write("[]" if first else "\n" + " " * (JSON_INDENT * depth) + "]")
+
+
+def _icon_items(icon_cache):
+    for path, width, height, png_bytes in icon_cache.iter_png():
+        yield {"path": path, "width": width, "height": height, "png": base64.b64encode(png_bytes).decode("ascii")}
+
+
+def iter_export(data_manager, f, icon_cache=None, counter=None):
+    """
+    Пишет данные лаунчера в открытый текстовый файл f. Генератор: уступает
+    после каждых RECORD_BATCH записей, чтобы поток интерфейса мог прерваться.
+    icon_cache - кэш иконок (icon_extractor.IconCache), иконки которого попадут в архив.
+    counter - список из одного числа, куда копится число записанных записей.
+    """
+    counter = counter if counter is not None else [0]
+    settings = data_manager.get_export_settings()
+    member = "\n" + " " * JSON_INDENT
+    f.write("{" + member + f'"format": "{ARCHIVE_FORMAT}",' + member + f'"version": {ARCHIVE_VERSION}')
+    for key in ("last_selected_category", "window_geometry", "launch_counts"):
+        f.write("," + member + json.dumps(key) + ": " + _dump(settings[key], 1))
+    f.write("," + member + '"favorites": ')
+    yield from _write_array(f, data_manager.iter_export_programs(FAVORITES_CATEGORY), 1, counter)
+    f.write("," + member + '"categories": ')
+    categories = data_manager.get_categories()
+    if not categories:
+        f.write("{}")
+    for index, category_name in enumerate(categories):
+        f.write(("{" if index == 0 else ",") + "\n" + " " * (JSON_INDENT * 2) + json.dumps(category_name, ensure_ascii=False) + ": ")
+        yield from _write_array(f, data_manager.iter_export_programs(category_name), 2, counter)
+    if categories:
+        f.write(member + "}")
+    if icon_cache is not None:
+        f.write("," + member + '"icons": ')
+        yield from _write_array(f, _icon_items(icon_cache), 1, [0])
+    f.write("\n}")
+
+
+class ArchiveExport:
+    """
+    Экспорт в file_path по шагам из потока интерфейса (step). Пишется временный
+    файл, который в конце заменяет file_path; при ошибке или отмене он удаляется.
+    Иконки из icon_cache пишутся только в сжатый архив.
+    """
+
+    def __init__(self, data_manager, file_path, icon_cache=None):
+        self.file_path = file_path
+        self.temp_path = f"{file_path}.tmp"
+        self.counter = [0]
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self._file = open_archive(self.temp_path, "w")
+        icons = icon_cache if is_compressed_archive(file_path) else None
+        self._steps = iter_export(data_manager, self._file, icons, self.counter)
+
+    @property
+    def written(self):
+        """Сколько записей программ уже записано."""
+        return self.counter[0]
+
+    def step(self, budget=None):
+        """Пишет дальше, пока не кончится budget секунд (None - до конца). Возвращает done."""
+        started = time.perf_counter()
+        try:
+            while budget is None or time.perf_counter() - started < budget:
+                if next(self._steps, StopIteration) is StopIteration:
+                    self._finish()
+                    break
+        except Exception as e:
+            self.error = str(e)
+            self._discard()
+        return self.done
+
+    def _finish(self):
+        self._file.close()
+        os.replace(self.temp_path, self.file_path)
+        self.done = True
+
+    def cancel(self):
+        if not self.done:
+            self.cancelled = True
+            self._discard()
+
+    def _discard(self):
+        self.done = True
+        self._steps.close()
+        try:
+            self._file.close()
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+def export_archive(data_manager, file_path, icon_cache=None):
+    """Экспорт целиком (без интерфейса). Возвращает число записанных записей; ошибки - ArchiveError."""
+    export = ArchiveExport(data_manager, file_path, icon_cache)
+    export.step()
+    if export.error:
+        raise ArchiveError(export.error)
+    return export.written
+
+
+# Импорт
+
+class ImportDiff:
+    """Что изменит импорт: счетчики записей программ, избранного и иконок, первые ошибки проверки."""
+    __slots__ = ("categories_added", "added", "updated", "unchanged", "removed", "favorites_added",
+                 "favorites_updated", "favorites_unchanged", "icons", "invalid", "errors")
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+        self.errors = []
+
+    def add_error(self, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def summary(self):
+        lines = [
+            f"Программы: добавится {self.added}, обновится {self.updated}, без изменений {self.unchanged}"
+            + (f", удалится {self.removed}" if self.removed else ""),
+            f"Новых категорий: {self.categories_added}",
+            f"Избранное: добавится {self.favorites_added}, обновится {self.favorites_updated}, без изменений {self.favorites_unchanged}",
+        ]
+        if self.icons:
+            lines.append(f"Иконок в архиве: {self.icons}")
+        if self.invalid:
+            lines.append(f"Пропущено неверных записей: {self.invalid}")
+        return "\n".join(lines)
+
+
+class ArchiveReader:
+    """
+    Поток "archive-read": читает архив и кладет в очередь события
+    ("category", имя, записи), ("favorites", записи), ("icons", записи),
+    ("settings", словарь), ("invalid", описание), затем ("end", None)
+    или ("error", текст). Очередь ограничена, поэтому поток ждет, пока
+    интерфейс заберет пачки.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.events = queue.Queue(maxsize=QUEUE_BATCHES)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="archive-read", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _put(self, event):
+        while not self._cancelled.is_set():
+            try:
+                self.events.put(event, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Cancelled()
+
+    def _run(self):
+        try:
+            with open_archive(self.file_path, "r") as f:
+                self._read(JsonStreamReader(f))
+            self._put(("end", None))
+        except _Cancelled:
+            return
+        except ArchiveError as e:
+            self._put_final(("error", str(e)))
+        except (OSError, EOFError, ValueError) as e:
+            self._put_final(("error", f"Файл поврежден или не является архивом лаунчера: {e}"))
+        except Exception as e:
+            # zlib.error поврежденного .gz, ошибки распаковки zstd и прочее: интерфейс ждет "error" или "end"
+            self._put_final(("error", f"Не удалось прочитать архив: {e}"))
+
+    def _put_final(self, event):
+        try:
+            self._put(event)
+        except _Cancelled:
+            pass
+
+    def _read(self, reader):
+        if reader.peek() != "{":
+            raise ArchiveError("Файл не является файлом данных лаунчера.")
+        seen_categories = False
+        settings = {}
+        for key in reader.iter_object():
+            if key == "version":
+                version = reader.read_value()
+                if not isinstance(version, int) or version > ARCHIVE_VERSION:
+                    raise ArchiveError(f"Архив версии {version} создан более новой версией лаунчера.")
+            elif key == "categories":
+                seen_categories = True
+                if reader.peek() != "{":
+                    raise ArchiveError("Поле 'categories' должно быть объектом.")
+                for category_name in reader.iter_object():
+                    if reader.peek() != "[":
+                        self._put(("invalid", f"категория '{category_name}': ожидался список программ"))
+                        reader.skip_value()
+                        continue
+                    self._read_records(reader, ("category", category_name), validate_program,
+                                       f"категория '{category_name}'")
+            elif key == "favorites" and reader.peek() == "[":
+                self._read_records(reader, ("favorites",), validate_program, "избранное")
+            elif key == "icons" and reader.peek() == "[":
+                self._read_records(reader, ("icons",), validate_icon, "иконки")
+            elif key == "last_selected_category":
+                settings[key] = reader.read_value()
+            else:
+                reader.skip_value()
+        if not seen_categories:
+            raise ArchiveError("Файл не является файлом данных лаунчера: нет категорий.")
+        self._put(("settings", settings))
+
+    def _read_records(self, reader, event, validate, where):
+        batch = []
+        sent = False
+        for index, record in enumerate(reader.iter_array()):
+            if self._cancelled.is_set():
+                raise _Cancelled()
+            error = validate(record)
+            if error is not None:
+                self._put(("invalid", f"{where}, запись {index + 1}: {error}"))
+                continue
+            batch.append(record)
+            if len(batch) >= RECORD_BATCH:
+                self._put(event + (batch,))
+                sent = True
+                batch = []
+        if batch or not sent:
+            self._put(event + (batch,)) # Пустая пачка - чтобы пустая категория тоже появилась
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _is_unchanged(existing, record):
+    """Импорт записи ничего не поменяет: все ее поля (с полями по умолчанию) уже такие."""
+    for field, default in DEFAULT_FIELDS:
+        if existing.get(field) != record.get(field, default):
+            return False
+    return all(existing.get(key) == value for key, value in record.items())
+
+
+class ArchiveImport:
+    """
+    Импорт архива по шагам из потока интерфейса. dry_run - только посчитать
+    изменения (diff), иначе применить их стратегией "merge" (пачками, по мере
+    чтения) или "replace" (одним шагом после конца архива, как import_all_data). Иконки при применении кладутся в icon_cache с
+    сигнатурой файла на этом компьютере; иконки отсутствующих файлов пропускаются.
+    """
+
+    def __init__(self, data_manager, file_path, strategy="merge", dry_run=True, icon_cache=None):
+        self.data_manager = data_manager
+        self.strategy = strategy
+        self.dry_run = dry_run
+        self.icon_cache = icon_cache
+        self.diff = ImportDiff()
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self.records = 0 # Сколько записей уже разобрано
+        self._reader = ArchiveReader(file_path)
+        self._existing_categories = set()
+        self._new_categories = set()
+        self._matched = set() # (категория, путь) существующих записей, которые есть в архиве - для "replace"
+        self._existing_count = None
+        self._staged = None # Данные архива для "replace": применяются только после конца файла
+
+    def start(self):
+        self._existing_categories = set(self.data_manager.get_categories())
+        if self.strategy == "replace":
+            self._existing_count = self.data_manager.count_programs()
+            if not self.dry_run:
+                self._staged = {"categories": {}, "favorites": []}
+        self._reader.start()
+        return self
+
+    def cancel(self):
+        if not self.done:
+            self.cancelled = True
+            self._staged = None
+            self._reader.cancel()
+            self.done = True
+
+    def step(self, budget=None):
+        """Обрабатывает пачки, пока не кончится budget секунд (None - до конца). Возвращает done."""
+        started = time.perf_counter()
+        while not self.done and (budget is None or time.perf_counter() - started < budget):
+            try:
+                event = self._reader.events.get(timeout=0.01 if budget is not None else None)
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "category":
+                self._import_programs(event[1], event[2])
+            elif kind == "favorites":
+                self._import_favorites(event[1])
+            elif kind == "icons":
+                self._import_icons(event[1])
+            elif kind == "invalid":
+                self.diff.add_error(event[1])
+            elif kind == "settings":
+                if self._staged is not None:
+                    self._staged.update(event[1])
+                elif not self.dry_run and "last_selected_category" in event[1]:
+                    self.data_manager.import_all_data(event[1], "merge")
+            elif kind == "error":
+                self.error = event[1]
+                self._staged = None
+                self.done = True
+            elif kind == "end":
+                if self._existing_count is not None:
+                    self.diff.removed = self._existing_count - len(self._matched)
+                if self._staged is not None:
+                    self.data_manager.import_all_data(self._staged, "replace")
+                    self._staged = None
+                self.done = True
+        return self.done
+
+    def _import_programs(self, category_name, records):
+        diff = self.diff
+        if category_name not in self._existing_categories and category_name not in self._new_categories:
+            self._new_categories.add(category_name)
+            diff.categories_added += 1
+        for record in records:
+            existing = self.data_manager.find_program(category_name, record["path"])
+            if existing is None:
+                diff.added += 1
+                continue
+            if _is_unchanged(existing, record):
+                diff.unchanged += 1
+            else:
+                diff.updated += 1
+            if self.strategy == "replace":
+                self._matched.add((category_name, record["path"]))
+        self.records += len(records)
+        if self._staged is not None:
+            self._staged["categories"].setdefault(category_name, []).extend(records)
+        elif not self.dry_run:
+            self.data_manager.import_all_data({"categories": {category_name: records}}, "merge")
+
+    def _import_favorites(self, records):
+        diff = self.diff
+        for record in records:
+            existing = self.data_manager.find_favorite(record["path"])
+            if existing is None:
+                diff.favorites_added += 1
+            elif _is_unchanged(existing, record):
+                diff.favorites_unchanged += 1
+            else:
+                diff.favorites_updated += 1
+        self.records += len(records)
+        if self._staged is not None:
+            self._staged["favorites"].extend(records)
+        elif not self.dry_run:
+            self.data_manager.import_all_data({"favorites": records}, "merge")
+
+    def _import_icons(self, entries):
+        self.diff.icons += len(entries)
+        if self.dry_run or self.icon_cache is None:
+            return
+        for entry in entries:
+            try:
+                png_bytes = base64.b64decode(entry["png"], validate=True)
+            except ValueError:
+                self.diff.add_error(f"иконка {entry['path']}: неверные данные изображения")
+                continue
+            self.icon_cache.put_png(entry["path"], (entry["width"], entry["height"]), png_bytes)
+
+
+def import_archive(data_manager, file_path, strategy="merge", dry_run=False, icon_cache=None):
+    """Импорт целиком (без интерфейса). Возвращает ImportDiff; ошибки формата - ArchiveError."""
+    archive_import = ArchiveImport(data_manager, file_path, strategy, dry_run, icon_cache).start()
+    archive_import.step()
+    if archive_import.error:
+        raise ArchiveError(archive_import.error)
+    return archive_import.diff
@@ -0,0 +1,273 @@
+"""
+Командная строка лаунчера: те же данные, что и в окне, без интерфейса.
+
+Запуск:
+    python -m launcher_cli list [КАТЕГОРИЯ]
+    python -m launcher_cli search ЗАПРОС
+    python -m launcher_cli add КАТЕГОРИЯ ИМЯ ПУТЬ
+    python -m launcher_cli remove КАТЕГОРИЯ ИМЯ
+    python -m launcher_cli launch ИМЯ_ИЛИ_ПУТЬ
+    python -m launcher_cli export ФАЙЛ
+
+С --json результат печатается одним документом JSON (для скриптов).
+Если для файла данных работает служба лаунчера (окно или python -m launcher_service),
+команда выполняется в ней: данные там уже загружены (см. launcher_service);
+--local выполняет команду в этом процессе.
+Модуль не импортирует tkinter и PIL, а поисковый индекс и индексы путей строятся
+лениво (см. SearchIndex.rebuild и DataManager), поэтому на библиотеке в 10 000
+программ list и любой поиск, в том числе по одной букве, укладываются в 100 мс
+холодного запуска (см. benchmark.py cli). Хранилище выбирается так же,
+как в окне: --storage или переменная окружения LAUNCHER_STORAGE.
+"""
+import argparse
+import json
+import os
+import sys
+
+from data_manager import FAVORITES_CATEGORY, RECENT_CATEGORY, SCORED_SORT_KEYS, SORT_KEYS, open_data_manager
+from program_launcher import LaunchError
+
+SEARCH_LIMIT = 20
+SUGGESTION_LIMIT = 5 # Сколько похожих программ подсказать, если программа не найдена
+EXIT_OK = 0
+EXIT_FAILED = 1
+MODIFYING_COMMANDS = frozenset({"add", "remove"}) # После них окно-служба перерисовывает списки
+
+
+class CommandError(Exception):
+    """Команду выполнить нельзя; текст - для пользователя, код выхода - EXIT_FAILED."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details # Дополнительные данные для вывода --json (например, подсказки)
+
+
+def _program_fields(program, category=None, score=None):
+    fields = dict(program) # Program и записи SQLite (словари) - одинаково
+    if category is not None:
+        fields["category"] = category
+    if score is not None:
+        fields["score"] = round(score, 2)
+    return fields
+
+
+def _print_rows(rows):
+    for row in rows:
+        print("\t".join(str(value) for value in row))
+
+
+# Команды: каждая возвращает (данные для --json, строки для текстового вывода)
+
+def command_list(data_manager, args):
+    if args.category is not None:
+        categories = [args.category]
+        if args.category not in (FAVORITES_CATEGORY, RECENT_CATEGORY) and args.category not in data_manager.get_categories():
+            raise CommandError(f"Категория '{args.category}' не найдена.")
+    else:
+        categories = data_manager.get_categories()
+    programs = []
+    for category in categories:
+        programs.extend(_program_fields(program, category)
+                        for program in data_manager.list_programs(category, args.sort, args.descending))
+    return programs, [(program["category"], program["name"], program["path"]) for program in programs]
+
+
+def command_search(data_manager, args):
+    if args.substring:
+        found = sorted(data_manager.search_programs(args.query), key=lambda program: (program.get('name') or '').lower())
+        results = [_program_fields(program, data_manager.get_program_category(program)) for program in found[:args.limit]]
+    else:
+        results = [_program_fields(program, category, score)
+                   for score, program, category in data_manager.fuzzy_search(args.query, args.limit)]
+    return results, [(program["name"], program["category"], program["path"]) for program in results]
+
+
+def command_add(data_manager, args):
+    if args.category not in data_manager.get_categories():
+        if not args.create_category:
+            raise CommandError(f"Категория '{args.category}' не найдена (--create-category создаст ее).")
+        data_manager.add_category(args.category)
+    if not data_manager.add_program(args.category, args.name, args.path, args.type, args.arguments, args.working_directory):
+        raise CommandError(f"Программа с именем '{args.name}' или путем '{args.path}' уже есть в категории '{args.category}'.")
+    data_manager.schedule_save()
+    result = {"category": args.category, "name": args.name, "path": args.path}
+    return result, [(f"Добавлено: {args.name} -> {args.category}",)]
+
+
+def command_remove(data_manager, args):
+    if not data_manager.delete_program(args.category, args.name):
+        raise CommandError(f"Программа '{args.name}' не найдена в категории '{args.category}'.")
+    data_manager.schedule_save()
+    return {"category": args.category, "name": args.name}, [(f"Удалено: {args.name} из {args.category}",)]
+
+
+def _find_launch_target(data_manager, target, category=None):
+    """Путь программы по пути или имени (без учета регистра); неоднозначность - CommandError."""
+    if category is None and data_manager.get_program_data_by_path(target) is not None:
+        return target
+    if category is not None:
+        categories = [category]
+    else:
+        categories = [*data_manager.get_categories(), FAVORITES_CATEGORY]
+    name = target.lower()
+    paths = []
+    for category_name in categories:
+        for program in data_manager.list_programs(category_name):
+            path = program.get('path')
+            if (program.get('name') or '').lower() == name or path == target:
+                if path not in paths:
+                    paths.append(path)
+    if len(paths) == 1:
+        return paths[0]
+    if paths:
+        raise CommandError(f"Имени '{target}' соответствует несколько программ; укажите путь или --category.", paths)
+    suggestions = [program.get('name') for _, program, _ in data_manager.fuzzy_search(target, SUGGESTION_LIMIT)]
+    message = f"Программа '{target}' не найдена."
+    if suggestions:
+        message += f" Похожие: {', '.join(suggestions)}."
+    raise CommandError(message, suggestions)
+
+
+def command_launch(data_manager, args):
+    from process_supervisor import ProcessSupervisor
+    from program_launcher import launch_plan
+
+    path = _find_launch_target(data_manager, args.target, args.category)
+    supervisor = args.supervisor or ProcessSupervisor()
+    try:
+        outcome = launch_plan(data_manager.get_launch_plan(path, args.profile), supervisor)
+    except LaunchError as e:
+        raise CommandError(str(e)) from None
+    launch_record = data_manager.record_launch(outcome.request.path, outcome.request.arguments)
+    if outcome.process is not None and launch_record is not None:
+        history = data_manager.launch_history
+        supervisor.add_exit_callback(
+            outcome.process, lambda process: history.record_exit(launch_record, process.exit_code, process.end_time))
+    data_manager.schedule_save()
+    pid = outcome.process.pid if outcome.process is not None else None
+    result = {"name": outcome.request.name, "path": outcome.request.path, "pid": pid, "warnings": outcome.warnings}
+    rows = [(f"Предупреждение: {warning}",) for warning in outcome.warnings]
+    rows.append((f"Запущено: {outcome.request.name}" + (f" (PID {pid})" if pid else ""),))
+    return result, rows
+
+
+def command_export(data_manager, args):
+    from launcher_archive import ArchiveError, export_archive
+
+    try:
+        written = export_archive(data_manager, args.file) # Иконки остаются в окне: кэш иконок требует PIL
+    except ArchiveError as e:
+        raise CommandError(str(e)) from None
+    return {"file": args.file, "records": written}, [(f"Экспортировано записей: {written} -> {args.file}",)]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m launcher_cli", description="Лаунчер без окна: поиск, запуск и правка списка программ")
+    parser.add_argument("--data", default="launcher_data.json", help="файл данных лаунчера (по умолчанию launcher_data.json)")
+    parser.add_argument("--storage", choices=("json", "journal", "sqlite"), help="хранилище (по умолчанию из LAUNCHER_STORAGE)")
+    parser.add_argument("--json", action="store_true", help="печатать результат в JSON")
+    parser.add_argument("--local", action="store_true", help="не обращаться к службе лаунчера, загрузить данные в этом процессе")
+    # Надзор за процессами для launch: окно и служба передают свой (см. execute)
+    parser.set_defaults(supervisor=None)
+    commands = parser.add_subparsers(dest="command", required=True, metavar="КОМАНДА")
+
+    command = commands.add_parser("list", help="программы категории или всех категорий")
+    command.add_argument("category", nargs="?", help=f"категория (в том числе '{FAVORITES_CATEGORY}' и '{RECENT_CATEGORY}')")
+    command.add_argument("--sort", choices=sorted([*SORT_KEYS, *SCORED_SORT_KEYS]), help="порядок программ")
+    command.add_argument("--descending", action="store_true", help="в обратном порядке")
+    command.set_defaults(handler=command_list)
+
+    command = commands.add_parser("search", help="поиск по всем категориям")
+    command.add_argument("query")
+    command.add_argument("--limit", type=int, default=SEARCH_LIMIT, help=f"сколько результатов (по умолчанию {SEARCH_LIMIT})")
+    command.add_argument("--substring", action="store_true", help="искать подстроку в имени, заметке, аргументах и пути вместо нечеткого поиска")
+    command.set_defaults(handler=command_search)
+
+    command = commands.add_parser("add", help="добавить программу в категорию")
+    command.add_argument("category")
+    command.add_argument("name")
+    command.add_argument("path")
+    command.add_argument("--type", default="exe", choices=("exe", "script", "document", "link"), help="тип записи")
+    command.add_argument("--arguments", default="", help="аргументы командной строки")
+    command.add_argument("--working-directory", default="", help="рабочий каталог")
+    command.add_argument("--create-category", action="store_true", help="создать категорию, если ее нет")
+    command.set_defaults(handler=command_add)
+
+    command = commands.add_parser("remove", help="удалить программу из категории")
+    command.add_argument("category")
+    command.add_argument("name")
+    command.set_defaults(handler=command_remove)
+
+    command = commands.add_parser("launch", help="запустить программу по имени или пути")
+    command.add_argument("target", metavar="ИМЯ_ИЛИ_ПУТЬ")
+    command.add_argument("--category", help="искать имя только в этой категории")
+    command.add_argument("--profile", help="профиль запуска")
+    command.set_defaults(handler=command_launch)
+
+    command = commands.add_parser("export", help="экспорт данных (.json, .gz или .zst)")
+    command.add_argument("file")
+    command.set_defaults(handler=command_export)
+    return parser
+
+
+def execute(data_manager, args, cwd=None, supervisor=None):
+    """
+    Выполняет разобранную команду над загруженными данными: (код выхода, данные для --json,
+    строки для текстового вывода). cwd - каталог, от которого считаются относительные
+    пути файлов (клиент службы); supervisor - чей ProcessSupervisor запускает программы.
+    """
+    args.supervisor = supervisor
+    if cwd and getattr(args, "file", None):
+        args.file = os.path.join(cwd, args.file)
+    try:
+        result, rows = args.handler(data_manager, args)
+    except CommandError as e:
+        return EXIT_FAILED, {"error": str(e), "details": e.details}, []
+    return EXIT_OK, result, rows
+
+
+def _execute_in_service(args, argv):
+    """(код, данные, строки) от службы лаунчера или None, если служба не запущена или не ответила."""
+    from launcher_service import ServiceError, connect_service
+
+    client = connect_service(args.data)
+    if client is None:
+        return None
+    with client:
+        try:
+            response = client.request("command", argv=argv, cwd=os.getcwd())
+        except (OSError, ValueError, ServiceError) as e:
+            print(f"Служба лаунчера не ответила ({e}), команда выполняется без нее.", file=sys.stderr)
+            return None
+    return response["exit"], response["result"], response["rows"]
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = build_parser().parse_args(argv)
+    outcome = None if args.local else _execute_in_service(args, argv)
+    if outcome is None:
+        # Одна команда - один запрос: поисковый индекс не строится при загрузке
+        data_manager = open_data_manager(args.data, args.storage, defer_search_index=True)
+        data_manager.load_data()
+        try:
+            outcome = execute(data_manager, args)
+        finally:
+            try:
+                data_manager.close() # Дописывает изменения и историю запусков
+            except Exception as e:
+                # Команда выполнена только в памяти - успехом это не считается
+                outcome = EXIT_FAILED, {"error": f"Не удалось сохранить данные: {e}", "details": None}, []
+    code, result, rows = outcome
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif code != EXIT_OK:
+        print(result["error"], file=sys.stderr)
+    else:
+        _print_rows(rows)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+"""
+Служба лаунчера: процесс, который держит данные загруженными и отвечает на
+запросы через сокет Unix. Повторный вызов не перечитывает launcher_data.json,
+не строит поисковый индекс заново и не загружает иконки.
+
+Службой бывает само окно (main_app) или процесс без окна (python -m launcher_service).
+У одного файла данных - одна служба: адрес сокета выводится из пути файла
+(service_address), поэтому данные меняет только один процесс. Второй запуск окна
+находит службу окна и просит ее показать окно ("show"). Служба без окна при
+запуске окна сохраняет данные и завершается ("shutdown"), и окно загружается само.
+Командная строка (launcher_cli) сначала ищет службу и выполняет команду в ней.
+
+Протокол - строки JSON в UTF-8: запрос {"op": ..., параметры}, ответ
+{"ok": true, "result": ...} или {"ok": false, "error": текст}. Операции:
+    ping - {"version", "owner": "window" или "daemon", "pid", "programs"}
+    command - {"argv": аргументы launcher_cli, "cwd": каталог клиента}: поиск,
+              запуск и остальные команды; ответ {"exit", "result", "rows"}
+    show - показать окно (только служба окна)
+    palette - открыть окно быстрого запуска (только служба окна); клиент -
+              python -m launcher_service --palette, его удобно назначить на
+              сочетание клавиш рабочего стола
+    shutdown - сохранить данные и завершиться (только служба без окна)
+Запросы обрабатывает поток-владелец менеджера данных: окно - через
+createfilehandler Tk, служба без окна - в serve_forever; других потоков нет.
+"""
+import json
+import os
+import socket
+import sys
+
+PROTOCOL_VERSION = 1
+OWNER_WINDOW = "window"
+OWNER_DAEMON = "daemon"
+CLIENT_TIMEOUT = 5.0 # Секунд ожидания ответа службы
+MAX_MESSAGE_BYTES = 1 << 20 # Самый длинный запрос, который служба примет
+RECV_SIZE = 65536
+SHUTDOWN_WAIT = 5.0 # Сколько ждать, пока служба без окна освободит адрес
+
+
+class ServiceError(Exception):
+    """Служба недоступна на этой системе, адрес занят или служба вернула ошибку."""
+
+
+def service_available():
+    return hasattr(socket, "AF_UNIX")
+
+
+def _runtime_directory():
+    """Каталог сокетов, доступный только текущему пользователю (XDG_RUNTIME_DIR или свой во временном)."""
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if directory and os.path.isdir(directory):
+        return directory
+    import tempfile
+
+    directory = os.path.join(tempfile.gettempdir(), f"launcher-{os.getuid()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(directory)
+    if status.st_uid != os.getuid() or status.st_mode & 0o077 or not os.path.isdir(directory):
+        raise ServiceError(f"Каталог {directory} доступен другим пользователям, служба не запускается.")
+    return directory
+
+
+def service_address(data_filename):
+    """Путь сокета службы для файла данных (короткий: длина адреса сокета ограничена)."""
+    import hashlib
+
+    digest = hashlib.sha1(os.path.abspath(data_filename).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_runtime_directory(), f"launcher-{digest}.sock")
+
+
+def _encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class ServiceClient:
+    """Соединение со службой; одно соединение годится для любого числа запросов."""
+
+    def __init__(self, address, timeout=CLIENT_TIMEOUT):
+        self.address = address
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(address)
+        except OSError:
+            self._socket.close()
+            raise
+        self._buffer = b""
+
+    def request(self, op, **params):
+        """Отправляет запрос и ждет ответа; ошибка службы - ServiceError, обрыв - OSError."""
+        self._socket.sendall(_encode({"op": op, **params}))
+        while b"\n" not in self._buffer:
+            chunk = self._socket.recv(RECV_SIZE)
+            if not chunk:
+                raise ConnectionError("Служба закрыла соединение.")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise ServiceError(response.get("error") or "Служба не выполнила запрос.")
+        return response.get("result")
+
+    def close(self):
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def connect_service(data_filename, timeout=CLIENT_TIMEOUT):
+    """ServiceClient службы файла данных или None, если служба не запущена."""
+    if not service_available():
+        return None
+    try:
+        return ServiceClient(service_address(data_filename), timeout)
+    except (OSError, ServiceError):
+        return None
+
+
+def hand_over_to_window(data_filename):
+    """
+    Вызывается перед запуском окна. True - окно уже открыто другим процессом
+    и показано, новое запускать не нужно. Служба без окна сохраняет данные и
+    завершается; функция ждет, пока адрес освободится, и возвращает False.
+    """
+    client = connect_service(data_filename)
+    if client is None:
+        return False
+    import time
+
+    with client:
+        try:
+            owner = client.request("ping").get("owner")
+            if owner == OWNER_WINDOW:
+                client.request("show")
+                return True
+            client.request("shutdown")
+        except (OSError, ValueError, ServiceError) as e:
+            print(f"Служба лаунчера не ответила ({e}), окно запускается отдельно.")
+            return False
+    deadline = time.monotonic() + SHUTDOWN_WAIT
+    while time.monotonic() < deadline:
+        probe = connect_service(data_filename, timeout=0.2)
+        if probe is None:
+            break
+        probe.close()
+        time.sleep(0.05)
+    return False
+
+
+class _Connection:
+    __slots__ = ("socket", "inbox", "outbox")
+
+    def __init__(self, sock):
+        self.socket = sock
+        self.inbox = b""
+        self.outbox = b""
+
+
+class LauncherService:
+    """
+    Сервер службы. data_manager и supervisor (ProcessSupervisor) - объекты
+    процесса-владельца; on_show - показать окно, on_palette - открыть окно быстрого
+    запуска (None у службы без окна); on_change(команда) вызывается после команд,
+    изменивших данные.
+    Сокеты неблокирующие, process() обрабатывает то, что уже пришло, и сразу возвращается.
+    """
+
+    def __init__(self, data_manager, supervisor=None, owner=OWNER_DAEMON, on_show=None, on_change=None, address=None,
+                 on_palette=None):
+        self.data_manager = data_manager
+        self.supervisor = supervisor
+        self.owner = owner
+        self.on_show = on_show
+        self.on_palette = on_palette
+        self.on_change = on_change
+        self.address = address
+        self.stopping = False # Клиент попросил службу без окна завершиться
+        self._listener = None
+        self._selector = None
+        self._connections = {}
+        self._command_parser = None # Разборщик аргументов launcher_cli, собирается один раз
+
+    def start(self):
+        """Занимает адрес; ServiceError, если служба этого файла данных уже работает."""
+        import selectors
+
+        if not service_available():
+            raise ServiceError("Сокеты Unix недоступны на этой системе.")
+        if self.address is None:
+            self.address = service_address(self.data_manager.filename)
+        if os.path.exists(self.address):
+            try:
+                ServiceClient(self.address, timeout=0.5).close()
+            except OSError:
+                os.unlink(self.address) # Сокет остался от процесса, который завершился аварийно
+            else:
+                raise ServiceError(f"Служба лаунчера уже работает ({self.address}).")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self.address)
+            os.chmod(self.address, 0o600)
+            listener.listen()
+        except OSError as e:
+            listener.close()
+            raise ServiceError(f"Не удалось открыть сокет службы {self.address}: {e}") from None
+        listener.setblocking(False)
+        self._listener = listener
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ)
+        return self
+
+    def fileno(self):
+        """Дескриптор, готовый к чтению, когда у службы есть работа (для createfilehandler)."""
+        return self._selector.fileno()
+
+    def process(self, timeout=0):
+        """Принимает соединения, отвечает на пришедшие запросы и дописывает ответы."""
+        import selectors
+
+        for key, events in self._selector.select(timeout):
+            if key.fileobj is self._listener:
+                self._accept()
+                continue
+            connection = self._connections.get(key.fileobj)
+            if connection is None:
+                continue
+            if events & selectors.EVENT_READ:
+                self._read(connection)
+            if events & selectors.EVENT_WRITE and connection.socket in self._connections:
+                self._flush(connection)
+
+    def serve_forever(self):
+        """Цикл службы без окна: до запроса shutdown или KeyboardInterrupt."""
+        while not self.stopping:
+            self.process(timeout=None)
+
+    def close(self):
+        for connection in list(self._connections.values()):
+            self._drop(connection)
+        if self._listener is not None:
+            self._selector.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+            self._selector.close()
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def _accept(self):
+        import selectors
+
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"Служба лаунчера: не удалось принять соединение: {e}")
+                return
+            sock.setblocking(False)
+            self._connections[sock] = _Connection(sock)
+            self._selector.register(sock, selectors.EVENT_READ)
+
+    def _read(self, connection):
+        try:
+            chunk = connection.socket.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._drop(connection)
+            return
+        connection.inbox += chunk
+        while b"\n" in connection.inbox:
+            line, connection.inbox = connection.inbox.split(b"\n", 1)
+            connection.outbox += _encode(self._handle(line))
+        if len(connection.inbox) > MAX_MESSAGE_BYTES:
+            connection.outbox += _encode({"ok": False, "error": "Слишком длинный запрос."})
+            connection.inbox = b""
+        self._flush(connection)
+
+    def _flush(self, connection):
+        import selectors
+
+        if connection.outbox:
+            try:
+                sent = connection.socket.send(connection.outbox)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                self._drop(connection)
+                return
+            connection.outbox = connection.outbox[sent:]
+        # Ждем готовности к записи, только пока ответ не ушел целиком
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if connection.outbox else 0)
+        if self._selector.get_key(connection.socket).events != events:
+            self._selector.modify(connection.socket, events)
+
+    def _drop(self, connection):
+        self._connections.pop(connection.socket, None)
+        try:
+            self._selector.unregister(connection.socket)
+        except (KeyError, ValueError):
+            pass
+        connection.socket.close()
+
+    def _handle(self, line):
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            handler = self._HANDLERS.get(op)
+            if handler is None:
+                return {"ok": False, "error": f"Неизвестная операция: {op}"}
+            return {"ok": True, "result": handler(self, request)}
+        except ServiceError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            print(f"Служба лаунчера: ошибка запроса: {e}")
+            return {"ok": False, "error": f"Ошибка службы: {e}"}
+
+    def _ping(self, request):
+        return {"version": PROTOCOL_VERSION, "owner": self.owner, "pid": os.getpid(),
+                "programs": self.data_manager.count_programs()}
+
+    def _command(self, request):
+        import launcher_cli
+
+        argv = request.get("argv")
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            raise ServiceError("argv - список строк.")
+        if self._command_parser is None:
+            self._command_parser = launcher_cli.build_parser()
+        try:
+            args = self._command_parser.parse_args(argv)
+        except SystemExit:
+            raise ServiceError(f"Неверные аргументы команды: {' '.join(argv)}") from None
+        code, result, rows = launcher_cli.execute(self.data_manager, args, request.get("cwd"), self.supervisor)
+        if code == launcher_cli.EXIT_OK and args.command in launcher_cli.MODIFYING_COMMANDS and self.on_change is not None:
+            self.on_change(args.command)
+        return {"exit": code, "result": result, "rows": rows}
+
+    def _show(self, request):
+        if self.on_show is None:
+            raise ServiceError("У службы нет окна.")
+        self.on_show()
+        return None
+
+    def _palette(self, request):
+        if self.on_palette is None:
+            raise ServiceError("У службы нет окна.")
+        self.on_palette()
+        return None
+
+    def _shutdown(self, request):
+        if self.owner == OWNER_WINDOW:
+            raise ServiceError("Окно лаунчера закрывается только пользователем.")
+        self.stopping = True
+        return None
+
+    _HANDLERS = {"ping": _ping, "command": _command, "show": _show, "palette": _palette, "shutdown": _shutdown}
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def open_palette(data_filename):
+    """Просит окно лаунчера открыть быстрый запуск; код выхода для --palette."""
+    client = connect_service(data_filename)
+    if client is None:
+        print("Окно лаунчера не запущено.", file=sys.stderr)
+        return 1
+    with client:
+        try:
+            client.request("palette")
+        except (OSError, ValueError, ServiceError) as e:
+            print(f"Быстрый запуск не открыт: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m launcher_service", description="Служба лаунчера без окна: данные и поисковый индекс остаются в памяти")
+    parser.add_argument("--data", default="launcher_data.json", help="файл данных лаунчера (по умолчанию launcher_data.json)")
+    parser.add_argument("--storage", choices=("json", "journal", "sqlite"), help="хранилище (по умолчанию из LAUNCHER_STORAGE)")
+    parser.add_argument("--palette", action="store_true", help="открыть быстрый запуск в окне лаунчера и выйти")
+    args = parser.parse_args(argv)
+    if args.palette:
+        return open_palette(args.data)
+    import signal
+
+    from data_manager import open_data_manager
+    from process_supervisor import ProcessSupervisor, log_directory_for
+
+    data_manager = open_data_manager(args.data, args.storage)
+    data_manager.load_data()
+    supervisor = ProcessSupervisor(log_directory_for(data_manager.filename))
+    service = LauncherService(data_manager, supervisor)
+    try:
+        service.start()
+    except ServiceError as e:
+        print(e, file=sys.stderr)
+        data_manager.close()
+        return 1
+    # SIGTERM завершает службу так же, как Ctrl+C: с сохранением данных
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"Служба лаунчера: {service.address}", flush=True)
+    code = 0
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        try:
+            data_manager.save_data()
+            data_manager.close()
+        except Exception as e:
+            print(f"Не удалось сохранить данные: {e}", file=sys.stderr)
+            code = 1
+        supervisor.close()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,134 @@
+from startup_timeline import StartupTimeline
+# Хронология запуска отсчитывается от начала импорта main_app (см. --startup-timeline)
+STARTUP_TIMELINE = StartupTimeline()
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import subprocess
 import os
 import sys
-import webbrowser 
-import json 
-import shlex # Добавлен для корректной обработки аргументов с пробелами
+import time
+import queue
+from collections import OrderedDict
+# webbrowser, shlex, concurrent.futures, prewarm, PIL и icoextract импортируются при первом использовании
 
 # Импортируем модули, которые мы создали
 try:
-    from data_manager import DataManager
+    from data_manager import RECENT_CATEGORY, open_data_manager, sort_programs
 except ImportError:
     messagebox.showerror("Ошибка", "Не найден файл data_manager.py. Убедитесь, что он находится в той же папке.")
     sys.exit()
 
+from virtual_list import VirtualTreeview
+from file_watcher import FileWatcher
+from folder_scanner import FolderScan, application_directories
+from launcher_archive import ArchiveExport, ArchiveImport, zstd_available
+from quick_launcher import QuickLauncher
+from launcher_service import OWNER_WINDOW, LauncherService, ServiceError, hand_over_to_window, service_available
+from path_health import HEALTH_CHECK_INTERVAL, PATH_OK, PATH_UNREACHABLE, PathHealthChecker
+from process_supervisor import ProcessSupervisor, log_directory_for
+from program_launcher import (
+    DEFAULT_GROUP_PARALLELISM, DEFAULT_GROUP_STAGGER, GroupLaunch, LaunchError,
+    format_cpu_list, format_env_lines, launch_plan, normalize_profile, parse_cpu_list, parse_env_lines
+)
+
 try:
-    from icon_extractor import get_icon_from_exe
+    from icon_extractor import load_icon_image, photo_image_from_pil, file_signature, IconCache, icon_cache_path_for
 except ImportError:
     messagebox.showwarning("Предупреждение", "Не найден файл icon_extractor.py или произошла ошибка при импорте. Иконки не будут отображаться.")
-    def get_icon_from_exe(path, size=(32, 32)):
+    IconCache = None
+    def load_icon_image(path, size=(32, 32), cache=None, signature=None):
+        return None
+    def photo_image_from_pil(pil_image):
+        return None
+    def file_signature(path):
         return None
 
+# Цвета заглушек иконок по типу элемента, пока настоящая иконка грузится в фоне
+PLACEHOLDER_ICON_COLORS = {
+    "exe": "#007ACC",
+    "script": "#3C9A5F",
+    "document": "#C8A23C",
+    "link": "#8A5CC8",
+    "folder": "#B07A3C",
+}
+DATA_FILENAME = "launcher_data.json"
+ICON_SIZE = (32, 32)
+ICON_WORKERS = 4
+ICON_MEMORY_LIMIT = 512 # Сколько иконок держать в памяти (последние показанные)
+PROGRAM_ROW_HEIGHT = ICON_SIZE[1] + 4
+ICON_POLL_INTERVAL_MS = 30
+GLOBAL_SEARCH_LIMIT = 200
+LOAD_POLL_INTERVAL_MS = 15 # Как часто забирать категории, загруженные в фоне
+HOTKEY_POLL_INTERVAL_MS = 30 # Как часто проверять глобальное сочетание быстрого запуска
+FIRST_PAINT_TIMEOUT_MS = 1000 # Иконки начинают грузиться не позже, даже если окно не отрисовалось
+RUNNING_PANEL_REFRESH_MS = 1000 # Как часто обновлять панель запущенных программ
+GROUP_LAUNCH_POLL_MS = 100 # Как часто забирать результаты группового запуска
+PATH_HEALTH_POLL_MS = 1000 # Как часто смотреть, не изменились ли результаты проверки путей
+PATH_CHECK_POLL_MS = 20 # Как часто смотреть, проверен ли путь, который только что ввели
+FILE_CHANGES_POLL_MS = 500 # Как часто забирать изменения файлов программ
+FOLDER_SCAN_POLL_MS = 50 # Как часто забирать программы, найденные обходом папок
+FOLDER_SCAN_ADD_BATCH = 200 # Программ в одной пачке add_programs
+FOLDER_SCAN_TICK_BUDGET = 0.025 # Сколько секунд за один тик можно добавлять программы, не подвешивая окно
+ARCHIVE_POLL_MS = 20 # Пауза между шагами экспорта и импорта
+ARCHIVE_TICK_BUDGET = 0.05 # Сколько секунд за один шаг можно писать или импортировать
+BROKEN_CATEGORY = "Недоступные" # Псевдо-категория программ с ненайденным или недоступным путем
+BROKEN_ROW_COLOR = "#FF6B6B"
+SYSTEM_CATEGORIES = ("Избранное", RECENT_CATEGORY, BROKEN_CATEGORY) # Нельзя создать, переименовать или удалить
+
+# Варианты сортировки списка программ: подпись -> (ключ data_manager.SORT_KEYS
+# или SCORED_SORT_KEYS, по убыванию)
+SORT_OPTIONS = {
+    "Имя (А-Я)": ("name", False),
+    "Имя (Я-А)": ("name", True),
+    "Тип (А-Я)": ("type", False),
+    "Тип (Я-А)": ("type", True),
+    "Часто используемые": ("frecency", False),
+    "Недавно запущенные": ("recent", False),
+}
+
 try:
-    from system_integrator import open_file_location
+    from system_integrator import open_file_location, focus_process_window, GlobalHotkey
 except ImportError:
+    GlobalHotkey = None
     messagebox.showwarning("Предупреждение", "Не найден файл system_integrator.py или произошла ошибка при импорте. Функции системной интеграции могут быть недоступны.")
     def open_file_location(path):
         messagebox.showerror("Ошибка", "Функция 'Открыть расположение файла' недоступна. Не найден system_integrator.py.")
+    def focus_process_window(pid):
+        return False
+
+STARTUP_TIMELINE.mark("импорт модулей")
 
 class AppLauncher:
-    def __init__(self, master):
+    def __init__(self, master, timeline=None, capture_output=False):
+        """capture_output - сохранять stdout/stderr запущенных программ в журналы (каталог logs)."""
         self.master = master
         self.master.title("Мой Многофункциональный Лаунчер")
+        self.timeline = timeline or StartupTimeline()
         
-        self.data_manager = DataManager("launcher_data.json")
-        self.data_manager.load_data()
+        # Хранилище (JSON, журнал или SQLite) выбирается переменной окружения LAUNCHER_STORAGE
+        self.data_manager = open_data_manager(DATA_FILENAME)
+        # Сразу читаются настройки и последняя категория, остальные категории догружаются в фоне
+        self.data_manager.load_data(defer_categories=True)
+        self.timeline.mark("загрузка данных")
+
+        # Запущенные программы: код выхода, время работы, ЦП и память собирает фоновый поток
+        self.process_supervisor = ProcessSupervisor(log_directory_for(self.data_manager.filename), capture_output=capture_output)
+        self.running_panel = None
+        # Заготовки теплого запуска Python-программ (prewarm.WarmPool), создаются при первой нужде
+        self.warm_pool = None
+        self.group_launch_settings = (DEFAULT_GROUP_PARALLELISM, DEFAULT_GROUP_STAGGER) # (в волне, пауза в секундах)
+        # Пути программ проверяются в фоне; интерфейс смотрит только в кэш проверки, не на диск
+        self.path_health = PathHealthChecker()
+        self.path_health_generation = 0
+        self.path_health_targets_time = None
+        # Изменения файлов программ на диске (inotify или опрос) - обновляются только затронутые строки
+        self.file_watcher = FileWatcher()
+        # Служба окна (launcher_service): командная строка и повторный запуск обращаются к этому процессу
+        self.service = None
+        # Окно быстрого запуска создается после первой отрисовки; глобальное сочетание - только в Windows
+        self.quick_launcher = None
+        self.global_hotkey = None
 
         saved_geometry = self.data_manager.get_window_geometry()
         if saved_geometry:
@@ -42,7 +136,24 @@ class AppLauncher:
         else:
             self.master.geometry("1000x600")
 
-        self.icon_references = {} 
+        # path -> (сигнатура файла, PhotoImage) в порядке последнего показа, не больше ICON_MEMORY_LIMIT
+        self.icon_references = OrderedDict()
+        # Постоянный кэш иконок рядом с launcher_data.json (открывается вместе с пулом загрузки)
+        self.icon_cache = None
+        self.placeholder_icons = {}
+
+        # Фоновая загрузка иконок: воркеры декодируют PIL-изображения,
+        # поток Tk забирает результаты из очереди через after().
+        # Пул создается при первой иконке, а иконки запрашиваются после первой отрисовки окна
+        self.icon_executor = None
+        self.icons_started = False
+        self.icon_results = queue.Queue()
+        self.icon_jobs = {} # path -> Future
+        self.icon_wanted_paths = set() # Пути строк в окне списка (с запасом), для которых нужны иконки
+        self.revalidated_icon_paths = set() # Иконки, уже перепроверенные после смены категории
+        self.program_rows = [] # [(словарь программы, категория)] текущей категории в порядке сортировки
+        self.showing_global_results = False
+        self.icon_poll_scheduled = False
 
         self.style = ttk.Style()
         self.style.theme_use("clam")
@@ -57,6 +168,7 @@ class AppLauncher:
                              foreground="white", 
                              fieldbackground="#2a2a2a", 
                              bordercolor="#333333",
+                             rowheight=PROGRAM_ROW_HEIGHT,
                              font=("Segoe UI", 10))
         self.style.map("Dark.Treeview", 
                        background=[('selected', '#007ACC')],
@@ -146,7 +258,7 @@ class AppLauncher:
         self.sort_label = ttk.Label(self.search_and_sort_frame, text="Сортировка:", style="Dark.TLabel")
         self.sort_label.grid(row=0, column=2, padx=(10, 5), sticky="w")
 
-        self.sort_options = ["Имя (А-Я)", "Имя (Я-А)", "Тип (А-Я)", "Тип (Я-А)"]
+        self.sort_options = list(SORT_OPTIONS)
         self.sort_var = tk.StringVar(self.search_and_sort_frame)
         self.sort_var.set(self.sort_options[0]) 
         self.sort_var.trace("w", self.on_sort_change) 
@@ -159,17 +271,36 @@ class AppLauncher:
                                           style="Dark.TEntry") 
         self.sort_combobox.grid(row=0, column=3, padx=(0, 5), sticky="e") # sticky="e" для прижимания к правому краю
 
-        self.programs_treeview = ttk.Treeview(self.programs_frame, style="Dark.Treeview", show="tree headings")
+        # Нечеткий поиск сразу по всем категориям и избранному
+        self.global_search_var = tk.BooleanVar(self.search_and_sort_frame, value=False)
+        self.global_search_checkbutton = tk.Checkbutton(self.search_and_sort_frame, 
+                                                        text="Во всех категориях", 
+                                                        variable=self.global_search_var, 
+                                                        command=self.filter_programs,
+                                                        bg="#1a1a1a", fg="white", selectcolor="#333333",
+                                                        activebackground="#1a1a1a", activeforeground="white",
+                                                        font=("Segoe UI", 10))
+        self.global_search_checkbutton.grid(row=0, column=4, padx=(5, 0), sticky="e")
+
+        # Виртуальный список: в дереве живут только строки, видимые в окне
+        self.program_list = VirtualTreeview(self.programs_frame,
+                                            render_row=self._render_program_row,
+                                            row_height=PROGRAM_ROW_HEIGHT,
+                                            on_select=self.on_program_select,
+                                            on_viewport_change=self._on_program_viewport_change,
+                                            frame_style="Dark.TFrame",
+                                            style="Dark.Treeview", show="tree headings")
+        self.program_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5) # Список всегда должен растягиваться
+        self.programs_treeview = self.program_list.tree
         self.programs_treeview.heading("#0", text="Название программы", anchor=tk.W)
-        self.programs_treeview.pack(fill=tk.BOTH, expand=True, padx=5, pady=5) # Treeview всегда должен растягиваться
-        self.programs_treeview.bind("<<TreeviewSelect>>", self.on_program_select)
+        self.programs_treeview.tag_configure("broken", foreground=BROKEN_ROW_COLOR)
         self.programs_treeview.bind("<Double-1>", self.run_selected_program)
         self.programs_treeview.bind("<Button-3>", self._on_program_right_click)
 
         # Фреймы кнопок - используем grid, чтобы они правильно выстраивались и растягивались
         self.program_buttons_frame = ttk.Frame(self.programs_frame, style="Dark.TFrame")
         self.program_buttons_frame.pack(fill=tk.X, pady=5) # pack для фрейма кнопок
-        for i in range(4): self.program_buttons_frame.grid_columnconfigure(i, weight=1) # Все колонки с кнопками должны растягиваться
+        for i in range(6): self.program_buttons_frame.grid_columnconfigure(i, weight=1) # Все колонки с кнопками должны растягиваться
 
         self.add_program_button = ttk.Button(self.program_buttons_frame, text="Добавить", command=self.add_program, style="Blue.TButton")
         self.add_program_button.grid(row=0, column=0, padx=2, sticky="ew") # sticky="ew" для кнопок
@@ -183,9 +314,15 @@ class AppLauncher:
         self.delete_program_button = ttk.Button(self.program_buttons_frame, text="Удалить", command=self.delete_program, style="Blue.TButton")
         self.delete_program_button.grid(row=0, column=3, padx=2, sticky="ew")
 
+        self.group_launch_button = ttk.Button(self.program_buttons_frame, text="Запустить группу", command=self.launch_program_group, style="Blue.TButton")
+        self.group_launch_button.grid(row=0, column=4, padx=2, sticky="ew")
+
+        self.scan_folders_button = ttk.Button(self.program_buttons_frame, text="Добавить из папок", command=self.scan_folders, style="Blue.TButton")
+        self.scan_folders_button.grid(row=0, column=5, padx=2, sticky="ew")
+
         self.favorite_buttons_frame = ttk.Frame(self.programs_frame, style="Dark.TFrame")
         self.favorite_buttons_frame.pack(fill=tk.X, pady=5) # pack для фрейма кнопок
-        for i in range(3): self.favorite_buttons_frame.grid_columnconfigure(i, weight=1) # Все колонки с кнопками должны растягиваться
+        for i in range(4): self.favorite_buttons_frame.grid_columnconfigure(i, weight=1) # Все колонки с кнопками должны растягиваться
 
         self.add_favorite_button = ttk.Button(self.favorite_buttons_frame, text="Добавить в Избранное", command=self.add_selected_to_favorites, style="Blue.TButton")
         self.add_favorite_button.grid(row=0, column=0, padx=2, sticky="ew")
@@ -197,6 +334,9 @@ class AppLauncher:
         self.open_location_button.grid(row=0, column=2, padx=2, sticky="ew")
         self.open_location_button.config(state=tk.DISABLED)
 
+        self.running_panel_button = ttk.Button(self.favorite_buttons_frame, text="Запущенные", command=self.show_running_panel, style="Blue.TButton")
+        self.running_panel_button.grid(row=0, column=3, padx=2, sticky="ew")
+
         # Фрейм для деталей программы
         self.details_frame = ttk.Frame(self.program_details_paned_window, style="Dark.TFrame")
         self.program_details_paned_window.add(self.details_frame, weight=1) # Weight 1, чтобы детали занимали меньше места
@@ -204,6 +344,123 @@ class AppLauncher:
         self.details_label = ttk.Label(self.details_frame, text="Детали программы", style="Dark.TLabel", font=("Segoe UI", 12, "bold"))
         self.details_label.pack(pady=5)
         
+        # Поля деталей создаются после первой отрисовки или при первом выборе программы
+        self.details_form_frame = None
+
+        self.selected_program_path_for_details = None
+
+        self.display_categories()
+        
+        last_category = self.data_manager.get_last_selected_category()
+        if last_category:
+            try:
+                index = self._listed_categories().index(last_category)
+                self.categories_listbox.selection_set(index)
+                self.categories_listbox.activate(index)
+                self.on_category_select()
+            except ValueError:
+                pass
+
+        self.update_program_details_ui()
+
+        if self.data_manager.is_loading():
+            self.master.after(LOAD_POLL_INTERVAL_MS, self._poll_background_load)
+
+        self.programs_treeview.bind("<Expose>", self._on_first_expose, "+")
+        self.master.after(FIRST_PAINT_TIMEOUT_MS, self._start_icon_loading)
+        self._start_service()
+        self._start_global_hotkey()
+        self.master.bind_all("<Control-space>", self.show_quick_launcher)
+        self.timeline.mark("интерфейс построен")
+
+    def _start_service(self):
+        """Открывает сокет службы; запросы обрабатываются в потоке Tk, как только приходят, без опроса."""
+        if not service_available():
+            return
+        service = LauncherService(self.data_manager, self.process_supervisor, OWNER_WINDOW,
+                                  on_show=self.show_window, on_change=self._on_service_change,
+                                  on_palette=self.show_quick_launcher)
+        try:
+            service.start()
+        except ServiceError as e:
+            print(f"Служба лаунчера не запущена: {e}")
+            return
+        self.service = service
+        self.master.tk.createfilehandler(service.fileno(), tk.READABLE, lambda fileno, mask: service.process())
+
+    def _start_global_hotkey(self):
+        """Ctrl+Alt+Пробел открывает быстрый запуск из любой программы (Windows, см. GlobalHotkey)."""
+        if GlobalHotkey is None:
+            return
+        hotkey = GlobalHotkey()
+        if not hotkey.start():
+            if sys.platform == "win32":
+                print(f"Глобальное сочетание клавиш не назначено: {hotkey.error}")
+            return
+        self.global_hotkey = hotkey
+        self.master.after(HOTKEY_POLL_INTERVAL_MS, self._poll_global_hotkey)
+
+    def _poll_global_hotkey(self):
+        if self.global_hotkey is None:
+            return
+        if self.global_hotkey.pressed():
+            self.show_quick_launcher()
+        self.master.after(HOTKEY_POLL_INTERVAL_MS, self._poll_global_hotkey)
+
+    def show_quick_launcher(self, event=None):
+        """Открывает окно быстрого запуска (Ctrl+Пробел, глобальное сочетание или python -m launcher_service --palette)."""
+        self._create_quick_launcher()
+        self.quick_launcher.show()
+        return "break"
+
+    def _create_quick_launcher(self):
+        if self.quick_launcher is None:
+            self.quick_launcher = QuickLauncher(self.master, self.data_manager, self.launch_program)
+
+    def show_window(self):
+        """Показывает окно поверх остальных (повторный запуск лаунчера)."""
+        self.master.deiconify()
+        self.master.lift()
+        self.master.attributes("-topmost", True)
+        self.master.after_idle(self.master.attributes, "-topmost", False)
+        self.master.focus_force()
+
+    def _on_service_change(self, command):
+        """Команда через службу (например, add из командной строки) изменила данные - перерисовываем."""
+        self._prune_icon_references()
+        self.display_categories()
+        self.display_programs()
+        self.update_program_details_ui()
+        self._refresh_path_health_targets()
+
+    def _on_first_expose(self, event=None):
+        if not self.icons_started:
+            # Отрисовка по Expose выполняется в idle-обработчике, поставленном раньше нашего
+            self.master.after_idle(self._on_first_paint)
+
+    def _on_first_paint(self):
+        """Окно отрисовано: достраиваем отложенные части интерфейса и начинаем грузить иконки."""
+        self.timeline.mark("первая отрисовка")
+        self._start_icon_loading()
+        # Окно быстрого запуска готовится заранее, чтобы сочетание клавиш открывало его сразу
+        self.master.after_idle(self._create_quick_launcher)
+
+    def _start_icon_loading(self):
+        if self.icons_started:
+            return
+        self.icons_started = True
+        self._build_details_panel()
+        self._on_program_viewport_change(*self.program_list.viewport())
+        self._refresh_path_health_targets()
+        self.path_health.start()
+        self.file_watcher.start()
+        self.master.after(PATH_HEALTH_POLL_MS, self._poll_path_health)
+        self.master.after(FILE_CHANGES_POLL_MS, self._poll_file_changes)
+
+    def _build_details_panel(self):
+        """Создает поля панели деталей программы (один раз)."""
+        if self.details_form_frame is not None:
+            return
         self.details_form_frame = ttk.Frame(self.details_frame, style="Dark.TFrame")
         self.details_form_frame.pack(fill=tk.X, padx=5, pady=5)
         self.details_form_frame.grid_columnconfigure(1, weight=1) # Поле ввода должно растягиваться
@@ -220,6 +477,29 @@ class AppLauncher:
 
         self.browse_working_dir_button = ttk.Button(self.details_form_frame, text="Обзор...", command=self.browse_working_directory, style="Blue.TButton")
         self.browse_working_dir_button.grid(row=1, column=2, padx=(5,0), pady=2)
+
+        launch_options_frame = ttk.Frame(self.details_form_frame, style="Dark.TFrame")
+        launch_options_frame.grid(row=2, column=0, columnspan=3, sticky="w", pady=2)
+        self.warm_var = tk.BooleanVar(launch_options_frame, value=False)
+        self.warm_checkbutton = tk.Checkbutton(launch_options_frame,
+                                               text="Теплый запуск (Python)",
+                                               variable=self.warm_var,
+                                               command=self.on_details_change,
+                                               bg="#1a1a1a", fg="white", selectcolor="#333333",
+                                               activebackground="#1a1a1a", activeforeground="white",
+                                               font=("Segoe UI", 10))
+        self.warm_checkbutton.pack(side=tk.LEFT)
+        self.single_instance_var = tk.BooleanVar(launch_options_frame, value=False)
+        self.single_instance_checkbutton = tk.Checkbutton(launch_options_frame,
+                                                          text="Один экземпляр",
+                                                          variable=self.single_instance_var,
+                                                          command=self.on_details_change,
+                                                          bg="#1a1a1a", fg="white", selectcolor="#333333",
+                                                          activebackground="#1a1a1a", activeforeground="white",
+                                                          font=("Segoe UI", 10))
+        self.single_instance_checkbutton.pack(side=tk.LEFT, padx=(10, 0))
+        self.launch_profiles_button = ttk.Button(launch_options_frame, text="Профили запуска...", command=self._show_launch_profiles_dialog, style="Blue.TButton")
+        self.launch_profiles_button.pack(side=tk.LEFT, padx=(10, 0))
         
         ttk.Label(self.details_frame, text="Заметки:", style="Dark.TLabel").pack(pady=(5,0), padx=5, anchor="w")
         self.note_text = tk.Text(self.details_frame, 
@@ -234,26 +514,96 @@ class AppLauncher:
         self.save_details_button = ttk.Button(self.details_frame, text="Сохранить детали", command=self.save_program_details, style="Blue.TButton")
         self.save_details_button.pack(pady=5)
         self.save_details_button.config(state=tk.DISABLED)
-        
-        self.selected_program_path_for_details = None
 
-        self.display_categories()
-        
-        last_category = self.data_manager.get_last_selected_category()
-        if last_category:
-            try:
-                index = self.data_manager.get_categories().index(last_category)
-                self.categories_listbox.selection_set(index)
-                self.categories_listbox.activate(index)
-                self.on_category_select()
-            except ValueError:
-                pass
+    def _poll_background_load(self):
+        """Забирает порцию категорий, загруженных в фоне, и перерисовывает текущую, если она готова."""
+        loaded_categories = self.data_manager.integrate_loaded_categories()
+        current_category = self.data_manager.get_current_category_name()
+        if current_category in loaded_categories:
+            self.display_programs()
+        if self.data_manager.is_loading():
+            self.master.after(LOAD_POLL_INTERVAL_MS, self._poll_background_load)
+        else:
+            if current_category == RECENT_CATEGORY:
+                self.display_programs() # Недавние программы могли быть в категориях, загруженных последними
+            if self.icons_started:
+                self._refresh_path_health_targets() # Иначе цели задаст _start_icon_loading
+            self.timeline.mark("все категории загружены")
+
+    def _refresh_path_health_targets(self):
+        """Передает фоновой проверке и слежению за файлами текущий список путей программ и рабочих каталогов."""
+        targets = self.data_manager.get_launch_targets()
+        self.path_health.set_targets(targets)
+        self.file_watcher.set_paths(targets)
+        self.path_health_targets_time = time.monotonic()
+
+    def _on_program_paths_changed(self, program_path, working_directory):
+        """Запись программы добавлена или изменена: проверяем ее пути и следим за ее файлом."""
+        self.path_health.request_check(program_path, working_directory)
+        self.file_watcher.add_path(program_path)
+
+    def _request_path_check(self, program_path):
+        """Перепроверяет пути программы вне очереди (после правки или неудачного запуска)."""
+        program = self.data_manager.get_program_data_by_path(program_path)
+        working_directory = program.get('working_directory', '') if program else ''
+        self.path_health.request_check(program_path, working_directory)
+
+    def _poll_path_health(self):
+        """Перерисовывает список, когда фоновая проверка нашла новые проблемы с путями (или их решение)."""
+        if self.path_health_targets_time is not None and time.monotonic() - self.path_health_targets_time >= HEALTH_CHECK_INTERVAL:
+            self._refresh_path_health_targets()
+        generation = self.path_health.generation
+        if generation != self.path_health_generation:
+            self.path_health_generation = generation
+            if self.data_manager.get_current_category_name() == BROKEN_CATEGORY and not self.showing_global_results:
+                self._refresh_broken_view()
+            else:
+                self.program_list.refresh()
+        self.master.after(PATH_HEALTH_POLL_MS, self._poll_path_health)
+
+    def _poll_file_changes(self):
+        """
+        Забирает пути программ, чьи файлы изменились на диске: сбрасывает план запуска,
+        перепроверяет пути и перечитывает иконку только этих программ и перерисовывает их строки.
+        """
+        changed = set()
+        for program_path in self.file_watcher.take_changes():
+            if not self.data_manager.note_file_changed(program_path):
+                continue
+            changed.add(program_path)
+            program = self.data_manager.get_program_data_by_path(program_path)
+            self.path_health.request_check(program_path, program.get('working_directory', ''))
+            self.revalidated_icon_paths.discard(program_path) # Вне экрана иконка перепроверится при показе
+            cached = self.icon_references.get(program_path)
+            if program_path in self.icon_wanted_paths:
+                self._request_icon(program_path, known_signature=cached[0] if cached is not None else None)
+                self.revalidated_icon_paths.add(program_path)
+        if changed:
+            self.program_list.refresh_rows(lambda row: row[0].get('path') in changed)
+        self.master.after(FILE_CHANGES_POLL_MS, self._poll_file_changes)
+
+    def _refresh_broken_view(self):
+        """Пересобирает список недоступных программ, сохраняя прокрутку и выбор, если он еще в списке."""
+        selected = self.program_list.selected_row()
+        self.program_rows = self._category_rows(BROKEN_CATEGORY)
+        search_query = self.search_entry.get().strip()
+        if search_query:
+            matched_keys = self.data_manager.search_program_keys(search_query, [program for program, _ in self.program_rows])
+            rows = [row for row in self.program_rows if self.data_manager.program_key(row[0]) in matched_keys]
+        else:
+            rows = self.program_rows
+        self.program_list.set_rows(rows, keep_position=True)
+        if selected is not None and selected not in rows:
+            self.program_list.clear_selection()
+            self.update_program_details_ui()
 
-        self.update_program_details_ui()
+    def _listed_categories(self):
+        """Категории в порядке списка: псевдо-категории недавних и недоступных, затем категории данных."""
+        return [RECENT_CATEGORY, BROKEN_CATEGORY] + self.data_manager.get_categories()
 
     def display_categories(self):
         self.categories_listbox.delete(0, tk.END)
-        for category in self.data_manager.get_categories():
+        for category in self._listed_categories():
             self.categories_listbox.insert(tk.END, category)
 
     def add_category(self):
@@ -263,13 +613,13 @@ class AppLauncher:
             if not category_name:
                 messagebox.showwarning("Предупреждение", "Название категории не может быть пустым.")
                 return
-            if category_name == "Избранное":
-                messagebox.showwarning("Предупреждение", "Категория 'Избранное' является системной и не может быть добавлена вручную.")
+            if category_name in SYSTEM_CATEGORIES:
+                messagebox.showwarning("Предупреждение", f"Категория '{category_name}' является системной и не может быть добавлена вручную.")
                 return
 
             if self.data_manager.add_category(category_name):
                 self.display_categories()
-                self.data_manager.save_data()
+                self.data_manager.schedule_save()
                 messagebox.showinfo("Успех", f"Категория '{category_name}' добавлена.")
             # else: DataManager уже показывает предупреждение
 
@@ -280,8 +630,8 @@ class AppLauncher:
             return
 
         old_name = self.categories_listbox.get(selected_index[0])
-        if old_name == "Избранное":
-            messagebox.showwarning("Предупреждение", "Категория 'Избранное' является системной и не может быть переименована.")
+        if old_name in SYSTEM_CATEGORIES:
+            messagebox.showwarning("Предупреждение", f"Категория '{old_name}' является системной и не может быть переименована.")
             return
 
         new_name = simpledialog.askstring("Переименовать категорию", f"Введите новое название для '{old_name}':", initialvalue=old_name)
@@ -291,18 +641,18 @@ class AppLauncher:
             if not new_name:
                 messagebox.showwarning("Предупреждение", "Новое название категории не может быть пустым.")
                 return
-            if new_name == "Избранное":
-                messagebox.showwarning("Предупреждение", "Нельзя переименовать категорию в 'Избранное', так как это системная категория.")
+            if new_name in SYSTEM_CATEGORIES:
+                messagebox.showwarning("Предупреждение", f"Нельзя переименовать категорию в '{new_name}', так как это системная категория.")
                 return
 
             if self.data_manager.rename_category(old_name, new_name):
                 self.display_categories()
                 try:
-                    new_index = self.data_manager.get_categories().index(new_name)
+                    new_index = self._listed_categories().index(new_name)
                     self.categories_listbox.selection_set(new_index)
                     self.categories_listbox.activate(new_index)
                     self.data_manager.set_last_selected_category(new_name)
-                    self.data_manager.save_data()
+                    self.data_manager.schedule_save()
                     self.display_programs()
                 except ValueError:
                     pass
@@ -321,17 +671,18 @@ class AppLauncher:
             return
 
         category_name = self.categories_listbox.get(selected_index[0])
-        if category_name == "Избранное":
-            messagebox.showwarning("Предупреждение", "Категория 'Избранное' является системной и не может быть удалена.")
+        if category_name in SYSTEM_CATEGORIES:
+            messagebox.showwarning("Предупреждение", f"Категория '{category_name}' является системной и не может быть удалена.")
             return
 
         confirm = messagebox.askyesno("Удалить категорию", f"Вы уверены, что хотите удалить категорию '{category_name}' и все ее программы?")
         
         if confirm:
             self.data_manager.delete_category(category_name)
+            self._prune_icon_references()
             self.display_categories()
-            self.programs_treeview.delete(*self.programs_treeview.get_children())
-            self.data_manager.save_data()
+            self._clear_program_rows()
+            self.data_manager.schedule_save()
             messagebox.showinfo("Успех", f"Категория '{category_name}' удалена.")
             self.data_manager.set_last_selected_category(None)
             self.update_program_details_ui()
@@ -345,36 +696,238 @@ class AppLauncher:
             self.display_programs()
         else:
             self.data_manager.set_current_category_name(None)
-            self.programs_treeview.delete(*self.programs_treeview.get_children())
+            self._clear_program_rows()
             self.update_program_details_ui()
 
     def display_programs(self):
-        current_category = self.data_manager.get_current_category_name()
-        
-        for item in self.programs_treeview.get_children():
-            self.programs_treeview.delete(item)
-        self.icon_references.clear()
-
-        if current_category:
-            programs = self.data_manager.get_programs_in_category(current_category)
-            
-            self._apply_sort(programs)
+        """Полностью перерисовывает список при смене категории или сортировки."""
+        self.render_programs(revalidate_icons=True)
+
+    def render_programs(self, revalidate_icons=False):
+        """
+        Единый конвейер отрисовки: один раз вычисляет отсортированный список
+        программ категории, а поиск лишь фильтрует его (см. _apply_search_filter).
+        Строки попадают в виртуальный список, который создает элементы дерева
+        и запрашивает иконки только для видимой части. При revalidate_icons
+        уже закэшированные иконки перепроверяются в фоне на изменение файла
+        по мере того, как их строки появляются на экране.
+        """
+        self.showing_global_results = False
+        if revalidate_icons:
+            self.revalidated_icon_paths = set()
+
+        self.program_rows = self._category_rows(self.data_manager.get_current_category_name())
+        self._apply_search_filter()
+
+    def _category_rows(self, category_name):
+        """Строки списка для категории: (словарь программы, категория, в которой правится запись)."""
+        programs = self._get_category_programs()
+        if category_name in (RECENT_CATEGORY, BROKEN_CATEGORY):
+            # Программы псевдо-категорий собраны из разных категорий - правка и удаление идут в исходной
+            return [(program_data, self.data_manager.get_program_category(program_data)) for program_data in programs]
+        return [(program_data, category_name) for program_data in programs]
+
+    def _render_program_row(self, row):
+        """Текст, иконка и values строки виртуального списка; без готовой иконки - заглушка по типу."""
+        program_data, category_name = row
+        program_path = program_data.get('path')
+        icon = None
+        if program_path:
+            cached = self.icon_references.get(program_path)
+            if cached is not None:
+                self.icon_references.move_to_end(program_path)
+                icon = cached[1]
+            if icon is None:
+                icon = self._get_placeholder_icon(program_data.get('type', 'exe'))
+            if self.path_health.program_problem(program_path, program_data.get('working_directory')):
+                return f"⚠ {program_data.get('name')}", icon, (program_path, category_name or ""), ("broken",)
+        return program_data.get('name'), icon, (program_path, category_name or "")
+
+    def _on_program_viewport_change(self, first, last):
+        """Ставит в загрузку иконки строк, попавших в окно списка, и отменяет ненужные."""
+        if not self.icons_started:
+            return # Повторится после первой отрисовки (см. _start_icon_loading)
+        wanted_paths = set()
+        for program_data, _ in self.program_list.rows[first:last]:
+            program_path = program_data.get('path')
+            if not program_path:
+                continue
+            wanted_paths.add(program_path)
+            cached = self.icon_references.get(program_path)
+            if cached is None:
+                self._request_icon(program_path)
+            elif program_path not in self.revalidated_icon_paths:
+                self.revalidated_icon_paths.add(program_path)
+                self._request_icon(program_path, known_signature=cached[0])
+        self.icon_wanted_paths = wanted_paths
+        self._cancel_stale_icon_jobs()
+
+    def _render_global_results(self, search_query):
+        """Показывает ранжированные результаты нечеткого поиска по всем категориям."""
+        self.showing_global_results = True
+        rows = [(program_data, category_name)
+                for _, program_data, category_name in self.data_manager.fuzzy_search(search_query, GLOBAL_SEARCH_LIMIT)]
+        self.program_list.set_rows(rows)
+        self.update_program_details_ui()
 
-            for program_data in programs:
-                program_name = program_data.get('name')
-                program_path = program_data.get('path')
-                
-                icon = None
-                if program_path:
-                    icon = get_icon_from_exe(program_path, size=(32, 32))
-                    if icon:
-                        self.icon_references[program_path] = icon 
+    def _clear_program_rows(self):
+        """Очищает список программ."""
+        self.program_rows = []
+        self.program_list.set_rows([])
+
+    def _apply_search_filter(self):
+        """
+        Показывает только строки, подходящие под поисковый запрос.
+        Отфильтрованный список просто передается виртуальному списку -
+        элементы дерева не пересоздаются, меняется лишь их содержимое.
+        """
+        search_query = self.search_entry.get().strip()
+        if search_query and self.global_search_var.get():
+            self._render_global_results(search_query)
+            return
+        if self.showing_global_results:
+            # Возврат из глобального поиска к строкам текущей категории
+            self.render_programs()
+            return
 
-                self.programs_treeview.insert("", tk.END, text=program_name, image=icon, values=(program_path,))
+        if search_query:
+            matched_keys = self.data_manager.search_program_keys(
+                search_query, [program for program, _ in self.program_rows]
+            )
+            program_key = self.data_manager.program_key
+            rows = [row for row in self.program_rows if program_key(row[0]) in matched_keys]
+        else:
+            rows = self.program_rows
+        self.program_list.set_rows(rows)
+        self.update_program_details_ui()
 
-        self.filter_programs()
-        self.programs_treeview.selection_remove(self.programs_treeview.selection())
-        self.update_program_details_ui() 
+    def _get_category_programs(self):
+        """Возвращает отсортированный список всех программ текущей категории."""
+        current_category = self.data_manager.get_current_category_name()
+        if not current_category:
+            return []
+
+        # Сортировка выполняется менеджером данных (для SQLite - прямо в запросе)
+        sort_by, descending = SORT_OPTIONS.get(self.sort_var.get(), (None, False))
+        if current_category == BROKEN_CATEGORY:
+            programs = [self.data_manager.get_program_data_by_path(path) for path in self.path_health.broken_programs()]
+            programs = [program for program in programs if program is not None]
+            return sort_programs(programs, sort_by, descending, self.data_manager.get_sort_scores(sort_by))
+        return self.data_manager.list_programs(current_category, sort_by, descending)
+
+    def _get_placeholder_icon(self, program_type):
+        """Возвращает (и создает при первом обращении) однотонную заглушку иконки для типа."""
+        icon = self.placeholder_icons.get(program_type)
+        if icon is None:
+            color = PLACEHOLDER_ICON_COLORS.get(program_type, PLACEHOLDER_ICON_COLORS["exe"])
+            icon = tk.PhotoImage(master=self.master, width=ICON_SIZE[0], height=ICON_SIZE[1])
+            icon.put(color, to=(6, 6, ICON_SIZE[0] - 6, ICON_SIZE[1] - 6))
+            self.placeholder_icons[program_type] = icon
+        return icon
+
+    def _request_icon(self, program_path, known_signature=None):
+        """Ставит загрузку иконки в очередь пула потоков, если она еще не запущена."""
+        if program_path in self.icon_jobs:
+            return
+        if self.icon_executor is None:
+            self._create_icon_executor()
+        self.icon_jobs[program_path] = self.icon_executor.submit(
+            self._load_icon_job, program_path, known_signature
+        )
+        self._schedule_icon_poll()
+
+    def _create_icon_executor(self):
+        """Пул загрузки иконок и кэш иконок на диске создаются при первой иконке, а не при старте."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.icon_executor = ThreadPoolExecutor(max_workers=ICON_WORKERS, thread_name_prefix="icon-loader")
+        self._get_icon_cache()
+
+    def _get_icon_cache(self):
+        """Кэш иконок на диске (открывается при первой нужде); None, если иконки недоступны."""
+        if self.icon_cache is None and IconCache:
+            self.icon_cache = IconCache(icon_cache_path_for(self.data_manager.filename))
+        return self.icon_cache
+
+    def _load_icon_job(self, program_path, known_signature):
+        """Выполняется в фоновом потоке: не трогает Tk, только кладет результат в очередь."""
+        signature = file_signature(program_path)
+        if known_signature is not None and signature == known_signature:
+            self.icon_results.put((program_path, signature, None, False))
+            return
+        pil_image = load_icon_image(program_path, ICON_SIZE, self.icon_cache, signature) if signature else None
+        self.icon_results.put((program_path, signature, pil_image, True))
+
+    def _cancel_stale_icon_jobs(self):
+        """Отменяет еще не начатые загрузки иконок для строк, которых больше нет на экране."""
+        for program_path, future in list(self.icon_jobs.items()):
+            if program_path not in self.icon_wanted_paths and future.cancel():
+                del self.icon_jobs[program_path]
+
+    def _schedule_icon_poll(self):
+        if not self.icon_poll_scheduled:
+            self.icon_poll_scheduled = True
+            self.master.after(ICON_POLL_INTERVAL_MS, self._process_icon_results)
+
+    def _process_icon_results(self):
+        """Забирает готовые иконки из очереди в потоке Tk и перерисовывает видимые строки."""
+        self.icon_poll_scheduled = False
+        refresh_needed = False
+        while True:
+            try:
+                program_path, signature, pil_image, changed = self.icon_results.get_nowait()
+            except queue.Empty:
+                break
+            self.icon_jobs.pop(program_path, None)
+            if not changed:
+                continue
+            if program_path not in self.icon_wanted_paths:
+                # Строка уже ушла с экрана - отбрасываем, иконка загрузится снова при появлении
+                self.icon_references.pop(program_path, None)
+                continue
+
+            icon = photo_image_from_pil(pil_image) if pil_image is not None else None
+            self._remember_icon(program_path, signature, icon)
+            refresh_needed = refresh_needed or icon is not None
+
+        if refresh_needed:
+            self.program_list.refresh()
+            self.timeline.mark("первая иконка")
+        if self.icon_jobs:
+            self._schedule_icon_poll()
+
+    def _remember_icon(self, program_path, signature, icon):
+        """Кладет иконку в кэш в памяти, вытесняя давно не показанные сверх ICON_MEMORY_LIMIT."""
+        self.icon_references[program_path] = (signature, icon)
+        self.icon_references.move_to_end(program_path)
+        while len(self.icon_references) > ICON_MEMORY_LIMIT:
+            self.icon_references.popitem(last=False)
+
+    def shutdown_background_tasks(self):
+        """Останавливает службу, загрузку иконок, проверку путей и слежение за файлами, закрывает кэш иконок, заготовки теплого запуска и надзор за процессами."""
+        if self.global_hotkey is not None:
+            self.global_hotkey.close()
+            self.global_hotkey = None
+        if self.service is not None:
+            self.master.tk.deletefilehandler(self.service.fileno())
+            self.service.close()
+            self.service = None
+        self.path_health.close()
+        self.file_watcher.close()
+        self.process_supervisor.close()
+        if self.warm_pool is not None:
+            self.warm_pool.close()
+        if self.icon_executor is not None:
+            self.icon_executor.shutdown(wait=False, cancel_futures=True)
+        if self.icon_cache:
+            self.icon_cache.close()
+
+    def _prune_icon_references(self):
+        """Удаляет из кэша в памяти иконки программ, которых больше нет в данных."""
+        known_paths = self.data_manager.get_all_program_paths()
+        for path in list(self.icon_references):
+            if path not in known_paths:
+                del self.icon_references[path]
 
     def add_program(self):
         current_category = self.data_manager.get_current_category_name()
@@ -384,6 +937,9 @@ class AppLauncher:
         if current_category == "Избранное":
             messagebox.showwarning("Предупреждение", "Программы нельзя добавлять напрямую в категорию 'Избранное'. Используйте кнопку 'Добавить в Избранное' из других категорий.")
             return
+        if current_category in (RECENT_CATEGORY, BROKEN_CATEGORY):
+            messagebox.showwarning("Предупреждение", f"Категория '{current_category}' заполняется сама. Добавьте программу в обычную категорию.")
+            return
 
         file_path = filedialog.askopenfilename(
             title="Выберите программу, файл или скрипт",
@@ -415,49 +971,465 @@ class AppLauncher:
         else:
             messagebox.showwarning("Отмена", "Добавление элемента отменено.")
 
-    def run_selected_program(self, event=None):
+    def scan_folders(self):
+        """Массовое добавление: обходит выбранные папки и добавляет найденные программы в категорию."""
+        categories = [name for name in self.data_manager.get_categories() if name not in SYSTEM_CATEGORIES]
+        if not categories:
+            messagebox.showwarning("Предупреждение", "Сначала создайте категорию, в которую добавлять программы.")
+            return
+        current_category = self.data_manager.get_current_category_name()
+        self._show_folder_scan_dialog(categories, current_category if current_category in categories else categories[0])
+
+    def _show_folder_scan_dialog(self, categories, default_category):
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Добавление программ из папок")
+        dialog.geometry("560x420")
+        dialog.configure(bg="#1a1a1a")
+        dialog.transient(self.master)
+
+        settings_frame = ttk.Frame(dialog, style="Dark.TFrame")
+        settings_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        settings_frame.grid_columnconfigure(1, weight=1)
+        ttk.Label(settings_frame, text="Категория:", style="Dark.TLabel").grid(row=0, column=0, sticky="w", pady=2)
+        category_var = tk.StringVar(dialog, value=default_category)
+        category_combobox = ttk.Combobox(settings_frame, textvariable=category_var, values=categories, state="readonly")
+        category_combobox.grid(row=0, column=1, sticky="ew", padx=(5, 0), pady=2)
+
+        ttk.Label(dialog, text="Папки:", style="Dark.TLabel").pack(anchor="w", padx=10, pady=(5, 0))
+        roots_listbox = tk.Listbox(dialog, height=6, bg="#2a2a2a", fg="white", selectbackground="#007ACC",
+                                   font=("Segoe UI", 10), exportselection=False)
+        roots_listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        roots_buttons = ttk.Frame(dialog, style="Dark.TFrame")
+        roots_buttons.pack(fill=tk.X, padx=10)
+        for i in range(3): roots_buttons.grid_columnconfigure(i, weight=1)
+
+        def add_root(directory):
+            if directory and directory not in roots_listbox.get(0, tk.END):
+                roots_listbox.insert(tk.END, directory)
+
+        def browse_root():
+            add_root(filedialog.askdirectory(title="Выберите папку с программами", parent=dialog))
+
+        def add_application_roots():
+            directories = application_directories()
+            if not directories:
+                messagebox.showinfo("Папки меню приложений", "Папки меню приложений не найдены.", parent=dialog)
+            for directory in directories:
+                add_root(directory)
+
+        def remove_root():
+            for index in reversed(roots_listbox.curselection()):
+                roots_listbox.delete(index)
+
+        add_root_button = ttk.Button(roots_buttons, text="Добавить папку...", command=browse_root, style="Blue.TButton")
+        add_root_button.grid(row=0, column=0, padx=2, sticky="ew")
+        menu_roots_button = ttk.Button(roots_buttons, text="Меню приложений", command=add_application_roots, style="Blue.TButton")
+        menu_roots_button.grid(row=0, column=1, padx=2, sticky="ew")
+        remove_root_button = ttk.Button(roots_buttons, text="Убрать", command=remove_root, style="Blue.TButton")
+        remove_root_button.grid(row=0, column=2, padx=2, sticky="ew")
+
+        status_label = ttk.Label(dialog, text="", style="Dark.TLabel")
+        status_label.pack(fill=tk.X, padx=10, pady=(5, 0))
+        action_button = ttk.Button(dialog, text="Сканировать", style="Blue.TButton")
+        action_button.pack(pady=10)
+
+        state = {"scan": None, "category": None, "added": 0, "skipped": 0}
+
+        def finish():
+            """Обход закончен или отменен: сохраняем и показываем добавленное."""
+            if state["added"]:
+                self.data_manager.schedule_save()
+                self._refresh_path_health_targets()
+                if self.data_manager.get_current_category_name() == state["category"]:
+                    self.display_programs()
+
+        def poll():
+            scan = state["scan"]
+            if not dialog.winfo_exists():
+                scan.cancel()
+                finish()
+                return
+            finished = scan.done # До poll: после done все найденное уже в очереди
+            started = time.perf_counter()
+            drained = False
+            # Пачки добавляются, пока не кончится бюджет тика, - остальное в следующий тик
+            while time.perf_counter() - started < FOLDER_SCAN_TICK_BUDGET:
+                programs = scan.poll(FOLDER_SCAN_ADD_BATCH)
+                if not programs:
+                    drained = True
+                    break
+                added = self.data_manager.add_programs(state["category"], programs)
+                state["added"] += added
+                state["skipped"] += len(programs) - added
+            progress = scan.progress()
+            status = (f"Папок: {progress.directories}, файлов: {progress.files}, "
+                      f"добавлено: {state['added']}, уже в лаунчере: {progress.duplicates + state['skipped']}")
+            if progress.errors:
+                status += f", недоступных папок: {len(progress.errors)}"
+            if finished and drained:
+                suffix = " (отменено)" if scan.cancelled else ""
+                status_label.config(text=f"Готово{suffix}. {status}")
+                action_button.config(text="Закрыть", command=dialog.destroy)
+                finish()
+                return
+            status_label.config(text=status)
+            dialog.after(FOLDER_SCAN_POLL_MS, poll)
+
+        def start():
+            roots = list(roots_listbox.get(0, tk.END))
+            if not roots:
+                messagebox.showwarning("Предупреждение", "Добавьте хотя бы одну папку.", parent=dialog)
+                return
+            category_name = category_var.get()
+            state["category"] = category_name
+            for widget in (category_combobox, add_root_button, menu_roots_button, remove_root_button):
+                widget.config(state=tk.DISABLED)
+            known_names = [program.get('name') for program in self.data_manager.get_programs_in_category(category_name)]
+            state["scan"] = FolderScan(roots, self.data_manager.get_all_program_paths(), known_names).start()
+            action_button.config(text="Отменить", command=state["scan"].cancel)
+            poll()
+
+        action_button.config(command=start)
+
+    def run_selected_program(self, event=None, profile_name=None):
+        """Запускает выбранную программу; profile_name - профиль запуска (None - профиль по умолчанию)."""
         program_data = self._get_selected_program_details()
         if not program_data:
             messagebox.showwarning("Предупреждение", "Выберите программу для запуска.")
             return
+        self.launch_program(program_data, profile_name)
 
+    def launch_program(self, program_data, profile_name=None):
+        """Запускает программу (список, быстрый запуск); ошибки и предупреждения показываются в окнах сообщений."""
         program_name = program_data['name']
         program_path = program_data['path']
-        
+        if not program_path:
+            messagebox.showwarning("Ошибка", "Путь к программе не указан.")
+            return
+
+        status = self.path_health.status(program_path)
+        if status is not None and status.state == PATH_UNREACHABLE:
+            self._request_path_check(program_path)
+            messagebox.showerror("Ошибка", f"Путь недоступен: {program_path}. Возможно, сетевой диск не отвечает.")
+            return
+        try:
+            # План запуска готов с прошлого запуска, если запись с тех пор не правили;
+            # новый план проверяет пути по кэшу фоновой проверки, а не на диске
+            plan = self.data_manager.get_launch_plan(program_path, profile_name, fs=self.path_health)
+            outcome = launch_plan(plan, self.process_supervisor, self._warm_pool_for(plan.program), fs=self.path_health)
+        except LaunchError as e:
+            self._request_path_check(program_path) # Кэш мог устареть - к следующей попытке он будет свежим
+            messagebox.showerror("Ошибка", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Ошибка запуска", f"Не удалось запустить '{program_name}': {e}")
+            import traceback
+            traceback.print_exc()
+            return
+
+        for warning in outcome.warnings:
+            messagebox.showwarning("Предупреждение", warning)
+        if outcome.already_running is not None:
+            running = outcome.already_running
+            if not focus_process_window(running.pid):
+                messagebox.showinfo("Уже запущено", f"'{program_name}' уже запущена (PID {running.pid}), но ее окно не удалось вывести на передний план.")
+            return
+        self._record_launch(outcome)
+
+    def _record_launch(self, outcome):
+        """Записывает запуск в историю (в памяти, на диск - в фоне); код выхода сообщит поток надзора."""
+        launch_record = self.data_manager.record_launch(outcome.request.path, outcome.request.arguments)
+        if outcome.process is not None and launch_record is not None:
+            history = self.data_manager.launch_history
+            self.process_supervisor.add_exit_callback(
+                outcome.process, lambda process: history.record_exit(launch_record, process.exit_code, process.end_time))
+
+    def _get_warm_pool(self):
+        if self.warm_pool is None:
+            from prewarm import WarmPool
+
+            self.warm_pool = WarmPool(self.process_supervisor)
+        return self.warm_pool
+
+    def _warm_pool_for(self, program):
+        """Пул заготовок для запуска программы: создается, только если у программы включен теплый запуск."""
+        return self._get_warm_pool() if program.get('warm') else self.warm_pool
+
+    def launch_program_group(self):
+        """Запускает выбранные программы (или весь текущий список) одной группой с общей сводкой."""
+        rows = self.program_list.selected_rows()
+        if len(rows) < 2:
+            rows = self.program_list.rows
+            if not rows:
+                messagebox.showwarning("Предупреждение", "В списке нет программ для группового запуска.")
+                return
+            if not messagebox.askyesno("Групповой запуск", f"Запустить все программы списка ({len(rows)})?"):
+                return
+        self._show_group_launch_dialog([program_data for program_data, _ in rows])
+
+    def _show_group_launch_dialog(self, programs):
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Групповой запуск")
+        dialog.geometry("520x380")
+        dialog.configure(bg="#1a1a1a")
+        dialog.transient(self.master)
+
+        settings_frame = ttk.Frame(dialog, style="Dark.TFrame")
+        settings_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Label(settings_frame, text=f"Программ: {len(programs)}", style="Dark.TLabel").grid(row=0, column=0, columnspan=2, sticky="w", pady=2)
+        ttk.Label(settings_frame, text="Одновременно запускать:", style="Dark.TLabel").grid(row=1, column=0, sticky="w", pady=2)
+        parallelism_var = tk.IntVar(dialog, value=self.group_launch_settings[0])
+        parallelism_spinbox = ttk.Spinbox(settings_frame, from_=1, to=50, textvariable=parallelism_var, width=6)
+        parallelism_spinbox.grid(row=1, column=1, sticky="w", padx=5, pady=2)
+        ttk.Label(settings_frame, text="Пауза между волнами, с:", style="Dark.TLabel").grid(row=2, column=0, sticky="w", pady=2)
+        stagger_var = tk.DoubleVar(dialog, value=self.group_launch_settings[1])
+        stagger_spinbox = ttk.Spinbox(settings_frame, from_=0, to=60, increment=0.5, textvariable=stagger_var, width=6)
+        stagger_spinbox.grid(row=2, column=1, sticky="w", padx=5, pady=2)
+
+        status_label = ttk.Label(dialog, text="", style="Dark.TLabel")
+        status_label.pack(fill=tk.X, padx=10)
+        summary_text = tk.Text(dialog, height=10, wrap=tk.WORD, bg="#333333", fg="white",
+                               borderwidth=1, relief="solid", font=("Segoe UI", 10), state=tk.DISABLED)
+        summary_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        action_button = ttk.Button(dialog, text="Запустить", style="Blue.TButton")
+        action_button.pack(pady=(0, 10))
+
+        state = {"group": None, "ok": 0, "failed": 0}
+
+        def append_line(line):
+            if not dialog.winfo_exists():
+                return
+            summary_text.config(state=tk.NORMAL)
+            summary_text.insert(tk.END, line + "\n")
+            summary_text.see(tk.END)
+            summary_text.config(state=tk.DISABLED)
+
+        def append_failure(program, error):
+            state["failed"] += 1
+            append_line(f"✗ {program.get('name') or program.get('path')}: {error}")
+
+        def poll():
+            group = state["group"]
+            finished = group.done # До poll: после done все результаты уже в очереди
+            for result in group.poll():
+                name = result.program.get('name') or result.program.get('path')
+                if not result.ok:
+                    append_failure(result.program, result.error)
+                    continue
+                state["ok"] += 1
+                if result.outcome.already_running is not None:
+                    append_line(f"✓ {name} (уже запущена, PID {result.outcome.already_running.pid})")
+                else:
+                    self._record_launch(result.outcome)
+                    append_line(f"✓ {name}")
+                for warning in result.outcome.warnings:
+                    append_line(f"   ! {warning}")
+            if not dialog.winfo_exists():
+                # Окно закрыто, но программы, запущенные до отмены, все равно попадают в историю
+                if not finished:
+                    self.master.after(GROUP_LAUNCH_POLL_MS, poll)
+                return
+            done_count = state["ok"] + state["failed"]
+            status_label.config(text=f"Запущено: {state['ok']}, ошибок: {state['failed']}, осталось: {len(programs) - done_count}")
+            if finished:
+                suffix = " (отменено)" if group.cancelled else ""
+                status_label.config(text=f"Готово{suffix}: запущено {state['ok']}, ошибок {state['failed']} из {len(programs)}")
+                action_button.config(text="Закрыть", command=dialog.destroy)
+                return
+            self.master.after(GROUP_LAUNCH_POLL_MS, poll)
+
+        def close():
+            group = state["group"]
+            if group is not None and not group.done:
+                group.cancel() # Еще не начатые запуски не нужны; начатые дочитает poll
+            dialog.destroy()
+
+        def start():
+            try:
+                parallelism = max(1, int(parallelism_var.get()))
+                stagger = max(0.0, float(stagger_var.get()))
+            except (tk.TclError, ValueError):
+                messagebox.showwarning("Предупреждение", "Укажите число программ в волне и паузу числами.", parent=dialog)
+                return
+            self.group_launch_settings = (parallelism, stagger)
+            parallelism_spinbox.config(state=tk.DISABLED)
+            stagger_spinbox.config(state=tk.DISABLED)
+            # Планы собираются здесь, в потоке интерфейса: из кэша планов, с путями по кэшу проверки
+            plans = []
+            for program in programs:
+                try:
+                    plans.append(self.data_manager.get_launch_plan(program.get('path'), fs=self.path_health))
+                except LaunchError as e:
+                    append_failure(program, str(e))
+            warm_pool = self._get_warm_pool() if any(plan.program.get('warm') for plan in plans) else self.warm_pool
+            state["group"] = GroupLaunch(plans, self.process_supervisor, warm_pool, parallelism, stagger,
+                                         fs=self.path_health).start()
+            action_button.config(text="Отменить", command=state["group"].cancel)
+            poll()
+
+        action_button.config(command=start)
+        dialog.protocol("WM_DELETE_WINDOW", close)
+
+    def _show_launch_profiles_dialog(self):
+        """Редактор профилей запуска выбранной программы."""
+        program_data = self._get_selected_program_details()
+        if not program_data:
+            messagebox.showwarning("Предупреждение", "Выберите программу, чтобы настроить профили запуска.")
+            return
+        program_path = program_data['path']
         full_program_data = self.data_manager.get_program_data_by_path(program_path)
-        arguments = full_program_data.get('arguments', '').strip() if full_program_data else ''
-        working_directory = full_program_data.get('working_directory', '').strip() if full_program_data else ''
+        if not full_program_data:
+            messagebox.showerror("Ошибка", "Не удалось получить данные о выбранной программе.")
+            return
 
-        if program_path:
+        profiles = [dict(profile) for profile in full_program_data.get('profiles') or ()]
+        active_profile = full_program_data.get('active_profile')
+        current = {"index": None}
+
+        dialog = tk.Toplevel(self.master)
+        dialog.title(f"Профили запуска: {program_data['name']}")
+        dialog.geometry("640x420")
+        dialog.configure(bg="#1a1a1a")
+        dialog.transient(self.master)
+        dialog.grab_set()
+
+        list_frame = ttk.Frame(dialog, style="Dark.TFrame")
+        list_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
+        profiles_listbox = tk.Listbox(list_frame, bg="#2a2a2a", fg="white", selectbackground="#007ACC",
+                                      font=("Segoe UI", 10), exportselection=False, width=22)
+        profiles_listbox.pack(fill=tk.BOTH, expand=True)
+
+        form = ttk.Frame(dialog, style="Dark.TFrame")
+        form.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10), pady=10)
+        form.grid_columnconfigure(1, weight=1)
+        entries = {}
+        for row, (field, label) in enumerate((("name", "Имя профиля:"), ("arguments", "Аргументы:"),
+                                               ("working_directory", "Рабочий каталог:"),
+                                               ("nice", "Приоритет (nice):"), ("affinity", "Процессоры (0,2-3):"))):
+            ttk.Label(form, text=label, style="Dark.TLabel").grid(row=row, column=0, sticky="w", pady=2)
+            entries[field] = ttk.Entry(form, style="Dark.TEntry")
+            entries[field].grid(row=row, column=1, sticky="ew", padx=(5, 0), pady=2)
+        ttk.Label(form, text="Окружение (ИМЯ=значение, -ИМЯ):", style="Dark.TLabel").grid(row=5, column=0, columnspan=2, sticky="w", pady=(6, 2))
+        env_text = tk.Text(form, height=6, wrap=tk.NONE, bg="#333333", fg="white", insertbackground="white",
+                           borderwidth=1, relief="solid", font=("Consolas", 10))
+        env_text.grid(row=6, column=0, columnspan=2, sticky="nsew")
+        form.grid_rowconfigure(6, weight=1)
+        default_var = tk.BooleanVar(dialog, value=False)
+        tk.Checkbutton(form, text="Профиль по умолчанию", variable=default_var,
+                       bg="#1a1a1a", fg="white", selectcolor="#333333",
+                       activebackground="#1a1a1a", activeforeground="white",
+                       font=("Segoe UI", 10)).grid(row=7, column=0, columnspan=2, sticky="w", pady=2)
+
+        def refresh_list(select=None):
+            profiles_listbox.delete(0, tk.END)
+            for profile in profiles:
+                marker = " (по умолчанию)" if profile['name'] == active_profile else ""
+                profiles_listbox.insert(tk.END, profile['name'] + marker)
+            if select is not None and profiles:
+                profiles_listbox.selection_set(select)
+                show_profile(select)
+
+        def show_profile(index):
+            current["index"] = index
+            profile = profiles[index]
+            for field, entry in entries.items():
+                entry.delete(0, tk.END)
+            entries["name"].insert(0, profile.get('name', ''))
+            entries["arguments"].insert(0, profile.get('arguments', ''))
+            entries["working_directory"].insert(0, profile.get('working_directory', ''))
+            entries["nice"].insert(0, "" if profile.get('nice') is None else str(profile['nice']))
+            entries["affinity"].insert(0, format_cpu_list(profile.get('affinity')))
+            env_text.delete("1.0", tk.END)
+            env_text.insert("1.0", format_env_lines(profile.get('env')))
+            default_var.set(profile.get('name') == active_profile)
+
+        def apply_form():
+            """Переносит поля формы в текущий профиль; False - если в них ошибка."""
+            nonlocal active_profile
+            index = current["index"]
+            if index is None:
+                return True
             try:
-                if not os.path.exists(program_path):
-                    messagebox.showerror("Ошибка", f"Файл не найден: {program_path}. Возможно, он был перемещен или удален.")
-                    return
-                
-                command = [program_path]
-                if arguments:
-                    args_list = shlex.split(arguments) # Используем shlex для корректного парсинга
-                    command.extend(args_list)
-
-                if working_directory and not os.path.isdir(working_directory):
-                    messagebox.showwarning("Предупреждение", f"Указанный рабочий каталог не существует или недоступен: {working_directory}. Запуск будет выполнен из текущего каталога.")
-                    working_directory = None 
-
-                if program_path.lower().endswith(".exe") or program_path.lower().endswith((".py", ".bat", ".ps1")):
-                    subprocess.Popen(command, cwd=working_directory if working_directory else None)
-                elif program_path.lower().endswith(".url"):
-                     webbrowser.open(program_path)
-                else:
-                    if arguments or working_directory:
-                         messagebox.showwarning("Предупреждение", "Аргументы и рабочий каталог поддерживаются только для исполняемых файлов/скриптов. Будет открыт только файл.")
-                    os.startfile(program_path)
-
-            except Exception as e:
-                messagebox.showerror("Ошибка запуска", f"Не удалось запустить '{program_name}': {e}")
-                import traceback
-                traceback.print_exc()
-        else:
-            messagebox.showwarning("Ошибка", "Путь к программе не указан.")
+                profile = normalize_profile({
+                    "name": entries["name"].get(),
+                    "arguments": entries["arguments"].get(),
+                    "working_directory": entries["working_directory"].get(),
+                    "nice": entries["nice"].get().strip(),
+                    "affinity": parse_cpu_list(entries["affinity"].get()),
+                    "env": parse_env_lines(env_text.get("1.0", tk.END)),
+                })
+            except ValueError as e:
+                messagebox.showwarning("Предупреждение", str(e), parent=dialog)
+                return False
+            if any(other['name'] == profile['name'] for i, other in enumerate(profiles) if i != index):
+                messagebox.showwarning("Предупреждение", f"Профиль '{profile['name']}' уже есть.", parent=dialog)
+                return False
+            old_name = profiles[index]['name']
+            profiles[index] = profile
+            if default_var.get():
+                active_profile = profile['name']
+            elif active_profile in (old_name, profile['name']):
+                active_profile = None
+            return True
+
+        def on_list_select(event=None):
+            selection = profiles_listbox.curselection()
+            if not selection or selection[0] == current["index"]:
+                return
+            if not apply_form():
+                profiles_listbox.selection_clear(0, tk.END)
+                profiles_listbox.selection_set(current["index"])
+                return
+            refresh_list(selection[0])
+
+        def add_profile():
+            if not apply_form():
+                return
+            name = "Профиль"
+            number = 1
+            while any(profile['name'] == name for profile in profiles):
+                number += 1
+                name = f"Профиль {number}"
+            profiles.append(normalize_profile({"name": name}))
+            refresh_list(len(profiles) - 1)
+
+        def delete_profile():
+            nonlocal active_profile
+            index = current["index"]
+            if index is None:
+                return
+            if profiles[index]['name'] == active_profile:
+                active_profile = None
+            del profiles[index]
+            current["index"] = None
+            for entry in entries.values():
+                entry.delete(0, tk.END)
+            env_text.delete("1.0", tk.END)
+            default_var.set(False)
+            refresh_list(min(index, len(profiles) - 1) if profiles else None)
+
+        def save():
+            if not apply_form():
+                return
+            if self.data_manager.set_launch_profiles(program_path, profiles, active_profile):
+                self.data_manager.schedule_save()
+                dialog.destroy()
+            else:
+                messagebox.showerror("Ошибка", "Не удалось сохранить профили запуска.", parent=dialog)
+
+        profiles_listbox.bind("<<ListboxSelect>>", on_list_select)
+        list_buttons = ttk.Frame(list_frame, style="Dark.TFrame")
+        list_buttons.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(list_buttons, text="Новый", command=add_profile, style="Blue.TButton").pack(side=tk.LEFT, expand=True, padx=2)
+        ttk.Button(list_buttons, text="Удалить", command=delete_profile, style="Blue.TButton").pack(side=tk.LEFT, expand=True, padx=2)
+
+        dialog_buttons = ttk.Frame(form, style="Dark.TFrame")
+        dialog_buttons.grid(row=8, column=0, columnspan=2, sticky="e", pady=(8, 0))
+        ttk.Button(dialog_buttons, text="Сохранить", command=save, style="Blue.TButton").pack(side=tk.LEFT, padx=2)
+        ttk.Button(dialog_buttons, text="Отмена", command=dialog.destroy, style="Blue.TButton").pack(side=tk.LEFT, padx=2)
+
+        refresh_list(0 if profiles else None)
 
     def rename_program(self):
         program_data = self._get_selected_program_details()
@@ -468,7 +1440,7 @@ class AppLauncher:
         old_name = program_data['name']
         program_path = program_data['path']
 
-        current_category = self.data_manager.get_current_category_name()
+        current_category = program_data['category']
         if current_category == "Избранное":
             messagebox.showwarning("Предупреждение", "Переименование программ в категории 'Избранное' не поддерживается. Переименуйте её в исходной категории.")
             return
@@ -495,7 +1467,7 @@ class AppLauncher:
         program_name = program_data['name']
         program_path = program_data['path']
 
-        current_category = self.data_manager.get_current_category_name()
+        current_category = program_data['category']
         if current_category == "Избранное":
             messagebox.showwarning("Предупреждение", "Программы не могут быть удалены из категории 'Избранное' таким способом. Используйте кнопку 'Удалить из Избранного'.")
             return
@@ -507,8 +1479,9 @@ class AppLauncher:
                 if self.data_manager.is_favorite(program_path):
                     self.data_manager.remove_favorite(program_path)
 
+                self._prune_icon_references()
                 self.display_programs()
-                self.data_manager.save_data()
+                self.data_manager.schedule_save()
                 messagebox.showinfo("Успех", f"Программа '{program_name}' удалена.")
             else:
                 messagebox.showerror("Ошибка", "Не удалось удалить программу.")
@@ -518,15 +1491,23 @@ class AppLauncher:
 
     def update_program_details_ui(self):
         program_data = self._get_selected_program_details()
+        if program_data:
+            self._build_details_panel()
         
-        self.args_entry.config(state=tk.DISABLED)
-        self.working_dir_entry.config(state=tk.DISABLED)
-        self.browse_working_dir_button.config(state=tk.DISABLED)
-        self.note_text.config(state=tk.DISABLED)
-        self.save_details_button.config(state=tk.DISABLED)
-        self.args_entry.delete(0, tk.END)
-        self.working_dir_entry.delete(0, tk.END)
-        self.note_text.delete("1.0", tk.END)
+        if self.details_form_frame is not None:
+            self.args_entry.config(state=tk.DISABLED)
+            self.working_dir_entry.config(state=tk.DISABLED)
+            self.browse_working_dir_button.config(state=tk.DISABLED)
+            self.warm_checkbutton.config(state=tk.DISABLED)
+            self.single_instance_checkbutton.config(state=tk.DISABLED)
+            self.launch_profiles_button.config(state=tk.DISABLED)
+            self.note_text.config(state=tk.DISABLED)
+            self.save_details_button.config(state=tk.DISABLED)
+            self.warm_var.set(False)
+            self.single_instance_var.set(False)
+            self.args_entry.delete(0, tk.END)
+            self.working_dir_entry.delete(0, tk.END)
+            self.note_text.delete("1.0", tk.END)
 
         if program_data:
             self.selected_program_path_for_details = program_data['path']
@@ -536,11 +1517,20 @@ class AppLauncher:
                 self.args_entry.config(state=tk.NORMAL)
                 self.working_dir_entry.config(state=tk.NORMAL)
                 self.browse_working_dir_button.config(state=tk.NORMAL)
+                self.single_instance_checkbutton.config(state=tk.NORMAL)
+                self.launch_profiles_button.config(state=tk.NORMAL)
                 self.note_text.config(state=tk.NORMAL)
 
                 self.args_entry.insert(0, program_full_data.get('arguments', ''))
                 self.working_dir_entry.insert(0, program_full_data.get('working_directory', ''))
                 self.note_text.insert("1.0", program_full_data.get('note', ''))
+                self.single_instance_var.set(bool(program_full_data.get('single_instance')))
+                if self.selected_program_path_for_details.lower().endswith((".py", ".pyw")):
+                    self.warm_checkbutton.config(state=tk.NORMAL)
+                    self.warm_var.set(bool(program_full_data.get('warm')))
+                    if program_full_data.get('warm'):
+                        # Пока пользователь выбирает программу, заготовка успевает стартовать
+                        self._get_warm_pool().prepare(self.selected_program_path_for_details, program_full_data.get('name'))
                 
             self.add_favorite_button.config(state=tk.NORMAL)
             self.remove_favorite_button.config(state=tk.NORMAL)
@@ -549,7 +1539,7 @@ class AppLauncher:
             else:
                 self.remove_favorite_button.config(state=tk.DISABLED)
             
-            if self.selected_program_path_for_details and os.path.exists(self.selected_program_path_for_details):
+            if self.selected_program_path_for_details and self.path_health.exists(self.selected_program_path_for_details):
                 self.open_location_button.config(state=tk.NORMAL)
             else:
                 self.open_location_button.config(state=tk.DISABLED)
@@ -560,6 +1550,26 @@ class AppLauncher:
             self.remove_favorite_button.config(state=tk.DISABLED)
             self.open_location_button.config(state=tk.DISABLED)
 
+    def _check_paths_then(self, paths, callback):
+        """
+        Проверяет введенные пути в пуле проверки путей, не останавливая окно
+        (каждый - не дольше таймаута его диска), и вызывает callback({путь: PathStatus}).
+        """
+        checks = {path: self.path_health.start_check(path) for path in set(paths) if path}
+
+        def poll():
+            statuses = {path: check.poll() for path, check in checks.items()}
+            if any(status is None for status in statuses.values()):
+                self.master.after(PATH_CHECK_POLL_MS, poll)
+                return
+            callback(statuses)
+
+        poll()
+
+    @staticmethod
+    def _is_directory(status):
+        return status.state == PATH_OK and status.is_dir
+
     def on_details_change(self, event=None):
         self.save_details_button.config(state=tk.NORMAL)
 
@@ -568,30 +1578,46 @@ class AppLauncher:
             messagebox.showwarning("Предупреждение", "Выберите программу для сохранения деталей.")
             return
         
+        program_path = self.selected_program_path_for_details
         new_note = self.note_text.get("1.0", tk.END).strip()
         new_arguments = self.args_entry.get().strip()
         new_working_directory = self.working_dir_entry.get().strip()
+        new_warm = self.warm_var.get()
+        new_single_instance = self.single_instance_var.get()
+        self.save_details_button.config(state=tk.DISABLED) # Пока проверяется рабочий каталог
 
-        if new_working_directory and not os.path.isdir(new_working_directory):
-            confirm = messagebox.askyesno(
-                "Рабочий каталог не найден", 
-                f"Указанный рабочий каталог '{new_working_directory}' не существует. Сохранить все равно?", 
-                icon='warning'
-            )
-            if not confirm:
-                return 
-
-        if self.data_manager.update_program_details_with_full_data(
-            self.selected_program_path_for_details, 
-            note=new_note, 
-            arguments=new_arguments, 
-            working_directory=new_working_directory
-        ):
-            self.data_manager.save_data()
-            messagebox.showinfo("Успех", "Детали программы сохранены.")
-            self.save_details_button.config(state=tk.DISABLED)
-        else:
-            messagebox.showerror("Ошибка", "Не удалось сохранить детали программы.")
+        def finish(statuses):
+            if new_working_directory and not self._is_directory(statuses[new_working_directory]):
+                confirm = messagebox.askyesno(
+                    "Рабочий каталог не найден", 
+                    f"Указанный рабочий каталог '{new_working_directory}' не существует. Сохранить все равно?", 
+                    icon='warning'
+                )
+                if not confirm:
+                    self.save_details_button.config(state=tk.NORMAL)
+                    return 
+
+            if self.data_manager.update_program_details_with_full_data(
+                program_path, 
+                note=new_note, 
+                arguments=new_arguments, 
+                working_directory=new_working_directory,
+                warm=new_warm,
+                single_instance=new_single_instance
+            ):
+                if new_warm:
+                    program_full_data = self.data_manager.get_program_data_by_path(program_path)
+                    self._get_warm_pool().prepare(program_path, program_full_data.get('name') if program_full_data else None)
+                elif self.warm_pool is not None:
+                    self.warm_pool.discard(program_path)
+                self._on_program_paths_changed(program_path, new_working_directory)
+                self.data_manager.schedule_save()
+                messagebox.showinfo("Успех", "Детали программы сохранены.")
+            else:
+                self.save_details_button.config(state=tk.NORMAL)
+                messagebox.showerror("Ошибка", "Не удалось сохранить детали программы.")
+
+        self._check_paths_then([new_working_directory], finish)
 
     def browse_working_directory(self):
         directory = filedialog.askdirectory(title="Выберите рабочий каталог")
@@ -613,7 +1639,7 @@ class AppLauncher:
         
         if program_full_data:
             if self.data_manager.add_favorite(program_full_data):
-                self.data_manager.save_data()
+                self.data_manager.schedule_save()
                 messagebox.showinfo("Успех", f"'{program_name}' добавлен в Избранное.")
                 self.update_program_details_ui()
             else:
@@ -631,7 +1657,7 @@ class AppLauncher:
         program_path = program_data['path']
 
         if self.data_manager.remove_favorite(program_path):
-            self.data_manager.save_data()
+            self.data_manager.schedule_save()
             messagebox.showinfo("Успех", f"'{program_name}' удален из Избранного.")
             
             if self.data_manager.get_current_category_name() == "Избранное":
@@ -651,58 +1677,127 @@ class AppLauncher:
         else:
             messagebox.showwarning("Предупреждение", "Путь к выбранной программе не указан.")
 
-    def filter_programs(self, event=None):
-        search_query = self.search_entry.get().lower()
-        current_category = self.data_manager.get_current_category_name()
-        
-        for item in self.programs_treeview.get_children():
-            self.programs_treeview.delete(item)
-        self.icon_references.clear()
+    def show_running_panel(self):
+        """Окно с программами, запущенными из лаунчера, и недавно завершившимися."""
+        if self.running_panel is not None and self.running_panel.winfo_exists():
+            self.running_panel.deiconify()
+            self.running_panel.lift()
+            return
 
-        if current_category:
-            if current_category == "Избранное":
-                programs_to_filter = self.data_manager.get_favorites()
+        panel = tk.Toplevel(self.master)
+        panel.title("Запущенные программы")
+        panel.geometry("760x320")
+        panel.configure(bg="#1a1a1a")
+        panel.transient(self.master)
+        self.running_panel = panel
+        self.running_panel_items = {} # id элемента дерева -> SupervisedProcess
+
+        columns = ("pid", "status", "time", "cpu", "memory")
+        self.running_treeview = ttk.Treeview(panel, columns=columns, show="tree headings", selectmode="browse", style="Dark.Treeview")
+        self.running_treeview.heading("#0", text="Программа", anchor=tk.W)
+        for column, title, width in (("pid", "PID", 70), ("status", "Состояние", 130), ("time", "Время работы", 100),
+                                     ("cpu", "ЦП, %", 70), ("memory", "Память, МБ", 90)):
+            self.running_treeview.heading(column, text=title, anchor=tk.W)
+            self.running_treeview.column(column, width=width, stretch=False, anchor=tk.W)
+        self.running_treeview.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.running_treeview.bind("<<TreeviewSelect>>", lambda event: self._update_running_panel_buttons())
+
+        buttons_frame = ttk.Frame(panel, style="Dark.TFrame")
+        buttons_frame.pack(fill=tk.X, padx=5, pady=5)
+        for i in range(3): buttons_frame.grid_columnconfigure(i, weight=1)
+        self.terminate_process_button = ttk.Button(buttons_frame, text="Завершить", command=self.terminate_selected_process, style="Blue.TButton")
+        self.terminate_process_button.grid(row=0, column=0, padx=2, sticky="ew")
+        self.open_process_log_button = ttk.Button(buttons_frame, text="Журнал вывода", command=self.open_selected_process_log, style="Blue.TButton")
+        self.open_process_log_button.grid(row=0, column=1, padx=2, sticky="ew")
+        clear_button = ttk.Button(buttons_frame, text="Очистить завершенные", command=self.clear_finished_processes, style="Blue.TButton")
+        clear_button.grid(row=0, column=2, padx=2, sticky="ew")
+
+        self._poll_running_panel()
+
+    def _poll_running_panel(self):
+        """Обновляет панель запущенных программ раз в RUNNING_PANEL_REFRESH_MS, пока окно открыто."""
+        if self.running_panel is None or not self.running_panel.winfo_exists():
+            self.running_panel = None
+            return
+        self._render_running_panel()
+        self.running_panel.after(RUNNING_PANEL_REFRESH_MS, self._poll_running_panel)
+
+    def _render_running_panel(self):
+        """Перерисовывает строки панели: сначала работающие программы, затем недавно завершившиеся."""
+        supervisor = self.process_supervisor
+        processes = supervisor.running() + supervisor.finished()
+        wanted = {str(id(process)): process for process in processes}
+        for item_id in list(self.running_panel_items):
+            if item_id not in wanted:
+                self.running_treeview.delete(item_id)
+                del self.running_panel_items[item_id]
+
+        now = time.time()
+        for index, (item_id, process) in enumerate(wanted.items()):
+            status = "работает" if process.running else f"завершен, код {process.exit_code}"
+            seconds = int(process.wall_time(now))
+            values = (
+                process.pid,
+                status,
+                f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}",
+                f"{process.cpu_percent:.1f}" if process.running and process.cpu_percent is not None else "-",
+                f"{process.memory_bytes / (1024 * 1024):.1f}" if process.running and process.memory_bytes is not None else "-",
+            )
+            if item_id in self.running_panel_items:
+                self.running_treeview.item(item_id, values=values)
+                self.running_treeview.move(item_id, "", index)
             else:
-                programs_to_filter = self.data_manager.get_programs_in_category(current_category)
+                self.running_treeview.insert("", index, iid=item_id, text=process.name, values=values)
+                self.running_panel_items[item_id] = process
 
-            filtered_programs = []
-            for program_data in programs_to_filter:
-                program_name = program_data.get('name', '').lower()
-                if search_query in program_name:
-                    filtered_programs.append(program_data)
-            
-            self._apply_sort(filtered_programs)
+        self._update_running_panel_buttons()
 
-            for program_data in filtered_programs:
-                program_name = program_data.get('name')
-                program_path = program_data.get('path')
-                
-                icon = None
-                if program_path:
-                    icon = get_icon_from_exe(program_path, size=(32, 32))
-                    if icon:
-                        self.icon_references[program_path] = icon 
+    def _get_selected_process(self):
+        selection = self.running_treeview.selection()
+        return self.running_panel_items.get(selection[0]) if selection else None
 
-                self.programs_treeview.insert("", tk.END, text=program_name, image=icon, values=(program_path,))
+    def _update_running_panel_buttons(self):
+        process = self._get_selected_process()
+        self.terminate_process_button.config(state=tk.NORMAL if process and process.running else tk.DISABLED)
+        self.open_process_log_button.config(state=tk.NORMAL if process and process.log_filename else tk.DISABLED)
 
-        self.programs_treeview.selection_remove(self.programs_treeview.selection())
-        self.update_program_details_ui()
+    def terminate_selected_process(self):
+        process = self._get_selected_process()
+        if not process or not process.running:
+            return
+        if messagebox.askyesno("Завершить программу", f"Завершить '{process.name}' (PID {process.pid})?", parent=self.running_panel):
+            if not self.process_supervisor.terminate(process):
+                messagebox.showerror("Ошибка", f"Не удалось завершить '{process.name}'.", parent=self.running_panel)
+
+    def open_selected_process_log(self):
+        process = self._get_selected_process()
+        if process and process.log_filename:
+            open_file_location(process.log_filename)
+
+    def clear_finished_processes(self):
+        self.process_supervisor.clear_finished()
+        self._render_running_panel()
+
+    def filter_programs(self, event=None):
+        self._apply_search_filter()
 
     def _get_selected_program_details(self):
-        selected_item = self.programs_treeview.selection()
-        if not selected_item:
+        selected_row = self.program_list.selected_row()
+        if not selected_row:
             return None
         
-        item_id = selected_item[0]
-        program_name = self.programs_treeview.item(item_id, "text")
-        program_path = self.programs_treeview.item(item_id, "values")[0]
+        program_data, category_name = selected_row
+        # Категория строки: в глобальном поиске она может отличаться от выбранной
+        if not category_name:
+            category_name = self.data_manager.get_current_category_name()
         
-        return {'id': item_id, 'name': program_name, 'path': program_path}
+        return {'id': self.program_list.selected_index, 'name': program_data.get('name'),
+                'path': program_data.get('path'), 'category': category_name}
 
     def _on_program_right_click(self, event):
-        item_id = self.programs_treeview.identify_row(event.y)
-        if item_id:
-            self.programs_treeview.selection_set(item_id)
+        row_index = self.program_list.index_at(event.y)
+        if row_index is not None:
+            self.program_list.select_index(row_index)
             self.on_program_select()
 
         program_data = self._get_selected_program_details()
@@ -711,15 +1806,28 @@ class AppLauncher:
 
         menu.add_command(label="Запустить программу", command=self.run_selected_program, 
                           state=tk.NORMAL if program_data else tk.DISABLED)
+        profiles = []
+        if program_data:
+            full_program_data = self.data_manager.get_program_data_by_path(program_data['path'])
+            profiles = (full_program_data.get('profiles') or []) if full_program_data else []
+        if profiles:
+            profiles_menu = tk.Menu(menu, tearoff=0)
+            for profile in profiles:
+                profiles_menu.add_command(label=profile['name'],
+                                          command=lambda name=profile['name']: self.run_selected_program(profile_name=name))
+            menu.add_cascade(label="Запустить с профилем", menu=profiles_menu)
+        selected_count = len(self.program_list.selected_indices)
+        if selected_count > 1:
+            menu.add_command(label=f"Запустить выбранные ({selected_count})", command=self.launch_program_group)
         menu.add_command(label="Открыть расположение файла", command=self.open_selected_file_location,
-                          state=tk.NORMAL if program_data and program_data['path'] and os.path.exists(program_data['path']) else tk.DISABLED)
+                          state=tk.NORMAL if program_data and program_data['path'] and self.path_health.exists(program_data['path']) else tk.DISABLED)
         
         menu.add_separator() 
 
         menu.add_command(label="Редактировать", command=self.edit_program_from_context,
-                          state=tk.NORMAL if program_data and self.data_manager.get_current_category_name() != "Избранное" else tk.DISABLED)
+                          state=tk.NORMAL if program_data and program_data['category'] != "Избранное" else tk.DISABLED)
         
-        current_category = self.data_manager.get_current_category_name()
+        current_category = program_data['category'] if program_data else self.data_manager.get_current_category_name()
         if program_data and current_category != "Избранное":
             menu.add_command(label="Переименовать", command=self.rename_program) 
         else:
@@ -772,7 +1880,7 @@ class AppLauncher:
             messagebox.showwarning("Предупреждение", "Выберите программу для редактирования.")
             return
         
-        current_category = self.data_manager.get_current_category_name()
+        current_category = program_data['category']
         if current_category == "Избранное":
             messagebox.showwarning("Предупреждение", "Программы в категории 'Избранное' не могут быть отредактированы напрямую. Редактируйте их в исходной категории.")
             return
@@ -873,7 +1981,15 @@ class AppLauncher:
                 messagebox.showwarning("Предупреждение", "Путь к файлу не может быть пустым.", parent=dialog)
                 return
             
-            if not os.path.exists(new_path):
+            save_button.config(state=tk.DISABLED) # Пока проверяются введенные пути
+            self._check_paths_then([new_path, new_working_directory],
+                                   lambda statuses: finish(statuses, new_name, new_path, new_arguments, new_working_directory))
+
+        def finish(statuses, new_name, new_path, new_arguments, new_working_directory):
+            if not dialog.winfo_exists():
+                return # Диалог закрыли, пока шла проверка
+            save_button.config(state=tk.NORMAL)
+            if statuses[new_path].state != PATH_OK:
                 confirm_missing_path = messagebox.askyesno(
                     "Путь к файлу не найден", 
                     f"Указанный путь '{new_path}' не существует. Продолжить сохранение?", 
@@ -882,7 +1998,7 @@ class AppLauncher:
                 if not confirm_missing_path:
                     return
 
-            if new_working_directory and not os.path.isdir(new_working_directory):
+            if new_working_directory and not self._is_directory(statuses[new_working_directory]):
                  confirm_missing_wd = messagebox.askyesno(
                     "Рабочий каталог не найден", 
                     f"Указанный рабочий каталог '{new_working_directory}' не существует. Сохранить все равно?", 
@@ -903,7 +2019,10 @@ class AppLauncher:
                         arguments=new_arguments,
                         working_directory=new_working_directory
                     )
-                    self.data_manager.save_data()
+                    self._on_program_paths_changed(new_path, new_working_directory)
+                    self.data_manager.schedule_save()
+                    if new_path != program_path:
+                        self._prune_icon_references()
                     self.display_programs()
                     messagebox.showinfo("Успех", "Данные программы обновлены.", parent=dialog)
                     dialog.destroy()
@@ -915,7 +2034,7 @@ class AppLauncher:
                     item_type = "document"
                 elif new_path.lower().endswith((".url", ".lnk")):
                     item_type = "link"
-                elif os.path.isdir(new_path):
+                elif self._is_directory(statuses[new_path]):
                     item_type = "folder"
                 elif new_path.lower().endswith((".py", ".bat", ".ps1")):
                     item_type = "script"
@@ -928,8 +2047,9 @@ class AppLauncher:
                     arguments=new_arguments, 
                     working_directory=new_working_directory
                 ):
+                    self._on_program_paths_changed(new_path, new_working_directory)
                     self.display_programs()
-                    self.data_manager.save_data()
+                    self.data_manager.schedule_save()
                     messagebox.showinfo("Успех", f"'{new_name}' добавлен в категорию '{current_category}'.", parent=dialog)
                     dialog.destroy()
                 else:
@@ -951,86 +2071,155 @@ class AppLauncher:
     def on_sort_change(self, *args):
         self.display_programs()
 
-    def _apply_sort(self, programs_list):
-        sort_option = self.sort_var.get()
-
-        if sort_option == "Имя (А-Я)":
-            programs_list.sort(key=lambda x: x.get('name', '').lower())
-        elif sort_option == "Имя (Я-А)":
-            programs_list.sort(key=lambda x: x.get('name', '').lower(), reverse=True)
-        elif sort_option == "Тип (А-Я)":
-            programs_list.sort(key=lambda x: (x.get('type', '').lower(), x.get('name', '').lower()))
-        elif sort_option == "Тип (Я-А)":
-            programs_list.sort(key=lambda x: (x.get('type', '').lower(), x.get('name', '').lower()), reverse=True)
-
     def export_data(self):
+        filetypes = [("JSON files", "*.json"), ("Архив с иконками (gzip)", "*.json.gz")]
+        if zstd_available():
+            filetypes.append(("Архив с иконками (zstd)", "*.json.zst"))
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            filetypes=filetypes + [("All files", "*.*")],
             title="Сохранить данные лаунчера как..."
         )
-        if file_path:
-            try:
-                all_data = self.data_manager.get_all_data() 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(all_data, f, ensure_ascii=False, indent=4)
+        if not file_path:
+            return
+        try:
+            export = ArchiveExport(self.data_manager, file_path, self._get_icon_cache())
+        except Exception as e:
+            messagebox.showerror("Ошибка экспорта", f"Не удалось экспортировать данные: {e}")
+            return
+
+        def done(export):
+            if export.error:
+                messagebox.showerror("Ошибка экспорта", f"Не удалось экспортировать данные: {export.error}")
+            elif not export.cancelled:
                 messagebox.showinfo("Экспорт данных", f"Данные успешно экспортированы в:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка экспорта", f"Не удалось экспортировать данные: {e}")
+
+        self._run_archive_task("Экспорт данных", export, lambda export: f"Записано программ: {export.written}", done)
 
     def import_data(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            filetypes=[("Данные лаунчера", "*.json *.json.gz *.json.zst"), ("All files", "*.*")],
             title="Выбрать файл для импорта данных"
         )
-        if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    imported_data = json.load(f)
-                
-                if not isinstance(imported_data, dict) or "categories" not in imported_data:
-                    messagebox.showerror("Ошибка импорта", "Выбранный файл не является допустимым файлом данных лаунчера.")
-                    return
-
-                response = messagebox.askyesnocancel(
-                    "Стратегия импорта",
-                    "Вы хотите заменить текущие данные импортированными данными (Да), "
-                    "объединить их (Нет), или отменить (Отмена)?\n\n"
-                    "Да: Все текущие категории и программы будут удалены и заменены данными из файла.\n"
-                    "Нет: Новые категории и программы будут добавлены, существующие будут обновлены, но ничего не будет удалено.",
-                    icon='question'
-                )
+        if not file_path:
+            return
+        response = messagebox.askyesnocancel(
+            "Стратегия импорта",
+            "Вы хотите заменить текущие данные импортированными данными (Да), "
+            "объединить их (Нет), или отменить (Отмена)?\n\n"
+            "Да: Все текущие категории и программы будут удалены и заменены данными из файла.\n"
+            "Нет: Новые категории и программы будут добавлены, существующие будут обновлены, но ничего не будет удалено.",
+            icon='question'
+        )
+        if response is True:
+            strategy = "replace"
+        elif response is False:
+            strategy = "merge"
+        else:
+            messagebox.showinfo("Импорт данных", "Импорт отменен.")
+            return
 
-                if response is True: 
-                    strategy = "replace"
-                elif response is False: 
-                    strategy = "merge"
-                else: 
-                    messagebox.showinfo("Импорт данных", "Импорт отменен.")
-                    return
-                
-                self.data_manager.import_all_data(imported_data, strategy)
-                self.data_manager.save_data()
-                
-                self.display_categories()
-                self.display_programs()
-                self.update_program_details_ui()
+        def checked(dry_run):
+            """Проверка прошла: показываем, что изменится, и применяем после подтверждения."""
+            if dry_run.cancelled:
+                return
+            if dry_run.error:
+                messagebox.showerror("Ошибка импорта", dry_run.error)
+                return
+            details = dry_run.diff.summary()
+            if dry_run.diff.errors:
+                details += "\n\nПервые ошибки:\n" + "\n".join(dry_run.diff.errors[:5])
+            if not messagebox.askokcancel("Импорт данных", f"{details}\n\nИмпортировать?"):
+                messagebox.showinfo("Импорт данных", "Импорт отменен.")
+                return
+            archive_import = ArchiveImport(self.data_manager, file_path, strategy, dry_run=False,
+                                           icon_cache=self._get_icon_cache()).start()
+            self._run_archive_task("Импорт данных", archive_import,
+                                   lambda task: f"Импортировано записей: {task.records}", imported)
+
+        def imported(archive_import):
+            # Сохраняется только завершенный импорт; "replace" при отмене или ошибке данных не трогает,
+            # а уже примененные пачки "merge" остаются в памяти и перерисовываются
+            if not archive_import.error and not archive_import.cancelled:
+                self.data_manager.schedule_save()
+            self._prune_icon_references()
+            self.display_categories()
+            self.display_programs()
+            self.update_program_details_ui()
+            self._refresh_path_health_targets()
+            if archive_import.error:
+                messagebox.showerror("Ошибка импорта", f"Импорт прерван: {archive_import.error}")
+            elif archive_import.cancelled:
+                messagebox.showinfo("Импорт данных", f"Импорт отменен, импортировано записей: {archive_import.records}.")
+            else:
                 messagebox.showinfo("Импорт данных", "Данные успешно импортированы и обновлены.")
 
-            except json.JSONDecodeError:
-                messagebox.showerror("Ошибка импорта", "Выбранный файл имеет неверный формат JSON.")
-            except Exception as e:
-                messagebox.showerror("Ошибка импорта", f"Не удалось импортировать данные: {e}")
+        dry_run = ArchiveImport(self.data_manager, file_path, strategy, dry_run=True).start()
+        self._run_archive_task("Проверка файла импорта", dry_run, lambda task: f"Проверено записей: {task.records}", checked)
+
+    def _run_archive_task(self, title, task, describe, on_done):
+        """
+        Выполняет экспорт или импорт (ArchiveExport, ArchiveImport) шагами по ARCHIVE_TICK_BUDGET
+        в окне хода с кнопкой отмены; по окончании или отмене вызывается on_done(task).
+        """
+        dialog = tk.Toplevel(self.master)
+        dialog.title(title)
+        dialog.geometry("360x110")
+        dialog.configure(bg="#1a1a1a")
+        dialog.transient(self.master)
+        dialog.grab_set() # Данные не должны меняться, пока идет экспорт или импорт
+        status_label = ttk.Label(dialog, text="", style="Dark.TLabel")
+        status_label.pack(fill=tk.X, padx=10, pady=10)
+        def cancel():
+            task.cancel()
+            dialog.destroy()
+            on_done(task)
+
+        ttk.Button(dialog, text="Отменить", command=cancel, style="Blue.TButton").pack(pady=(0, 10))
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
+
+        def step():
+            if task.cancelled:
+                return
+            finished = task.step(ARCHIVE_TICK_BUDGET)
+            status_label.config(text=describe(task))
+            if finished:
+                dialog.destroy()
+                on_done(task)
+                return
+            dialog.after(ARCHIVE_POLL_MS, step)
+
+        step()
 
 def main():
+    parser = argparse.ArgumentParser(description="Мой Многофункциональный Лаунчер")
+    parser.add_argument("--startup-timeline", action="store_true",
+                        help="печатать хронологию запуска: импорт, загрузка данных, первая отрисовка, первая иконка")
+    parser.add_argument("--capture-output", action="store_true",
+                        help="сохранять stdout/stderr запущенных программ в журналы в каталоге logs")
+    args = parser.parse_args()
+    if hand_over_to_window(DATA_FILENAME):
+        return # Окно уже открыто другим процессом и показано
+    if args.startup_timeline:
+        STARTUP_TIMELINE.echo = True
+        print(STARTUP_TIMELINE.report())
+
     root = tk.Tk()
-    app = AppLauncher(root)
-    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root, app.data_manager))
+    app = AppLauncher(root, timeline=STARTUP_TIMELINE, capture_output=args.capture_output)
+    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root, app))
     root.mainloop()
 
-def on_closing(root, data_manager):
+def on_closing(root, app):
+    data_manager = app.data_manager
     data_manager.set_window_geometry(root.winfo_geometry())
-    data_manager.save_data()
+    try:
+        data_manager.save_data() # Синхронно: заменяет отложенное фоновое сохранение
+        data_manager.close()
+    except Exception as e:
+        # Окно остается открытым, чтобы данные не пропали: можно освободить место и закрыть снова
+        messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить данные: {e}\n\nЛаунчер не будет закрыт.")
+        return
+    app.shutdown_background_tasks()
     root.destroy()
 
 if __name__ == "__main__":
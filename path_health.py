@@ -0,0 +1,385 @@
+"""
+Фоновая проверка путей программ и их рабочих каталогов.
+Поток "path-health" раз в HEALTH_CHECK_INTERVAL секунд проверяет все пути
+в пуле потоков и кладет результат в кэш со сроком жизни HEALTH_TTL.
+Интерфейс спрашивает только кэш (status, program_problem) и сам диск не трогает,
+поэтому недоступный сетевой диск не подвешивает окно.
+
+Пути группируются по точкам монтирования (диск Windows, сетевая папка
+\\\\сервер\\папка, точка монтирования из /proc/mounts). Сначала каждая точка
+проверяется одним stat с таймаутом (свой для каждой точки, см. mount_timeouts):
+не ответившая точка помечается недоступной целиком, и ее пути не занимают
+потоки пула, пока тот stat не вернется. Пути отвечающих точек проверяются пачками;
+пачка, не уложившаяся в таймаут точки, тоже помечает свои пути недоступными.
+"""
+import errno
+import os
+import sys
+import threading
+import time
+
+HEALTH_CHECK_INTERVAL = 300.0 # Как часто перепроверять все пути, секунд
+HEALTH_TTL = 900.0 # Сколько результат проверки считается верным, секунд
+MOUNT_TIMEOUT = 2.0 # Сколько ждать ответа точки монтирования, секунд
+HEALTH_WORKERS = 8
+HEALTH_BATCH = 256 # Путей в одной задаче пула
+
+PATH_OK = "ok"
+PATH_MISSING = "missing"
+PATH_UNREACHABLE = "unreachable"
+
+_MISSING_ERRNOS = (errno.ENOENT, errno.ENOTDIR)
+
+
+class PathStatus:
+    """Результат проверки пути: state - PATH_*, is_dir - каталог ли это, checked_at - time.monotonic()."""
+    __slots__ = ("state", "is_dir", "checked_at")
+
+    def __init__(self, state, is_dir=False, checked_at=0.0):
+        self.state = state
+        self.is_dir = is_dir
+        self.checked_at = checked_at
+
+
+def stat_path(path):
+    """Проверяет путь на диске: (состояние PATH_*, каталог ли это)."""
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        if e.errno in _MISSING_ERRNOS:
+            return PATH_MISSING, False
+        return PATH_UNREACHABLE, False
+    except ValueError: # Недопустимые символы в пути
+        return PATH_MISSING, False
+    import stat
+
+    return PATH_OK, stat.S_ISDIR(st.st_mode)
+
+
+class PendingCheck:
+    """
+    Проверка одного пути, начатая PathHealthChecker.start_check. poll() возвращает
+    PathStatus, когда ответ есть, иначе None; точка монтирования, не ответившая
+    за свой таймаут, дает PATH_UNREACHABLE. Результат попадает в кэш проверки.
+    """
+
+    def __init__(self, checker, path, mount, future, deadline):
+        self.path = path
+        self.status = None
+        self._checker = checker
+        self._mount = mount
+        self._future = future
+        self._deadline = deadline
+
+    def poll(self):
+        if self.status is not None:
+            return self.status
+        if self._future is not None and self._future.done():
+            state, is_dir = self._future.result()
+        elif self._future is None or time.monotonic() >= self._deadline:
+            if self._future is not None:
+                self._checker._mark_stuck(self._mount, self._future)
+            state, is_dir = PATH_UNREACHABLE, False
+        else:
+            return None
+        now = time.monotonic()
+        with self._checker._lock:
+            self._checker._put(self.path, state, is_dir, now)
+        self.status = PathStatus(state, is_dir, now)
+        return self.status
+
+
+def read_mount_points():
+    """Точки монтирования из /proc/mounts (самые длинные первыми); пустой список, если их не узнать."""
+    try:
+        with open("/proc/mounts", "rb") as f:
+            lines = f.read().decode("utf-8", "replace").splitlines()
+    except OSError:
+        return []
+    mounts = set()
+    for line in lines:
+        fields = line.split()
+        if len(fields) > 1:
+            mounts.add(fields[1].replace("\\040", " "))
+    return sorted(mounts, key=len, reverse=True)
+
+
+def mount_point_for(path, mount_points=()):
+    """
+    Точка монтирования пути без обращения к диску: диск или сетевая папка на Windows,
+    самая длинная подходящая точка из mount_points, иначе первый каталог пути.
+    """
+    drive, rest = os.path.splitdrive(path)
+    if drive:
+        return drive.lower() if sys.platform == "win32" else drive
+    for mount in mount_points:
+        if path == mount or path.startswith(mount.rstrip("/") + "/"):
+            return mount
+    parts = rest.split(os.sep)
+    if len(parts) > 2 and parts[0] == "":
+        return os.sep + parts[1]
+    return os.sep
+
+
+class PathHealthChecker:
+    """
+    Кэш состояния путей с фоновой перепроверкой. set_targets задает, что проверять;
+    request_check - перепроверить отдельные пути сейчас же (например, после правки записи).
+    Чтение кэша (status, program_problem, broken_programs) - из любого потока и без диска.
+    """
+
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL, ttl=HEALTH_TTL, timeout=MOUNT_TIMEOUT,
+                 mount_timeouts=None, workers=HEALTH_WORKERS):
+        """mount_timeouts - таймауты отдельных точек монтирования (точка -> секунд)."""
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.mount_timeouts = dict(mount_timeouts or {})
+        self.workers = workers
+        self.generation = 0 # Растет при каждом изменении кэша - интерфейс перерисовывается по нему
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._targets = {} # путь программы -> рабочий каталог ("" - нет)
+        self._statuses = {} # путь -> PathStatus
+        self._urgent = set() # Пути, которые нужно проверить вне очереди
+        self._full_check_due = True
+        self._stuck_mounts = set() # Точки, чей пробный stat еще не вернулся
+        self._mount_points = None
+        self._executor = None
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="path-health", daemon=True)
+                self._thread.start()
+        return self
+
+    def set_targets(self, targets):
+        """Задает проверяемые программы: словарь путь программы -> рабочий каталог."""
+        with self._wakeup:
+            self._targets = dict(targets)
+            self._full_check_due = True
+            self._wakeup.notify()
+
+    def request_check(self, program_path, working_directory=""):
+        """Добавляет программу к проверяемым и проверяет ее пути вне очереди."""
+        with self._wakeup:
+            self._targets[program_path] = working_directory or ""
+            self._urgent.add(program_path)
+            if working_directory:
+                self._urgent.add(working_directory)
+            self._wakeup.notify()
+
+    def timeout_for(self, mount):
+        return self.mount_timeouts.get(mount, self.timeout)
+
+    def start_check(self, path):
+        """
+        Начинает проверку пути сейчас же, в пуле, и сразу возвращает PendingCheck -
+        для того, что пользователь только что ввел. Поток интерфейса не ждет диск,
+        а опрашивает PendingCheck.poll через after.
+        """
+        mount = mount_point_for(path, self._get_mount_points())
+        with self._lock:
+            stuck = mount in self._stuck_mounts
+        if stuck:
+            return PendingCheck(self, path, mount, None, 0.0)
+        future = self._get_executor().submit(stat_path, path)
+        return PendingCheck(self, path, mount, future, time.monotonic() + self.timeout_for(mount))
+
+    # Чтение кэша
+
+    def status(self, path):
+        """PathStatus пути или None, если путь еще не проверен или результат устарел."""
+        with self._lock:
+            status = self._statuses.get(path)
+        if status is None or time.monotonic() - status.checked_at > self.ttl:
+            return None
+        return status
+
+    def exists(self, path):
+        """Как os.path.exists, но по кэшу; для непроверенного пути - True (проверит запуск)."""
+        status = self.status(path)
+        return status is None or status.state == PATH_OK
+
+    def isdir(self, path):
+        status = self.status(path)
+        return status is None or (status.state == PATH_OK and status.is_dir)
+
+    def program_problem(self, program_path, working_directory=""):
+        """Описание проблемы с программой по кэшу или None, если проблем не известно."""
+        status = self.status(program_path)
+        if status is not None and status.state == PATH_MISSING:
+            return "файл не найден"
+        if status is not None and status.state == PATH_UNREACHABLE:
+            return "путь недоступен"
+        if working_directory:
+            status = self.status(working_directory)
+            if status is not None and status.state == PATH_UNREACHABLE:
+                return "рабочий каталог недоступен"
+            if status is not None and (status.state == PATH_MISSING or not status.is_dir):
+                return "рабочий каталог не найден"
+        return None
+
+    def broken_programs(self):
+        """Словарь путь программы -> описание проблемы для всех программ с известной проблемой."""
+        with self._lock:
+            targets = list(self._targets.items())
+        broken = {}
+        for program_path, working_directory in targets:
+            problem = self.program_problem(program_path, working_directory)
+            if problem is not None:
+                broken[program_path] = problem
+        return broken
+
+    # Фоновый поток
+
+    def _run(self):
+        last_full_check = None
+        while True:
+            with self._wakeup:
+                while not self._closed:
+                    now = time.monotonic()
+                    if self._urgent or self._full_check_due:
+                        break
+                    if last_full_check is not None and now - last_full_check >= self.interval:
+                        self._full_check_due = True
+                        break
+                    wait = self.interval if last_full_check is None else self.interval - (now - last_full_check)
+                    self._wakeup.wait(wait)
+                if self._closed:
+                    return
+                full_check = self._full_check_due
+                if full_check:
+                    self._full_check_due = False
+                    self._urgent.clear()
+                    last_full_check = time.monotonic()
+                    paths = set(self._targets)
+                    paths.update(directory for directory in self._targets.values() if directory)
+                else:
+                    paths, self._urgent = self._urgent, set()
+            try:
+                self._check(paths)
+            except Exception as e:
+                print(f"Ошибка фоновой проверки путей: {e}")
+            if full_check:
+                self._forget_except(paths)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="path-health")
+            return self._executor
+
+    def _get_mount_points(self):
+        if self._mount_points is None:
+            self._mount_points = read_mount_points()
+        return self._mount_points
+
+    def _check(self, paths):
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        executor = self._get_executor()
+        mount_points = self._get_mount_points()
+        by_mount = {}
+        for path in paths:
+            if path:
+                by_mount.setdefault(mount_point_for(path, mount_points), []).append(path)
+
+        # Пробный stat каждой точки монтирования со своим таймаутом
+        probes = {}
+        for mount, mount_paths in by_mount.items():
+            with self._lock:
+                stuck = mount in self._stuck_mounts
+            if stuck:
+                self._store(mount_paths, PATH_UNREACHABLE)
+            else:
+                probe = mount + os.sep if mount.endswith(":") else mount # "c:" без слеша - текущий каталог диска
+                probes[executor.submit(stat_path, probe)] = mount
+        started = time.monotonic()
+        alive = []
+        while probes:
+            deadline = min(started + self.timeout_for(mount) for mount in probes.values())
+            done, _ = wait(probes, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                alive.append(probes.pop(future))
+            now = time.monotonic()
+            for future, mount in list(probes.items()):
+                if now >= started + self.timeout_for(mount):
+                    del probes[future]
+                    self._mark_stuck(mount, future)
+                    self._store(by_mount[mount], PATH_UNREACHABLE)
+
+        batches = {}
+        for mount in alive:
+            mount_paths = by_mount[mount]
+            for start in range(0, len(mount_paths), HEALTH_BATCH):
+                batch = mount_paths[start:start + HEALTH_BATCH]
+                batches[executor.submit(self._check_batch, batch)] = (mount, batch)
+        # Точка может зависнуть и после пробы. Каждая очередь пула (пачки на поток) получает
+        # таймаут своей точки; не успевшие пачки помечаются недоступными, как зависшая проба
+        rounds = -(-len(batches) // self.workers)
+        started = time.monotonic()
+        while batches:
+            deadline = min(started + self.timeout_for(mount) * rounds for mount, _ in batches.values())
+            done, _ = wait(batches, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                del batches[future]
+                future.result()
+            now = time.monotonic()
+            for future, (mount, batch) in list(batches.items()):
+                if now >= started + self.timeout_for(mount) * rounds:
+                    del batches[future]
+                    self._mark_stuck(mount, future)
+                    self._store(batch, PATH_UNREACHABLE)
+
+    def _forget_except(self, paths):
+        """Убирает из кэша пути, которых больше нет среди проверяемых."""
+        with self._lock:
+            for path in [path for path in self._statuses if path not in paths]:
+                if path not in self._targets and path not in self._urgent:
+                    del self._statuses[path]
+
+    def _mark_stuck(self, mount, future):
+        with self._lock:
+            self._stuck_mounts.add(mount)
+
+        def release(_):
+            with self._lock:
+                self._stuck_mounts.discard(mount)
+
+        future.add_done_callback(release)
+
+    def _check_batch(self, paths):
+        results = [(path, *stat_path(path)) for path in paths]
+        now = time.monotonic()
+        with self._lock:
+            for path, state, is_dir in results:
+                self._put(path, state, is_dir, now)
+
+    def _store(self, paths, state):
+        now = time.monotonic()
+        with self._lock:
+            for path in paths:
+                self._put(path, state, False, now)
+
+    def _put(self, path, state, is_dir, now):
+        previous = self._statuses.get(path)
+        if previous is None or previous.state != state or previous.is_dir != is_dir:
+            self.generation += 1
+        self._statuses[path] = PathStatus(state, is_dir, now)
+
+    def close(self):
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
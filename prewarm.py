@@ -0,0 +1,172 @@
+"""
+Теплый запуск Python-программ.
+Для программы с флагом "warm" лаунчер заранее запускает процесс-заготовку:
+интерпретатор стартует, импортирует модули, которые скрипт импортирует на верхнем
+уровне, и ждет в stdin одну строку JSON с аргументами. При запуске заготовка
+получает argv и рабочий каталог и выполняет скрипт как __main__ - стоимость
+старта интерпретатора и импортов уже заплачена. Сразу после этого в фоне
+готовится новая заготовка для следующего запуска.
+
+Отличия от обычного запуска: скрипт выполняется интерпретатором лаунчера
+(sys.executable), а stdin программы - закрытый канал, а не консоль лаунчера.
+
+Этот же файл - точка входа заготовки: python prewarm.py <скрипт>.
+"""
+import ast
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+
+WARM_SCRIPT_EXTENSIONS = (".py", ".pyw")
+
+
+def is_warmable(program_path):
+    return program_path.lower().endswith(WARM_SCRIPT_EXTENSIONS)
+
+
+def top_level_imports(script_path):
+    """Имена модулей из import/from-import на верхнем уровне скрипта (в порядке появления)."""
+    try:
+        with open(script_path, "rb") as f:
+            tree = ast.parse(f.read(), filename=script_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+class WarmWorker:
+    """Заготовка для одного скрипта: процесс, ждущий аргументы, и его журнал вывода."""
+
+    def __init__(self, script_path, output=None, log_filename=None):
+        """output - файл для stdout/stderr программы (None - вывод лаунчера)."""
+        self.script_path = script_path
+        self.log_filename = log_filename
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), script_path],
+            stdin=subprocess.PIPE, stdout=output, stderr=subprocess.STDOUT if output else None,
+        )
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def start(self, arguments=(), cwd=None):
+        """Передает заготовке argv и рабочий каталог; дальше это обычный процесс программы."""
+        request = json.dumps({"argv": [self.script_path, *arguments], "cwd": cwd}, ensure_ascii=False)
+        self.process.stdin.write(request.encode("utf-8") + b"\n")
+        self.process.stdin.close()
+        return self.process
+
+    def discard(self):
+        if self.is_alive():
+            self.process.kill()
+            self.process.wait()
+
+
+class WarmPool:
+    """
+    По одной готовой заготовке на скрипт. Заготовки создаются в фоновом потоке
+    (prepare), а take забирает готовую без ожидания - или None, если ее еще нет.
+    """
+
+    def __init__(self, supervisor=None):
+        """supervisor - ProcessSupervisor, чьи настройки журналов вывода используются для заготовок."""
+        self.supervisor = supervisor
+        self._lock = threading.Lock()
+        self._workers = {} # путь скрипта -> WarmWorker
+        self._preparing = set()
+        self._closed = False
+
+    def prepare(self, script_path, name=None):
+        """Готовит заготовку для скрипта в фоне, если ее еще нет."""
+        with self._lock:
+            if self._closed or script_path in self._preparing:
+                return
+            worker = self._workers.get(script_path)
+            if worker is not None and worker.is_alive():
+                return
+            self._preparing.add(script_path)
+        threading.Thread(target=self._spawn, args=(script_path, name), name="prewarm", daemon=True).start()
+
+    def _spawn(self, script_path, name):
+        output, log_filename = None, None
+        if self.supervisor is not None:
+            output, log_filename = self.supervisor.open_output(name or os.path.basename(script_path))
+        try:
+            worker = WarmWorker(script_path, output, log_filename)
+        except OSError as e:
+            print(f"Не удалось подготовить теплый запуск {script_path}: {e}")
+            worker = None
+        finally:
+            if output is not None:
+                output.close()
+        with self._lock:
+            self._preparing.discard(script_path)
+            if worker is None:
+                return
+            if self._closed:
+                worker.discard()
+                return
+            previous = self._workers.pop(script_path, None)
+            self._workers[script_path] = worker
+        if previous is not None:
+            previous.discard()
+
+    def take(self, script_path):
+        """Забирает готовую живую заготовку скрипта или возвращает None."""
+        with self._lock:
+            worker = self._workers.pop(script_path, None)
+        if worker is not None and not worker.is_alive():
+            return None # Заготовка завершилась сама (например, скрипт удален) - запуск будет обычным
+        return worker
+
+    def discard(self, script_path):
+        """Убирает заготовку скрипта (например, после выключения теплого запуска)."""
+        with self._lock:
+            worker = self._workers.pop(script_path, None)
+        if worker is not None:
+            worker.discard()
+
+    def close(self):
+        """Завершает все неиспользованные заготовки."""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = list(self._workers.values()), {}
+        for worker in workers:
+            worker.discard()
+
+
+def _worker_main(script_path):
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    sys.path[0] = script_dir # Как у "python скрипт.py": локальные модули скрипта видны при импорте
+    for module_name in top_level_imports(script_path):
+        try:
+            importlib.import_module(module_name)
+        except BaseException:
+            pass # Ошибку импорта скрипт получит сам, когда дойдет до нее
+
+    line = sys.stdin.buffer.readline()
+    if not line:
+        return # Лаунчер закрыл заготовку, не запустив ее
+    request = json.loads(line)
+    sys.stdin.close()
+    sys.stdin = open(os.devnull, "r")
+    sys.argv = request["argv"]
+    if request.get("cwd"):
+        os.chdir(request["cwd"])
+
+    import runpy
+
+    runpy.run_path(sys.argv[0], run_name="__main__")
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1])
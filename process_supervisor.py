@@ -0,0 +1,289 @@
+"""
+Надзор за программами, запущенными из лаунчера.
+Один фоновый поток-сборщик опрашивает дочерние процессы: забирает код выхода
+(на Linux это же убирает зомби-процессы), считает время работы, снимает загрузку
+ЦП и память, а по желанию направляет stdout/stderr в журналы с ротацией.
+launch только вызывает Popen и добавляет процесс в список - клик по "Запустить"
+ничего не ждет; журнал ротируется уже после завершения процесса, в потоке-сборщике.
+Загрузка ЦП и память берутся из psutil, если он установлен, иначе из /proc (Linux).
+"""
+import importlib.util
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+
+from storage import rotate_backups
+
+REAP_INTERVAL = 0.25 # Как часто проверять, не завершились ли процессы, секунд
+USAGE_INTERVAL = 1.0 # Как часто снимать загрузку ЦП и память, секунд
+FINISHED_LIMIT = 50 # Сколько завершенных процессов помнить для панели
+LOG_DIRNAME = "logs"
+LOG_MAX_BYTES = 1024 * 1024 # Размер журнала вывода, после которого он ротируется
+LOG_BACKUP_COUNT = 3
+
+_psutil_available = importlib.util.find_spec("psutil") is not None
+_PROC_AVAILABLE = os.path.isdir("/proc/self")
+_UNSAFE_LOG_CHARS = re.compile(r"[^\w.-]+")
+
+
+def log_directory_for(data_filename):
+    """Каталог журналов вывода рядом с файлом данных лаунчера."""
+    data_dir = os.path.dirname(os.path.abspath(data_filename))
+    return os.path.join(data_dir, LOG_DIRNAME)
+
+
+def log_filename_for(directory, name):
+    """Журнал вывода программы: имя программы без символов, недопустимых в имени файла."""
+    safe_name = _UNSAFE_LOG_CHARS.sub("_", name).strip("._") or "program"
+    return os.path.join(directory, f"{safe_name}.log")
+
+
+def _read_proc_usage(pid):
+    """(секунд ЦП, байт резидентной памяти) процесса из /proc или None."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    # Имя процесса в скобках может содержать пробелы - поля считаются после ")"
+    fields = stat[stat.rfind(b")") + 2:].split()
+    ticks = int(fields[11]) + int(fields[12]) # utime + stime
+    return ticks / os.sysconf("SC_CLK_TCK"), resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class SupervisedProcess:
+    """
+    Процесс, запущенный через ProcessSupervisor. Поля обновляет поток-сборщик:
+    exit_code и end_time появляются после завершения, cpu_percent и memory_bytes -
+    после первого замера (None, если замерить нечем).
+    """
+
+    def __init__(self, process, name, path, log_filename=None):
+        self.process = process
+        self.pid = process.pid
+        self.name = name
+        self.path = path
+        self.log_filename = log_filename
+        self.start_time = time.time()
+        self.end_time = None
+        self.exit_code = None
+        self.cpu_percent = None
+        self.memory_bytes = None
+        self._exit_callbacks = []
+        self._usage_probe = None # psutil.Process или (секунд ЦП, время замера) для /proc
+
+    @property
+    def running(self):
+        return self.end_time is None
+
+    def wall_time(self, now=None):
+        """Время работы в секундах (до завершения или до текущего момента)."""
+        end = self.end_time if self.end_time is not None else (time.time() if now is None else now)
+        return max(0.0, end - self.start_time)
+
+
+class ProcessSupervisor:
+    def __init__(self, log_directory=None, capture_output=False, reap_interval=REAP_INTERVAL,
+                 usage_interval=USAGE_INTERVAL, finished_limit=FINISHED_LIMIT):
+        """
+        log_directory - каталог журналов вывода; capture_output - писать ли
+        stdout/stderr программ в журналы по умолчанию (иначе вывод наследуется).
+        """
+        self.log_directory = log_directory
+        self.capture_output = capture_output
+        self.reap_interval = reap_interval
+        self.usage_interval = usage_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._running = []
+        self._finished = deque(maxlen=finished_limit)
+        self._closed = False
+        self._thread = None # Поток-сборщик запускается при первом запуске программы
+        self._psutil = None
+
+    def open_output(self, name, capture_output=None):
+        """
+        Открывает журнал вывода программы для дочернего процесса.
+        Возвращает (файл или None, имя журнала или None); файл закрывает вызывающий после Popen.
+        """
+        capture_output = self.capture_output if capture_output is None else capture_output
+        if not capture_output or not self.log_directory:
+            return None, None
+        log_filename = log_filename_for(self.log_directory, name)
+        try:
+            os.makedirs(self.log_directory, exist_ok=True)
+            return open(log_filename, "ab"), log_filename
+        except OSError as e:
+            print(f"Не удалось открыть журнал вывода {log_filename}: {e}. Вывод не сохраняется.")
+            return None, None
+
+    def launch(self, command, name=None, path=None, cwd=None, capture_output=None, env=None, creationflags=0):
+        """
+        Запускает command (как subprocess.Popen) и берет процесс под надзор.
+        env - окружение процесса (None - как у лаунчера), creationflags - флаги Windows.
+        Возвращает SupervisedProcess; исключения Popen передаются вызывающему.
+        """
+        name = name or os.path.basename(command[0])
+        output, log_filename = self.open_output(name, capture_output)
+        try:
+            process = subprocess.Popen(
+                command, cwd=cwd, env=env, creationflags=creationflags,
+                stdout=output, stderr=subprocess.STDOUT if output else None
+            )
+        finally:
+            if output is not None:
+                output.close() # Дескриптор уже унаследован дочерним процессом
+        return self.adopt(process, name, path or command[0], log_filename)
+
+    def adopt(self, process, name, path, log_filename=None):
+        """Берет под надзор уже запущенный процесс (например, теплую заготовку из prewarm)."""
+        supervised = SupervisedProcess(process, name, path, log_filename)
+        with self._wakeup:
+            self._running.append(supervised)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="process-reaper", daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return supervised
+
+    def add_exit_callback(self, supervised, callback):
+        """
+        callback(supervised) вызывается в потоке-сборщике после завершения процесса,
+        а если процесс уже завершился - сразу, в вызывающем потоке.
+        """
+        with self._lock:
+            if supervised.running:
+                supervised._exit_callbacks.append(callback)
+                return
+        self._call_exit_callback(supervised, callback)
+
+    def running(self):
+        """Процессы, которые еще работают (в порядке запуска)."""
+        with self._lock:
+            return list(self._running)
+
+    def find_running(self, path):
+        """Последний из работающих процессов программы path или None."""
+        with self._lock:
+            for supervised in reversed(self._running):
+                if supervised.path == path:
+                    return supervised
+        return None
+
+    def finished(self):
+        """Последние завершенные процессы, самые свежие первыми."""
+        with self._lock:
+            return list(reversed(self._finished))
+
+    def clear_finished(self):
+        with self._lock:
+            self._finished.clear()
+
+    def terminate(self, supervised):
+        """Просит процесс завершиться (SIGTERM / TerminateProcess); код выхода заберет сборщик."""
+        if supervised.running:
+            try:
+                supervised.process.terminate()
+            except OSError as e:
+                print(f"Не удалось завершить процесс {supervised.pid}: {e}")
+                return False
+        return True
+
+    def close(self):
+        """Останавливает поток-сборщик. Сами программы продолжают работать."""
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    # Поток-сборщик
+
+    def _run(self):
+        last_usage = 0.0
+        while True:
+            with self._wakeup:
+                while not self._running and not self._closed:
+                    self._wakeup.wait() # Нечего опрашивать - поток спит и не тратит ЦП
+                if self._closed:
+                    return
+                running = list(self._running)
+
+            for supervised in running:
+                if supervised.process.poll() is not None:
+                    self._on_exit(supervised)
+
+            now = time.monotonic()
+            if now - last_usage >= self.usage_interval:
+                last_usage = now
+                for supervised in running:
+                    if supervised.running:
+                        self._sample_usage(supervised, now)
+
+            with self._wakeup:
+                if not self._closed:
+                    self._wakeup.wait(self.reap_interval)
+
+    def _on_exit(self, supervised):
+        with self._lock:
+            supervised.exit_code = supervised.process.returncode
+            supervised.end_time = time.time()
+            self._running.remove(supervised)
+            self._finished.append(supervised)
+            callbacks, supervised._exit_callbacks = supervised._exit_callbacks, []
+        supervised._usage_probe = None
+        for callback in callbacks:
+            self._call_exit_callback(supervised, callback)
+        if supervised.log_filename:
+            self._rotate_log(supervised.log_filename)
+
+    @staticmethod
+    def _call_exit_callback(supervised, callback):
+        try:
+            callback(supervised)
+        except Exception as e:
+            print(f"Ошибка в обработчике завершения процесса {supervised.pid}: {e}")
+
+    @staticmethod
+    def _rotate_log(log_filename):
+        try:
+            if os.path.getsize(log_filename) > LOG_MAX_BYTES:
+                rotate_backups(log_filename, LOG_BACKUP_COUNT)
+        except OSError as e:
+            # Журнал может быть еще открыт другим экземпляром той же программы (Windows)
+            print(f"Не удалось ротировать журнал вывода {log_filename}: {e}")
+
+    def _sample_usage(self, supervised, now):
+        if _psutil_available:
+            self._sample_psutil(supervised)
+        elif _PROC_AVAILABLE:
+            usage = _read_proc_usage(supervised.pid)
+            if usage is None:
+                return
+            cpu_seconds, supervised.memory_bytes = usage
+            previous = supervised._usage_probe
+            supervised._usage_probe = (cpu_seconds, now)
+            if previous is not None and now > previous[1]:
+                supervised.cpu_percent = (cpu_seconds - previous[0]) / (now - previous[1]) * 100
+
+    def _sample_psutil(self, supervised):
+        if self._psutil is None:
+            import psutil
+
+            self._psutil = psutil
+        psutil = self._psutil
+        try:
+            if supervised._usage_probe is None:
+                supervised._usage_probe = psutil.Process(supervised.pid)
+                supervised._usage_probe.cpu_percent(None) # Первый вызов только запоминает точку отсчета
+                supervised.memory_bytes = supervised._usage_probe.memory_info().rss
+                return
+            supervised.cpu_percent = supervised._usage_probe.cpu_percent(None)
+            supervised.memory_bytes = supervised._usage_probe.memory_info().rss
+        except psutil.Error:
+            pass # Процесс завершился между опросами - это заметит poll()
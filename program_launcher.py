@@ -0,0 +1,524 @@
+"""
+Запуск программ лаунчера без привязки к интерфейсу.
+Профили запуска: у программы может быть несколько именованных наборов
+(аргументы, рабочий каталог, переменные окружения, приоритет nice, привязка к ЦП),
+заданных в поле "profiles", и профиль по умолчанию в "active_profile".
+Пустые поля профиля означают "как у самой программы".
+
+resolve_launch проверяет путь и собирает LaunchRequest - план запуска: готовый argv
+с интерпретатором для скриптов, рабочий каталог, окружение и способ запуска.
+План не зависит от момента запуска, поэтому менеджеры данных хранят его в
+LaunchPlanCache до правки записи, и повторный запуск - это поиск в словаре и Popen,
+без повторных проверок диска и разбора аргументов. launch_plan запускает план
+(под надзором ProcessSupervisor), а GroupLaunch запускает набор программ в фоне
+волнами по parallelism штук с паузой stagger между волнами, собирая итог по каждой.
+"""
+import errno
+import os
+import queue
+import sys
+import threading
+
+PROCESS_EXTENSIONS = (".exe", ".py", ".bat", ".ps1")
+URL_EXTENSIONS = (".url",)
+PROFILE_FIELDS = ("name", "arguments", "working_directory", "env", "nice", "affinity")
+NICE_RANGE = (-20, 19)
+DEFAULT_GROUP_PARALLELISM = 4 # Программ в одной волне группового запуска
+DEFAULT_GROUP_STAGGER = 1.0 # Секунд между волнами, чтобы программы не читали диск одновременно
+
+# Классы приоритета Windows для значений nice (порог -> флаг CreateProcess)
+_WINDOWS_PRIORITY_CLASSES = (
+    (-10, 0x00000080), # HIGH_PRIORITY_CLASS
+    (-1, 0x00008000), # ABOVE_NORMAL_PRIORITY_CLASS
+    (0, 0), # обычный приоритет
+    (10, 0x00004000), # BELOW_NORMAL_PRIORITY_CLASS
+    (NICE_RANGE[1], 0x00000040), # IDLE_PRIORITY_CLASS
+)
+
+
+class LaunchError(Exception):
+    """Программу нельзя запустить; текст исключения - сообщение для пользователя."""
+
+
+def normalize_profile(profile):
+    """
+    Проверяет профиль запуска и возвращает его копию с полями PROFILE_FIELDS.
+    env - словарь строк (None в значении удаляет переменную), nice - целое
+    из NICE_RANGE или None, affinity - список номеров ЦП. Ошибки - ValueError.
+    """
+    name = (profile.get("name") or "").strip()
+    if not name:
+        raise ValueError("У профиля запуска должно быть имя.")
+    env = profile.get("env") or {}
+    if not isinstance(env, dict) or not all(isinstance(key, str) and key for key in env):
+        raise ValueError(f"Переменные окружения профиля '{name}' должны быть парами ИМЯ=значение.")
+    env = {key: (None if value is None else str(value)) for key, value in env.items()}
+    nice = profile.get("nice")
+    if nice in ("", None):
+        nice = None
+    else:
+        try:
+            nice = int(nice)
+        except (TypeError, ValueError):
+            raise ValueError(f"Приоритет профиля '{name}' должен быть целым числом.") from None
+        if not NICE_RANGE[0] <= nice <= NICE_RANGE[1]:
+            raise ValueError(f"Приоритет профиля '{name}' должен быть от {NICE_RANGE[0]} до {NICE_RANGE[1]}.")
+    affinity = profile.get("affinity") or []
+    try:
+        affinity = sorted({int(cpu) for cpu in affinity})
+    except (TypeError, ValueError):
+        raise ValueError(f"Привязка к ЦП профиля '{name}' должна быть списком номеров процессоров.") from None
+    if any(cpu < 0 for cpu in affinity):
+        raise ValueError(f"Номера процессоров в профиле '{name}' не могут быть отрицательными.")
+    return {
+        "name": name,
+        "arguments": (profile.get("arguments") or "").strip(),
+        "working_directory": (profile.get("working_directory") or "").strip(),
+        "env": env,
+        "nice": nice,
+        "affinity": affinity,
+    }
+
+
+def parse_env_lines(text):
+    """
+    Переменные окружения из текста по строке на переменную: ИМЯ=значение;
+    -ИМЯ убирает переменную из окружения запуска. Ошибки - ValueError.
+    """
+    env = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-"):
+            env[line[1:].strip()] = None
+            continue
+        key, separator, value = line.partition("=")
+        if not separator or not key.strip():
+            raise ValueError(f"Строка {number}: ожидается ИМЯ=значение или -ИМЯ, получено '{line}'.")
+        env[key.strip()] = value
+    return env
+
+
+def format_env_lines(env):
+    return "\n".join(f"-{key}" if value is None else f"{key}={value}" for key, value in (env or {}).items())
+
+
+def parse_cpu_list(text):
+    """Номера процессоров из строки вида "0,2,4-7". Ошибки - ValueError."""
+    cpus = set()
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, separator, last = part.partition("-")
+        try:
+            if separator:
+                cpus.update(range(int(first), int(last) + 1))
+            else:
+                cpus.add(int(first))
+        except ValueError:
+            raise ValueError(f"Непонятный номер процессора '{part}'. Пример: 0,2,4-7.") from None
+    return sorted(cpus)
+
+
+def format_cpu_list(cpus):
+    return ",".join(str(cpu) for cpu in cpus or ())
+
+
+def find_profile(program, profile_name):
+    """Профиль программы по имени или None."""
+    for profile in program.get("profiles") or ():
+        if profile.get("name") == profile_name:
+            return profile
+    return None
+
+
+class LaunchRequest:
+    """
+    Все, что нужно для запуска: kind - "process", "url" или "file"; command - argv
+    для процессов (с интерпретатором для скриптов), argv - только аргументы программы;
+    env - полное окружение или None (как у лаунчера); warnings - предупреждения для
+    пользователя (запуск они не отменяют). cacheable - можно ли хранить план до правки
+    записи (нельзя, если он зависит от состояния диска, например нет рабочего каталога).
+    interpreted - скрипт запускается интерпретатором, и об удаленном файле Popen не сообщит.
+    """
+    __slots__ = ("program", "name", "path", "kind", "command", "argv", "cwd", "env", "nice", "affinity",
+                 "profile_name", "arguments", "warnings", "cacheable", "interpreted")
+
+    def __init__(self, program, kind, command, cwd=None, env=None, nice=None, affinity=(), profile_name=None):
+        self.program = program
+        self.name = program.get("name") or os.path.basename(program.get("path") or "")
+        self.path = program.get("path")
+        self.kind = kind
+        self.command = command
+        self.argv = []
+        self.cwd = cwd
+        self.env = env
+        self.nice = nice
+        self.affinity = affinity
+        self.profile_name = profile_name
+        self.arguments = "" # Строка аргументов как в записи (для истории запусков)
+        self.warnings = []
+        self.cacheable = True
+        self.interpreted = False
+
+
+class LaunchPlanCache:
+    """
+    Планы запуска (LaunchRequest) по пути программы и имени профиля. Менеджер данных
+    сбрасывает план при любой правке записи с этим путем (invalidate).
+    """
+
+    def __init__(self):
+        self._plans = {} # путь -> {имя профиля или None: LaunchRequest}
+
+    def get(self, program_path, profile_name=None):
+        plans = self._plans.get(program_path)
+        return plans.get(profile_name) if plans else None
+
+    def build(self, program, profile_name=None, fs=os.path):
+        """Собирает план записи (см. resolve_launch) и запоминает его, если это допустимо."""
+        plan = resolve_launch(program, profile_name, fs)
+        if plan.cacheable:
+            self._plans.setdefault(plan.path, {})[profile_name] = plan
+        return plan
+
+    def invalidate(self, program_path):
+        self._plans.pop(program_path, None)
+
+    def clear(self):
+        self._plans.clear()
+
+    def __len__(self):
+        return sum(len(plans) for plans in self._plans.values())
+
+
+def launch_kind(program_path, program_type=None):
+    lower_path = program_path.lower()
+    if lower_path.endswith(PROCESS_EXTENSIONS):
+        return "process"
+    if lower_path.endswith(URL_EXTENSIONS):
+        return "url"
+    if program_type == "exe" and sys.platform != "win32" and not os.path.splitext(program_path)[1]:
+        return "process" # Исполняемый файл Unix без расширения (например, из .desktop)
+    return "file"
+
+
+def interpreter_for(program_path):
+    """
+    Начало команды для скрипта program_path: интерпретатор и его ключи.
+    Пустой список - файл запускается сам (exe, bat, исполняемый скрипт с shebang).
+    """
+    import shutil # Здесь, а не при импорте модуля: его импортирует загрузка данных и командная строка
+
+    extension = os.path.splitext(program_path)[1].lower()
+    if extension == ".py":
+        if sys.platform == "win32":
+            launcher = shutil.which("py") # Лаунчер py учитывает shebang и версию из скрипта
+            return [launcher or shutil.which("python") or sys.executable]
+        if os.access(program_path, os.X_OK):
+            return []
+        return [shutil.which("python3") or sys.executable]
+    if extension == ".ps1":
+        shell = shutil.which("pwsh") or shutil.which("powershell")
+        return [shell, "-NoProfile", "-File"] if shell else []
+    return []
+
+
+def resolve_launch(program, profile_name=None, fs=os.path):
+    """
+    Собирает LaunchRequest для записи программы. profile_name - имя профиля;
+    None - профиль по умолчанию (active_profile), если он задан. Ошибки - LaunchError.
+    fs - откуда узнавать exists/isdir: os.path или кэш path_health.PathHealthChecker,
+    чтобы поток интерфейса не ждал недоступный диск.
+    """
+    program_path = program.get("path")
+    if not program_path:
+        raise LaunchError("Путь к программе не указан.")
+    if not fs.exists(program_path):
+        raise LaunchError(f"Файл не найден: {program_path}. Возможно, он был перемещен или удален.")
+
+    profile = None
+    if profile_name is not None:
+        profile = find_profile(program, profile_name)
+        if profile is None:
+            raise LaunchError(f"Профиль запуска '{profile_name}' не найден.")
+    elif program.get("active_profile"):
+        profile = find_profile(program, program.get("active_profile")) # Удаленный профиль - запуск как обычно
+    profile = profile or {}
+
+    arguments = (profile.get("arguments") or program.get("arguments") or "").strip()
+    working_directory = (profile.get("working_directory") or program.get("working_directory") or "").strip()
+    kind = launch_kind(program_path, program.get("type"))
+
+    argv = []
+    if kind == "process" and arguments:
+        import shlex
+
+        try:
+            argv = shlex.split(arguments) # shlex - для корректного разбора кавычек
+        except ValueError as e:
+            raise LaunchError(f"Не удалось разобрать аргументы '{arguments}': {e}") from None
+    command = [program_path, *argv]
+    interpreter = interpreter_for(program_path) if kind == "process" else []
+    command[:0] = interpreter
+
+    env = None
+    if profile.get("env"):
+        env = dict(os.environ)
+        for key, value in profile["env"].items():
+            if value is None:
+                env.pop(key, None)
+            else:
+                env[key] = value
+
+    request = LaunchRequest(program, kind, command, env=env, nice=profile.get("nice"),
+                            affinity=profile.get("affinity") or (), profile_name=profile.get("name"))
+    request.argv = argv
+    request.interpreted = bool(interpreter)
+    request.arguments = arguments
+    if working_directory and not fs.isdir(working_directory):
+        request.warnings.append(_missing_cwd_warning(working_directory))
+        request.cacheable = False # Каталог может появиться - проверим снова при следующем запуске
+        working_directory = ""
+    request.cwd = working_directory or None
+    if kind != "process" and (arguments or working_directory or env or request.nice is not None or request.affinity):
+        request.warnings.append("Аргументы, рабочий каталог и параметры профиля поддерживаются только для исполняемых файлов/скриптов. Будет открыт только файл.")
+    return request
+
+
+def _missing_cwd_warning(working_directory):
+    return f"Указанный рабочий каталог не существует или недоступен: {working_directory}. Запуск будет выполнен из текущего каталога."
+
+
+def _windows_priority_class(nice):
+    for threshold, flag in _WINDOWS_PRIORITY_CLASSES:
+        if nice <= threshold:
+            return flag
+    return 0
+
+
+def apply_process_limits(process, nice=None, affinity=()):
+    """
+    Задает приоритет и привязку к ЦП уже запущенного процесса (на Windows приоритет
+    задается при создании, см. launch_program). Возвращает список предупреждений.
+    """
+    warnings = []
+    if nice is not None and nice != 0 and sys.platform != "win32":
+        try:
+            os.setpriority(os.PRIO_PROCESS, process.pid, nice)
+        except (OSError, AttributeError) as e:
+            warnings.append(f"Не удалось задать приоритет {nice}: {e}")
+    if affinity:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(process.pid, affinity)
+            except OSError as e:
+                warnings.append(f"Не удалось привязать процесс к ЦП {affinity}: {e}")
+        else:
+            try:
+                import psutil
+
+                psutil.Process(process.pid).cpu_affinity(list(affinity))
+            except ImportError:
+                warnings.append("Привязка к ЦП на этой системе требует пакета psutil.")
+            except Exception as e:
+                warnings.append(f"Не удалось привязать процесс к ЦП {affinity}: {e}")
+    return warnings
+
+
+def open_with_default_app(path):
+    """Открывает файл программой, назначенной в системе."""
+    import subprocess
+
+    if sys.platform == "win32":
+        os.startfile(path)
+    elif sys.platform == "darwin":
+        subprocess.Popen(["open", path])
+    else:
+        subprocess.Popen(["xdg-open", path])
+
+
+class LaunchOutcome:
+    """
+    Результат launch_plan: process - SupervisedProcess (None для ссылок и документов);
+    already_running - процесс программы с флагом single_instance, который уже работал;
+    warnings - предупреждения плана и этого запуска.
+    """
+
+    def __init__(self, request, process=None, already_running=None, warnings=None):
+        self.request = request
+        self.process = process
+        self.already_running = already_running
+        self.warnings = list(request.warnings) if warnings is None else warnings
+
+
+def launch_program(program, supervisor, warm_pool=None, profile_name=None):
+    """Собирает план запуска записи (см. resolve_launch) и запускает его."""
+    return launch_plan(resolve_launch(program, profile_name), supervisor, warm_pool)
+
+
+def launch_plan(request, supervisor, warm_pool=None, fs=os.path):
+    """
+    Запускает готовый план. Для single_instance при уже работающем процессе ничего
+    не запускает и возвращает его в already_running. План не меняется, поэтому его
+    можно хранить и запускать повторно; диск проверяется, только если запуск не удался.
+    Не трогает интерфейс, поэтому вызывается и из фонового потока группового запуска.
+    fs - как в resolve_launch: с кэшем PathHealthChecker файл скрипта не проверяется
+    на диске (интерпретатор запустится всегда и сам сообщит об ошибке).
+    """
+    program = request.program
+    if program.get("single_instance"):
+        # Известны только процессы, запущенные этим лаунчером
+        running = supervisor.find_running(request.path)
+        if running is not None:
+            return LaunchOutcome(request, already_running=running)
+
+    if request.kind == "url":
+        import webbrowser
+
+        webbrowser.open(request.path)
+        return LaunchOutcome(request)
+    if request.kind == "file":
+        try:
+            open_with_default_app(request.path)
+        except OSError as e:
+            raise _launch_error(request, e) from None
+        return LaunchOutcome(request)
+
+    if request.interpreted and not fs.exists(request.path):
+        raise LaunchError(f"Файл не найден: {request.path}. Возможно, он был перемещен или удален.")
+    warnings = list(request.warnings)
+    launched = None
+    if warm_pool is not None and program.get("warm") and request.env is None:
+        launched = _launch_warm(request, supervisor, warm_pool)
+    if launched is None:
+        cwd = request.cwd
+        for attempt in range(2):
+            try:
+                launched = _launch_cold(request, supervisor, cwd)
+                break
+            except OSError as e:
+                if attempt or not _is_missing_cwd(request, e):
+                    raise _launch_error(request, e) from None
+                # Рабочий каталог удалили после сборки плана - как при сборке, запускаем из текущего
+                warnings.append(_missing_cwd_warning(cwd))
+                cwd = None
+    warnings.extend(apply_process_limits(launched.process, request.nice, request.affinity))
+    return LaunchOutcome(request, launched, warnings=warnings)
+
+
+def _launch_cold(request, supervisor, cwd):
+    creationflags = _windows_priority_class(request.nice) if request.nice is not None and sys.platform == "win32" else 0
+    return supervisor.launch(request.command, name=request.name, path=request.path, cwd=cwd,
+                             env=request.env, creationflags=creationflags)
+
+
+def _is_missing_cwd(request, error):
+    return (request.cwd is not None and error.errno in (errno.ENOENT, errno.ENOTDIR)
+            and os.path.exists(request.path) and not os.path.isdir(request.cwd))
+
+
+def _launch_error(request, error):
+    """LaunchError для неудачного запуска плана; диск проверяется только здесь."""
+    if error.errno == errno.ENOENT and not os.path.exists(request.path):
+        return LaunchError(f"Файл не найден: {request.path}. Возможно, он был перемещен или удален.")
+    return LaunchError(f"Не удалось запустить '{request.name}': {error}")
+
+
+def _launch_warm(request, supervisor, warm_pool):
+    """Запуск из готовой заготовки prewarm (None - заготовки нет) с подготовкой следующей."""
+    from prewarm import is_warmable
+
+    if not is_warmable(request.path):
+        return None
+    worker = warm_pool.take(request.path)
+    warm_pool.prepare(request.path, request.name) # Следующий запуск тоже будет теплым
+    if worker is None:
+        return None
+    try:
+        process = worker.start(request.argv, request.cwd)
+    except OSError as e:
+        print(f"Заготовка {request.path} недоступна ({e}), запуск будет обычным.")
+        return None
+    return supervisor.adopt(process, request.name, request.path, worker.log_filename)
+
+
+class GroupLaunchResult:
+    """Итог запуска одной программы группы: outcome при успехе, error - текст ошибки."""
+
+    def __init__(self, program, outcome=None, error=None):
+        self.program = program
+        self.outcome = outcome
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class GroupLaunch:
+    """
+    Групповой запуск в фоновом потоке: волны по parallelism программ, между волнами -
+    пауза stagger секунд. Результаты забираются из потока интерфейса через poll().
+    plans - готовые планы (LaunchRequest): их собирает поток интерфейса через
+    DataManager.get_launch_plan, поэтому фоновый поток не читает записи и не трогает диск
+    до запуска, а кэш планов работает и для группы. fs - см. launch_plan.
+    """
+
+    def __init__(self, plans, supervisor, warm_pool=None, parallelism=DEFAULT_GROUP_PARALLELISM,
+                 stagger=DEFAULT_GROUP_STAGGER, fs=os.path):
+        self.plans = list(plans)
+        self.supervisor = supervisor
+        self.warm_pool = warm_pool
+        self.fs = fs
+        self.parallelism = max(1, int(parallelism))
+        self.stagger = max(0.0, float(stagger))
+        self.results = [] # Все результаты в порядке запуска
+        self._pending = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="group-launch", daemon=True)
+        self.done = False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Не запускать оставшиеся программы (уже запущенные продолжают работать)."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def poll(self):
+        """Новые результаты с прошлого вызова (список GroupLaunchResult)."""
+        results = []
+        while True:
+            try:
+                results.append(self._pending.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _run(self):
+        try:
+            for wave_start in range(0, len(self.plans), self.parallelism):
+                if wave_start and self._cancelled.wait(self.stagger):
+                    break
+                if self._cancelled.is_set():
+                    break
+                for plan in self.plans[wave_start:wave_start + self.parallelism]:
+                    result = self._launch_one(plan)
+                    self.results.append(result)
+                    self._pending.put(result)
+        finally:
+            self.done = True
+
+    def _launch_one(self, plan):
+        try:
+            return GroupLaunchResult(plan.program, launch_plan(plan, self.supervisor, self.warm_pool, self.fs))
+        except LaunchError as e:
+            return GroupLaunchResult(plan.program, error=str(e))
+        except Exception as e:
+            return GroupLaunchResult(plan.program, error=f"Не удалось запустить: {e}")
@@ -0,0 +1,132 @@
+"""
+Компактная запись программы лаунчера.
+Program хранит поля в __slots__ вместо словаря на каждую программу:
+повторяющиеся строки (тип, рабочий каталог) интернируются, а порядок ключей -
+общий кортеж на все записи с одинаковым порядком. Для остального кода запись
+выглядит как словарь (get, [], in, keys, items, update), а to_dict возвращает
+словарь с теми же ключами в том же порядке - JSON получается байт в байт прежним.
+"""
+import sys
+
+PROGRAM_FIELDS = ("name", "path", "type", "note", "arguments", "working_directory")
+# Поля, которые дополняются при создании записи, если их нет, - в этом порядке, в конец
+DEFAULT_FIELDS = (("note", ""), ("arguments", ""), ("working_directory", ""), ("type", "exe"))
+INTERNED_FIELDS = frozenset({"type", "working_directory"})
+
+_FIELD_SET = frozenset(PROGRAM_FIELDS)
+_MISSING = object()
+_key_orders = {PROGRAM_FIELDS: PROGRAM_FIELDS} # кортеж ключей -> тот же кортеж, общий для всех записей
+
+
+def _shared_keys(keys):
+    return _key_orders.setdefault(keys, keys)
+
+
+class Program:
+    """
+    Запись программы. Отсутствующее поле - незаполненный слот, поэтому запись
+    различает "поля нет" и "поле пустое" так же, как словарь.
+    Ключи вне PROGRAM_FIELDS (например, из импорта) хранятся в _extra.
+    """
+    __slots__ = PROGRAM_FIELDS + ("_keys", "_extra")
+
+    # Программы сравниваются по полям, как словари, и так же не хешируются
+    __hash__ = None
+
+    def __init__(self, fields=None):
+        """fields - словарь (или другая запись) с полями программы; недостающие поля дополняются."""
+        self._extra = None
+        if fields is None:
+            fields = {}
+        keys = tuple(fields)
+        if keys == PROGRAM_FIELDS:
+            # Обычная запись из файла - без циклов и проверок
+            self.name = fields["name"]
+            self.path = fields["path"]
+            self.type = sys.intern(fields["type"]) if type(fields["type"]) is str else fields["type"]
+            self.note = fields["note"]
+            self.arguments = fields["arguments"]
+            working_directory = fields["working_directory"]
+            self.working_directory = sys.intern(working_directory) if type(working_directory) is str else working_directory
+            self._keys = PROGRAM_FIELDS
+            return
+        for key in keys:
+            self._set_value(key, fields[key])
+        missing = tuple(key for key, _ in DEFAULT_FIELDS if key not in fields)
+        for key, default in DEFAULT_FIELDS:
+            if key in missing:
+                setattr(self, key, default)
+        self._keys = _shared_keys(keys + missing)
+
+    def _set_value(self, key, value):
+        if key in _FIELD_SET:
+            if key in INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    # Интерфейс словаря
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        extra = self._extra
+        return extra.get(key, default) if extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._set_value(key, value)
+        if key not in self._keys:
+            self._keys = _shared_keys(self._keys + (key,))
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return [self[key] for key in self._keys]
+
+    def items(self):
+        return [(key, self[key]) for key in self._keys]
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def to_dict(self):
+        """Обычный словарь с теми же ключами в том же порядке (для JSON)."""
+        if self._extra is None:
+            return {key: getattr(self, key) for key in self._keys}
+        return {key: self[key] for key in self._keys}
+
+    def same_fields(self, other):
+        """Те же ключи в том же порядке и те же значения."""
+        return self._keys is other._keys and self._extra == other._extra and all(
+            getattr(self, key, _MISSING) == getattr(other, key, _MISSING) for key in PROGRAM_FIELDS
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, Program):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Program({self.to_dict()!r})"
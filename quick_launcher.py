@@ -0,0 +1,153 @@
+"""
+Быстрый запуск: маленькое окно поверх остальных с полем ввода и списком
+результатов нечеткого поиска по всем категориям (как палитра команд).
+Открывается сочетанием клавиш, Enter запускает выбранную программу, Escape или
+щелчок мимо окна - закрывает.
+
+Окно создается один раз и потом только показывается и прячется, а поиск идет по
+уже построенному индексу менеджера данных, поэтому открытие ничего не загружает.
+Нажатия клавиш, пришедшие до отрисовки, объединяются в один поиск (after_idle);
+пока запрос только дописывается, поиск идет среди совпадений предыдущего
+запроса (см. FuzzySearchSession). last_latency - время от нажатия до
+заполненного списка (см. benchmark.py palette).
+"""
+import time
+import tkinter as tk
+
+from data_manager import RECENT_CATEGORY
+
+QUICK_LAUNCH_LIMIT = 12 # Строк в списке результатов
+QUICK_LAUNCH_WIDTH = 640
+
+
+class QuickLauncher:
+    """
+    Окно быстрого запуска. on_launch(программа) запускает выбранную запись
+    (в окне лаунчера - AppLauncher.launch_program).
+    """
+
+    def __init__(self, master, data_manager, on_launch):
+        self.master = master
+        self.data_manager = data_manager
+        self.on_launch = on_launch
+        self.results = [] # Записи программ в порядке строк списка
+        self.last_latency = None # Секунды от нажатия клавиши до заполненного списка
+        self._session = None
+        self._pending_since = None # Время первого необработанного изменения запроса
+        self._resetting = False # show() очищает запрос и заполняет список сам
+
+        self.window = tk.Toplevel(master)
+        self.window.withdraw()
+        self.window.overrideredirect(True)
+        self.window.attributes("-topmost", True)
+        self.window.configure(bg="#007ACC", padx=1, pady=1)
+
+        frame = tk.Frame(self.window, bg="#1a1a1a", padx=8, pady=8)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.query_var = tk.StringVar()
+        self.entry = tk.Entry(frame, textvariable=self.query_var, bg="#2a2a2a", fg="white", insertbackground="white",
+                              relief=tk.FLAT, font=("Segoe UI", 14))
+        self.entry.pack(fill=tk.X, ipady=4)
+        self.listbox = tk.Listbox(frame, height=QUICK_LAUNCH_LIMIT, bg="#1a1a1a", fg="white", selectbackground="#007ACC",
+                                  selectforeground="white", relief=tk.FLAT, highlightthickness=0, activestyle="none",
+                                  font=("Segoe UI", 11))
+        self.listbox.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+
+        self.query_var.trace_add("write", self._on_query_change)
+        self.entry.bind("<Down>", lambda event: self._move_selection(1))
+        self.entry.bind("<Up>", lambda event: self._move_selection(-1))
+        self.entry.bind("<Return>", self.launch_selected)
+        self.entry.bind("<Escape>", lambda event: self.hide())
+        self.listbox.bind("<Double-1>", self.launch_selected)
+        self.window.bind("<FocusOut>", self._on_focus_out)
+
+    def is_visible(self):
+        return self.window.winfo_ismapped()
+
+    def show(self):
+        """Показывает окно по центру экрана с пустым запросом (в списке - недавно запущенные)."""
+        self._session = self.data_manager.fuzzy_session()
+        self._resetting = True
+        try:
+            self.query_var.set("")
+        finally:
+            self._resetting = False
+        self._refresh()
+        self.window.update_idletasks()
+        width = QUICK_LAUNCH_WIDTH
+        height = self.window.winfo_reqheight()
+        x = (self.window.winfo_screenwidth() - width) // 2
+        y = self.window.winfo_screenheight() // 4
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+        self.entry.focus_set()
+
+    def hide(self):
+        self.window.withdraw()
+        self._session = None
+
+    def toggle(self):
+        if self.is_visible():
+            self.hide()
+        else:
+            self.show()
+
+    def _on_focus_out(self, event):
+        # Фокус ушел из окна быстрого запуска целиком, а не между полем и списком
+        self.window.after_idle(self._hide_if_inactive)
+
+    def _hide_if_inactive(self):
+        if not self.is_visible():
+            return
+        focused = self.window.focus_get()
+        # Фокус в другой программе (None) или в другом окне лаунчера - щелчок мимо окна
+        if focused is None or focused.winfo_toplevel() is not self.window:
+            self.hide()
+
+    def _on_query_change(self, *args):
+        if self._resetting:
+            return
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+            self.window.after_idle(self._refresh)
+
+    def _refresh(self):
+        query = self.query_var.get()
+        if query.strip():
+            found = self.data_manager.fuzzy_search(query, QUICK_LAUNCH_LIMIT, session=self._session)
+            rows = [(program, category) for _, program, category in found]
+        else:
+            rows = [(program, self.data_manager.get_program_category(program))
+                    for program in self.data_manager.list_programs(RECENT_CATEGORY)[:QUICK_LAUNCH_LIMIT]]
+        self.results = [program for program, _ in rows]
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *(f"{program.get('name')}  —  {category}" for program, category in rows))
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        if self._pending_since is not None:
+            self.last_latency = time.perf_counter() - self._pending_since
+            self._pending_since = None
+
+    def _move_selection(self, step):
+        if not self.results:
+            return "break"
+        selection = self.listbox.curselection()
+        index = (selection[0] if selection else 0) + step
+        index = max(0, min(index, len(self.results) - 1))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.activate(index)
+        self.listbox.see(index)
+        return "break"
+
+    def launch_selected(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return "break"
+        program = self.results[selection[0]]
+        self.hide()
+        self.on_launch(program)
+        return "break"
@@ -0,0 +1,386 @@
+"""
+Поисковый индекс по программам лаунчера.
+Хранит для каждой записи строку поиска в нижнем регистре (имя, заметка,
+аргументы, путь) и триграммный индекс для быстрого отбора кандидатов,
+а также предвычисленные данные для нечеткого поиска (см. fuzzy_search).
+
+Перестройку можно отложить (rebuild(..., defer=True)): тогда индекс помнит только
+записи, первый запрос просматривает их подряд, а списки вхождений строятся
+ко второму запросу. Одиночному запросу (например, из командной строки) так не
+приходится ждать построения индекса по всей библиотеке.
+"""
+import heapq
+from collections import defaultdict
+
+from fuzzy_search import boundary_chars, prepare_program, score_program, score_texts_char, target_texts
+
+SEARCH_FIELDS = ("name", "note", "arguments", "path")
+
+
+def build_haystack(program):
+    """Строка поиска записи: поля в нижнем регистре, разделенные переводом строки."""
+    # Перевод строки не дает подстроке склеить два поля
+    return "\n".join(str(program.get(field, "") or "").lower() for field in SEARCH_FIELDS)
+
+
+def normalize_fuzzy_query(query):
+    """Запрос нечеткого поиска: нижний регистр, без пробелов."""
+    return "".join(query.lower().split())
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Инкрементальный индекс: записи добавляются, обновляются и удаляются по одной.
+    Ключ записи - id() записи программы; индекс держит ссылку на запись,
+    поэтому ключ остается уникальным, пока запись проиндексирована.
+    Одна и та же запись может лежать и в категории, и в избранном,
+    поэтому для записей ведется счетчик ссылок.
+    """
+
+    def __init__(self):
+        self._records = {} # key -> запись программы
+        self._refcounts = {} # key -> сколько раз запись добавлена
+        self._haystacks = {} # key -> строка поиска в нижнем регистре
+        self._trigram_postings = {} # триграмма -> множество ключей
+        self._fuzzy_targets = {} # key -> подготовленные цели нечеткого поиска
+        self._char_postings = {} # символ -> множество ключей, в чьих целях он встречается
+        self._boundary_postings = {} # символ -> множество ключей, где с него начинается слово
+        self._deferred = False # Списки вхождений еще не построены (см. rebuild)
+        self._scanned = False # Первый запрос при отложенном индексе уже выполнен просмотром
+        self._version = 0 # Растет при каждом изменении записей (см. FuzzySearchSession)
+
+    def __len__(self):
+        return len(self._records)
+
+    # Ключ записи - id() записи (встроенная функция, без лишних вызовов Python)
+    key = staticmethod(id)
+
+    _build_haystack = staticmethod(build_haystack)
+
+    def clear(self):
+        self._version += 1
+        self._records.clear()
+        self._refcounts.clear()
+        self._haystacks.clear()
+        self._trigram_postings.clear()
+        self._fuzzy_targets.clear()
+        self._char_postings.clear()
+        self._boundary_postings.clear()
+        self._deferred = False
+        self._scanned = False
+
+    def rebuild(self, programs, defer=False):
+        """
+        Полностью перестраивает индекс по переданным записям.
+        defer - запомнить только записи, а списки вхождений построить ко второму запросу.
+        """
+        self.clear()
+        self._deferred = defer
+        self.add_many(programs)
+
+    def add_many(self, programs):
+        """Добавляет пачку записей (см. add)."""
+        self._version += 1
+        added = []
+        for program in programs:
+            key = self.key(program)
+            refcount = self._refcounts.get(key, 0)
+            self._refcounts[key] = refcount + 1
+            if refcount:
+                continue
+            self._records[key] = program
+            added.append(program)
+        if not self._deferred:
+            self._index_records(added)
+
+    def _index_records(self, programs):
+        """
+        Строит строки поиска и списки вхождений для новых записей.
+        Списки вхождений копятся в list и сливаются с множествами один раз в конце -
+        это заметно быстрее поштучных set.add на больших библиотеках.
+        """
+        trigram_postings = defaultdict(list)
+        char_postings = defaultdict(list)
+        boundary_postings = defaultdict(list)
+        for program in programs:
+            key = self.key(program)
+            haystack = self._build_haystack(program)
+            self._haystacks[key] = haystack
+            for trigram in _trigrams(haystack):
+                trigram_postings[trigram].append(key)
+            targets = prepare_program(program)
+            self._fuzzy_targets[key] = targets
+            for ch in self._target_chars(targets):
+                char_postings[ch].append(key)
+            for ch in boundary_chars(targets):
+                boundary_postings[ch].append(key)
+
+        for postings_by_token, collected in ((self._trigram_postings, trigram_postings),
+                                             (self._char_postings, char_postings),
+                                             (self._boundary_postings, boundary_postings)):
+            for token, keys in collected.items():
+                postings = postings_by_token.get(token)
+                if postings is None:
+                    postings_by_token[token] = set(keys)
+                else:
+                    postings.update(keys)
+
+    def _use_scan(self):
+        """
+        Выполнять ли запрос просмотром записей: да для первого запроса при отложенном
+        индексе; перед вторым индекс строится, и дальше запросы идут по нему.
+        """
+        if not self._deferred:
+            return False
+        if not self._scanned:
+            self._scanned = True
+            return True
+        self._deferred = False
+        self._index_records(list(self._records.values()))
+        return False
+
+    def add(self, program):
+        """Добавляет запись (или еще одну ссылку на уже проиндексированную запись)."""
+        self._version += 1
+        key = self.key(program)
+        self._refcounts[key] = self._refcounts.get(key, 0) + 1
+        self._records[key] = program
+        self.update(program)
+
+    def update(self, program):
+        """Переиндексирует запись после изменения ее полей."""
+        key = self.key(program)
+        if key not in self._records or self._deferred:
+            return # При отложенном индексе строка поиска соберется при построении
+        haystack = self._build_haystack(program)
+        old_haystack = self._haystacks.get(key)
+        if old_haystack == haystack:
+            return
+        self._version += 1
+        if old_haystack is not None:
+            self._remove_postings(key, old_haystack)
+        self._haystacks[key] = haystack
+        for trigram in _trigrams(haystack):
+            self._trigram_postings.setdefault(trigram, set()).add(key)
+
+        targets = prepare_program(program)
+        self._fuzzy_targets[key] = targets
+        for ch in self._target_chars(targets):
+            self._char_postings.setdefault(ch, set()).add(key)
+        for ch in boundary_chars(targets):
+            self._boundary_postings.setdefault(ch, set()).add(key)
+
+    def remove(self, program):
+        """Удаляет одну ссылку на запись; запись уходит из индекса вместе с последней ссылкой."""
+        key = self.key(program)
+        refcount = self._refcounts.get(key)
+        if refcount is None:
+            return
+        if refcount > 1:
+            self._refcounts[key] = refcount - 1
+            return
+        self._version += 1
+        del self._refcounts[key]
+        del self._records[key]
+        haystack = self._haystacks.pop(key, None)
+        if haystack is not None:
+            self._remove_postings(key, haystack)
+
+    @staticmethod
+    def _target_chars(targets):
+        return set("".join(text for text, _ in targets))
+
+    def _remove_postings(self, key, haystack):
+        self._discard_postings(self._trigram_postings, _trigrams(haystack), key)
+
+        targets = self._fuzzy_targets.pop(key, None)
+        if targets is not None:
+            self._discard_postings(self._char_postings, self._target_chars(targets), key)
+            self._discard_postings(self._boundary_postings, boundary_chars(targets), key)
+
+    @staticmethod
+    def _discard_postings(postings_by_token, tokens, key):
+        for token in tokens:
+            postings = postings_by_token.get(token)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del postings_by_token[token]
+
+    def search_keys(self, query, candidates=None):
+        """
+        Возвращает множество ключей записей, содержащих query как подстроку.
+        candidates - необязательный список записей, которыми ограничивается поиск
+        (например, программы текущей категории).
+        """
+        query = query.lower()
+        if self._use_scan():
+            programs = candidates if candidates is not None else self._records.values()
+            return {self.key(p) for p in programs if query in self._build_haystack(p)}
+        if candidates is not None:
+            candidate_keys = [self.key(p) for p in candidates]
+        else:
+            candidate_keys = None
+
+        if len(query) < 3:
+            # Для коротких запросов триграммы не помогают - просматриваем строки поиска
+            keys = candidate_keys if candidate_keys is not None else self._haystacks.keys()
+            haystacks = self._haystacks
+            return {key for key in keys if query in haystacks.get(key, "")}
+
+        postings = []
+        for trigram in _trigrams(query):
+            posting = self._trigram_postings.get(trigram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        matched = set(postings[0])
+        for posting in postings[1:]:
+            matched &= posting
+            if not matched:
+                return matched
+        if candidate_keys is not None:
+            matched.intersection_update(candidate_keys)
+        haystacks = self._haystacks
+        return {key for key in matched if query in haystacks[key]}
+
+    def search(self, query, candidates=None):
+        """Возвращает список записей, содержащих query (порядок не определен)."""
+        return [self._records[key] for key in self.search_keys(query, candidates)]
+
+    def fuzzy_search(self, query, limit=50, boost=None):
+        """
+        Нечеткий поиск по всем проиндексированным записям.
+        Возвращает до limit пар (оценка, запись), лучшие первыми.
+        boost - необязательная функция record -> число, добавляемое к оценке
+        (например, за частые запуски).
+        """
+        query = normalize_fuzzy_query(query)
+        if not query:
+            return []
+        if self._use_scan():
+            return self._scan_fuzzy(query, limit, boost)
+        return self._rank(query, self._fuzzy_candidates(query), limit, boost)
+
+    def _fuzzy_candidates(self, query):
+        if len(query) == 1:
+            # Один символ совпадает почти со всем - как в лаунчерах, ищем только начала слов
+            return self._boundary_postings.get(query, ())
+
+        # Кандидаты - записи, в которых есть все символы запроса
+        postings = []
+        for ch in set(query):
+            posting = self._char_postings.get(ch)
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _rank(self, query, candidates, limit, boost, matched=None):
+        """Лучшие limit кандидатов; в список matched (если передан) попадают ключи всех совпавших."""
+        scored = []
+        targets = self._fuzzy_targets
+        records = self._records
+        for key in candidates:
+            score = score_program(query, targets[key])
+            if score is None:
+                continue
+            if matched is not None:
+                matched.append(key)
+            if boost is not None:
+                score += boost(records[key])
+            scored.append((score, key))
+
+        return [(score, records[key]) for score, key in heapq.nlargest(limit, scored)]
+
+    def _scan_fuzzy(self, query, limit, boost):
+        """fuzzy_search просмотром всех записей, без списков вхождений (тот же результат)."""
+        if len(query) == 1:
+            scored = self._scan_fuzzy_char(query, boost)
+        else:
+            scored = []
+            for key, program in self._records.items():
+                # Быстрый отсев до разбора целей: символы запроса должны идти по порядку в имени или пути
+                text = f"{program.get('name', '') or ''}\n{program.get('path', '') or ''}".lower()
+                position = -1
+                for ch in query:
+                    position = text.find(ch, position + 1)
+                    if position < 0:
+                        break
+                else:
+                    score = score_program(query, prepare_program(program))
+                    if score is None:
+                        continue
+                    if boost is not None:
+                        score += boost(program)
+                    scored.append((score, key))
+        records = self._records
+        return [(score, records[key]) for score, key in heapq.nlargest(limit, scored)]
+
+    def _scan_fuzzy_char(self, ch, boost):
+        """
+        Просмотр для запроса из одного символа: он ищется только в началах слов.
+        Записи без этого символа в имени и имени файла отсеиваются одной проверкой
+        подстроки, а остальные оцениваются score_texts_char - без разбора всех
+        границ слов (регулярное выражение по каждой записи заметно медленнее).
+        """
+        scored = []
+        for key, program in self._records.items():
+            # Цели поиска - имя и имя файла, поэтому каталоги пути не проверяются
+            name = program.get('name', '') or ''
+            path = program.get('path', '') or ''
+            basename = path[max(path.rfind("/"), path.rfind("\\")) + 1:]
+            if ch not in f"{name}\n{basename}".lower():
+                continue
+            score = score_texts_char(ch, target_texts(name, path))
+            if score is None:
+                continue
+            if boost is not None:
+                score += boost(program)
+            scored.append((score, key))
+        return scored
+
+
+class FuzzySearchSession:
+    """
+    Нечеткий поиск по мере набора (см. quick_launcher). Совпадения запроса "abc" всегда
+    есть среди совпадений "ab" (символы идут по порядку), поэтому, пока запрос только
+    дописывается, сессия оценивает лишь записи, совпавшие с предыдущим запросом, а не всех
+    кандидатов из списков вхождений. Любое изменение индекса сбрасывает сессию.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._query = None
+        self._matched = None # Ключи записей, совпавших с _query
+        self._version = None
+
+    def fuzzy_search(self, query, limit=50, boost=None):
+        """То же, что SearchIndex.fuzzy_search."""
+        index = self.index
+        query = normalize_fuzzy_query(query)
+        if not query:
+            self._query = None
+            return []
+        if index._use_scan():
+            # Отложенный индекс: первый запрос - просмотром, списки вхождений строит следующий
+            self._query = None
+            return index._scan_fuzzy(query, limit, boost)
+        if self._query is not None and self._version == index._version and query.startswith(self._query):
+            candidates = self._matched
+        else:
+            candidates = index._fuzzy_candidates(query)
+        if len(query) == 1:
+            # Один символ ищется только в началах слов - это не все совпадения, сужать по ним нельзя
+            self._query = None
+            return index._rank(query, candidates, limit, boost)
+        matched = []
+        results = index._rank(query, candidates, limit, boost, matched)
+        self._query, self._matched, self._version = query, matched, index._version
+        return results
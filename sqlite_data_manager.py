@@ -0,0 +1,804 @@
+"""
+Менеджер данных лаунчера поверх локальной базы SQLite.
+Тот же интерфейс, что и у DataManager, но данные не держатся в памяти целиком:
+категории, программы, избранное и настройки лежат в таблицах базы (режим WAL),
+а список категории, сортировка и поиск выполняются запросами SQL, так что
+в словари превращаются только нужные строки.
+
+При первом запуске база заполняется из launcher_data.json (одноразовая миграция),
+а get_all_data собирает словарь в том же формате для экспорта.
+"""
+import heapq
+import json
+import math
+import os
+import sqlite3
+
+from data_manager import (
+    FAVORITES_CATEGORY, FREQUENT_LAUNCH_BOOST, RECENT_CATEGORY, RECENT_LIMIT, SCORED_SORT_KEYS, ordered_categories,
+    sort_programs
+)
+from fuzzy_search import boundary_chars, prepare_program, score_program
+from launch_history import LaunchHistory, history_path_for
+from program_launcher import LaunchError, LaunchPlanCache
+from program_record import PROGRAM_FIELDS
+from search_index import build_haystack
+from storage import load_json_with_backups
+
+SCHEMA_VERSION = 1
+DEFAULT_WINDOW_GEOMETRY = "1000x600"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS programs (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    name TEXT,
+    path TEXT,
+    type TEXT,
+    note TEXT,
+    arguments TEXT,
+    working_directory TEXT,
+    name_key TEXT,
+    type_key TEXT,
+    haystack TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS programs_path ON programs(path);
+CREATE INDEX IF NOT EXISTS programs_category_name ON programs(category_id, name);
+CREATE INDEX IF NOT EXISTS programs_category_path ON programs(category_id, path);
+CREATE INDEX IF NOT EXISTS programs_category_name_key ON programs(category_id, name_key);
+CREATE INDEX IF NOT EXISTS programs_category_type_key ON programs(category_id, type_key, name_key);
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    path TEXT,
+    type TEXT,
+    note TEXT,
+    arguments TEXT,
+    working_directory TEXT,
+    name_key TEXT,
+    type_key TEXT,
+    haystack TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS favorites_path ON favorites(path);
+CREATE TABLE IF NOT EXISTS launch_counts (
+    path TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = "name, path, type, note, arguments, working_directory, name_key, type_key, haystack, extra"
+_SELECT_PROGRAM = "SELECT id, name, path, type, note, arguments, working_directory, extra FROM programs"
+_INSERT_PROGRAM = f"INSERT INTO programs (category_id, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_FAVORITE = f"INSERT INTO favorites ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_UPDATE_COLUMNS = ", ".join(f"{column} = ?" for column in _COLUMNS.split(", "))
+
+# Запись избранного показывает поля первой программы категории с тем же путем
+# (как общий словарь в DataManager), а если такой нет - собственные поля
+_SELECT_FAVORITES = """
+SELECT COALESCE(p.id, -f.id),
+       COALESCE(p.name, f.name), COALESCE(p.path, f.path), COALESCE(p.type, f.type),
+       COALESCE(p.note, f.note), COALESCE(p.arguments, f.arguments),
+       COALESCE(p.working_directory, f.working_directory),
+       CASE WHEN p.id IS NULL THEN f.extra ELSE p.extra END,
+       COALESCE(p.name_key, f.name_key) AS name_key, COALESCE(p.type_key, f.type_key) AS type_key,
+       f.id AS position
+FROM favorites f
+LEFT JOIN programs p ON p.id = (SELECT MIN(id) FROM programs WHERE path = f.path)
+"""
+
+# Сортировки списка программ (ключи как в data_manager.SORT_KEYS);
+# при равенстве сохраняется порядок добавления ({order}), как у устойчивой сортировки
+_ORDER_BY = {
+    ("name", False): "name_key, {order}",
+    ("name", True): "name_key DESC, {order}",
+    ("type", False): "type_key, name_key, {order}",
+    ("type", True): "type_key DESC, name_key DESC, {order}",
+}
+
+
+class ProgramRecord(dict):
+    """
+    Словарь программы, прочитанный из базы. key - ключ строки (см. program_key):
+    id программы в категории или отрицательный id записи избранного.
+    """
+    __slots__ = ("key",)
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _program_values(program):
+    """Значения колонок для записи программы (поля по умолчанию как в program_record.DEFAULT_FIELDS)."""
+    name = program.get('name')
+    program_type = program.get('type', "exe")
+    extra = {key: value for key, value in program.items() if key not in PROGRAM_FIELDS}
+    return (
+        name,
+        program.get('path'),
+        program_type,
+        program.get('note', ""),
+        program.get('arguments', ""),
+        program.get('working_directory', ""),
+        (name or "").lower(),
+        (program_type or "").lower(),
+        build_haystack(program),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def _with_default_fields(program):
+    """Копия словаря программы с полями по умолчанию (как program_record.DEFAULT_FIELDS)."""
+    return {"note": "", "arguments": "", "working_directory": "", "type": "exe", **program}
+
+
+def _record_from_row(row):
+    record = ProgramRecord(zip(PROGRAM_FIELDS, row[1:7]))
+    if row[7]:
+        record.update(json.loads(row[7]))
+    record.key = row[0]
+    return record
+
+
+class SqliteDataManager:
+    def __init__(self, filename="launcher_data.json", db_filename=None):
+        """
+        filename - JSON-файл данных, из которого выполняется миграция;
+        база по умолчанию лежит рядом с ним с расширением .db.
+        """
+        self.filename = filename
+        self.db_filename = db_filename or os.path.splitext(filename)[0] + ".db"
+        self.conn = None
+        self.current_category_name = None
+        self.launch_history = LaunchHistory(history_path_for(filename))
+        self.launch_plans = LaunchPlanCache() # Планы запуска по пути, сбрасываются при правке записи
+        self._fuzzy_targets = {} # ключ записи -> (имя, путь, подготовленные цели нечеткого поиска)
+
+    def load_data(self, defer_categories=False):
+        """Открывает базу; строки читаются по запросу, поэтому defer_categories не нужен."""
+        if self.conn is None:
+            # Соединение кэширует подготовленные запросы, поэтому SQL ниже - константные строки
+            self.conn = sqlite3.connect(self.db_filename, cached_statements=256)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self.conn.executescript(_SCHEMA)
+            self._migrate_from_json()
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.conn.commit()
+
+    def is_loading(self):
+        return False
+
+    def integrate_loaded_categories(self, max_programs=None):
+        return []
+
+    def _migrate_from_json(self):
+        """Однократно переносит данные из JSON-файла в пустую базу."""
+        try:
+            loaded_data, source = load_json_with_backups(self.filename)
+        except Exception as e:
+            print(f"Неожиданная ошибка при чтении {self.filename} для миграции: {e}")
+            return
+        if not isinstance(loaded_data, dict):
+            return
+        # Копируем как есть, вместе с возможными дубликатами - импорт бы их объединил
+        for category_name, programs in ordered_categories(loaded_data).items():
+            self.add_category(category_name)
+            category_id = self._category_id(category_name)
+            self.conn.executemany(_INSERT_PROGRAM, ((category_id,) + _program_values(program) for program in programs))
+        self.conn.executemany(_INSERT_FAVORITE, (_program_values(program) for program in loaded_data.get("favorites", [])))
+        self._set_setting("last_selected_category", loaded_data.get("last_selected_category"))
+        self._set_setting("window_geometry", loaded_data.get("window_geometry", DEFAULT_WINDOW_GEOMETRY))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO launch_counts (path, count) VALUES (?, ?)",
+            loaded_data.get("launch_counts", {}).items()
+        )
+        print(f"Данные перенесены из {source} в базу {self.db_filename}.")
+
+    def save_data(self):
+        """Фиксирует изменения в базе."""
+        if self.conn is not None:
+            self.conn.commit()
+
+    def schedule_save(self):
+        """Фиксация транзакции в режиме WAL дешевая, поэтому выполняется сразу."""
+        self.save_data()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+        self.launch_history.close()
+
+    @staticmethod
+    def program_key(program):
+        """Ключ записи программы (см. ProgramRecord.key)."""
+        return program.key
+
+    # Настройки
+
+    def _get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_setting(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False)))
+
+    def set_current_category_name(self, name):
+        self.current_category_name = name
+
+    def get_current_category_name(self):
+        return self.current_category_name
+
+    def set_last_selected_category(self, category_name):
+        self._set_setting("last_selected_category", category_name)
+
+    def get_last_selected_category(self):
+        return self._get_setting("last_selected_category")
+
+    def set_window_geometry(self, geometry_string):
+        """Сохраняет строку геометрии окна."""
+        self._set_setting("window_geometry", geometry_string)
+
+    def get_window_geometry(self):
+        """Возвращает сохраненную строку геометрии окна."""
+        return self._get_setting("window_geometry", DEFAULT_WINDOW_GEOMETRY)
+
+    # Категории
+
+    def _category_id(self, category_name):
+        row = self.conn.execute("SELECT id FROM categories WHERE name = ?", (category_name,)).fetchone()
+        return row[0] if row else None
+
+    def _next_category_position(self):
+        return self.conn.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM categories").fetchone()[0]
+
+    def get_categories(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM categories ORDER BY position")]
+
+    def add_category(self, category_name):
+        if self._category_id(category_name) is None:
+            self.conn.execute("INSERT INTO categories (name, position) VALUES (?, ?)", (category_name, self._next_category_position()))
+            return True
+        return False
+
+    def rename_category(self, old_name, new_name):
+        category_id = self._category_id(old_name)
+        if category_id is not None and self._category_id(new_name) is None:
+            # Переименованная категория уходит в конец списка, как в DataManager
+            self.conn.execute("UPDATE categories SET name = ?, position = ? WHERE id = ?", (new_name, self._next_category_position(), category_id))
+            if self.get_last_selected_category() == old_name:
+                self.set_last_selected_category(new_name)
+            if self.current_category_name == old_name:
+                self.current_category_name = new_name
+            return True
+        return False
+
+    def delete_category(self, category_name):
+        category_id = self._category_id(category_name)
+        if category_id is not None:
+            self.conn.execute("DELETE FROM programs WHERE category_id = ?", (category_id,))
+            self.conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            self.launch_plans.clear()
+            if self.get_last_selected_category() == category_name:
+                self.set_last_selected_category(None)
+            if self.current_category_name == category_name:
+                self.current_category_name = None
+            return True
+        return False
+
+    # Программы
+
+    def get_programs_in_category(self, category_name):
+        return self.list_programs(category_name)
+
+    def list_programs(self, category_name, sort_by=None, descending=False):
+        """
+        Возвращает отсортированный список программ категории
+        (FAVORITES_CATEGORY - список избранного, RECENT_CATEGORY - последние запущенные).
+        Сортировка выполняется в SQL; сортировки по истории запусков (SCORED_SORT_KEYS) -
+        в Python, потому что история хранится вне базы.
+        """
+        if sort_by in SCORED_SORT_KEYS or category_name == RECENT_CATEGORY:
+            if category_name == RECENT_CATEGORY:
+                programs = self.get_recent_programs()
+            else:
+                programs = self.list_programs(category_name)
+            return sort_programs(programs, sort_by, descending, self.get_sort_scores(sort_by))
+        order_by = _ORDER_BY.get((sort_by, descending), "{order}")
+        if category_name == FAVORITES_CATEGORY:
+            rows = self.conn.execute(f"{_SELECT_FAVORITES} ORDER BY {order_by.format(order='position')}")
+        else:
+            category_id = self._category_id(category_name)
+            if category_id is None:
+                return []
+            rows = self.conn.execute(f"{_SELECT_PROGRAM} WHERE category_id = ? ORDER BY {order_by.format(order='id')}", (category_id,))
+        return [_record_from_row(row) for row in rows]
+
+    def get_all_program_paths(self):
+        """Множество путей всех программ в категориях и избранном."""
+        rows = self.conn.execute("SELECT path FROM programs UNION SELECT path FROM favorites")
+        return {row[0] for row in rows}
+
+    def get_launch_targets(self):
+        """
+        Пути программ и их рабочие каталоги (путь -> каталог или "") для фоновой
+        проверки путей; берутся те же записи, что вернет get_program_data_by_path.
+        """
+        targets = {}
+        # Строки идут от новых к старым, поэтому в словаре остается первая запись пути
+        for table in ("favorites", "programs"):
+            for path, working_directory in self.conn.execute(f"SELECT path, working_directory FROM {table} ORDER BY id DESC"):
+                targets[path] = working_directory or ""
+        return targets
+
+    def add_program(self, category_name, program_name, program_path, program_type="exe", arguments="", working_directory=""):
+        category_id = self._category_id(category_name)
+        if category_id is None:
+            return False
+        exists = self.conn.execute(
+            "SELECT 1 FROM programs WHERE category_id = ? AND (name = ? OR path = ?) LIMIT 1",
+            (category_id, program_name, program_path)
+        ).fetchone()
+        if exists:
+            return False
+        program = {
+            "name": program_name,
+            "path": program_path,
+            "type": program_type,
+            "note": "",
+            "arguments": arguments,
+            "working_directory": working_directory
+        }
+        self.conn.execute(_INSERT_PROGRAM, (category_id,) + _program_values(program))
+        self.launch_plans.invalidate(program_path)
+        return True
+
+    def add_programs(self, category_name, programs):
+        """
+        Добавляет пачку программ (словари полей, см. folder_scanner) в категорию
+        одним executemany. Программы с занятым в категории именем или путем
+        пропускаются. Возвращает число добавленных.
+        """
+        category_id = self._category_id(category_name)
+        if category_id is None:
+            return 0
+        names, paths = set(), set()
+        added = []
+        for fields in programs:
+            program = {
+                "name": fields.get('name'),
+                "path": fields.get('path'),
+                "type": fields.get('type') or "exe",
+                "note": fields.get('note', ""),
+                "arguments": fields.get('arguments', ""),
+                "working_directory": fields.get('working_directory', "")
+            }
+            if program["name"] in names or program["path"] in paths:
+                continue
+            # Два запроса по индексам: с OR SQLite перебирает всю категорию, а она растет с каждой пачкой
+            exists = self.conn.execute(
+                "SELECT 1 FROM programs WHERE category_id = ? AND name = ? "
+                "UNION ALL SELECT 1 FROM programs WHERE category_id = ? AND path = ? LIMIT 1",
+                (category_id, program["name"], category_id, program["path"])
+            ).fetchone()
+            if exists:
+                continue
+            names.add(program["name"])
+            paths.add(program["path"])
+            added.append(program)
+        self.conn.executemany(_INSERT_PROGRAM, ((category_id,) + _program_values(program) for program in added))
+        for program in added:
+            self.launch_plans.invalidate(program["path"])
+        return len(added)
+
+    def _first_program_row(self, where, params):
+        return self.conn.execute(f"{_SELECT_PROGRAM} WHERE {where} ORDER BY id LIMIT 1", params).fetchone()
+
+    def _update_row(self, table, row_id, program):
+        self.conn.execute(f"UPDATE {table} SET {_UPDATE_COLUMNS} WHERE id = ?", _program_values(program) + (row_id,))
+        self.launch_plans.invalidate(program.get('path'))
+
+    def update_program_details(self, category_name, old_program_path, new_program_name, new_program_path):
+        """
+        Обновляет имя и/или путь к программе в указанной категории.
+        Также обновляет путь в избранном, если программа там есть.
+        """
+        program_updated = False
+        self.launch_plans.invalidate(old_program_path)
+        category_id = self._category_id(category_name)
+        row = self._first_program_row("category_id = ? AND path = ?", (category_id, old_program_path)) if category_id is not None else None
+        if row is not None:
+            program = _record_from_row(row)
+            program.update(name=new_program_name, path=new_program_path)
+            self._update_row("programs", row[0], program)
+            program_updated = True
+
+        favorite_rows = self.conn.execute(
+            "SELECT id, name, path, type, note, arguments, working_directory, extra FROM favorites WHERE path = ?",
+            (old_program_path,)
+        ).fetchall()
+        for favorite_row in favorite_rows:
+            favorite = _record_from_row(favorite_row)
+            favorite.update(name=new_program_name, path=new_program_path)
+            self._update_row("favorites", favorite_row[0], favorite)
+        return program_updated
+
+    def delete_program(self, category_name, program_name):
+        category_id = self._category_id(category_name)
+        if category_id is None:
+            return False
+        cursor = self.conn.execute("DELETE FROM programs WHERE category_id = ? AND name = ?", (category_id, program_name))
+        if cursor.rowcount:
+            self.launch_plans.clear() # Путь удаленной записи неизвестен, а удаление - редкая операция
+        return cursor.rowcount > 0
+
+    def get_program_data_by_path(self, program_path):
+        """
+        Ищет и возвращает полный словарь данных программы по ее пути
+        как в категориях, так и в избранном.
+        Возвращает None, если программа не найдена.
+        """
+        row = self._first_program_row("path = ?", (program_path,))
+        if row is not None:
+            return _record_from_row(row)
+        row = self.conn.execute(
+            "SELECT -id, name, path, type, note, arguments, working_directory, extra FROM favorites WHERE path = ? ORDER BY id LIMIT 1",
+            (program_path,)
+        ).fetchone()
+        return _record_from_row(row) if row is not None else None
+
+    def update_program_details_with_full_data(self, program_path, note=None, arguments=None, working_directory=None,
+                                              warm=None, single_instance=None):
+        """
+        Обновляет заметку, аргументы, рабочий каталог и флаги запуска (warm - теплый запуск,
+        single_instance - один экземпляр) для программы, найденной по ее пути.
+        Если соответствующее значение None, оно не обновляется.
+        """
+        program = self.get_program_data_by_path(program_path)
+        if not program:
+            return False
+        if note is not None:
+            program['note'] = note
+        if arguments is not None:
+            program['arguments'] = arguments
+        if working_directory is not None:
+            program['working_directory'] = working_directory
+        # Флаги лежат в колонке extra, только если их хоть раз включали
+        if warm is not None and (warm or 'warm' in program):
+            program['warm'] = warm
+        if single_instance is not None and (single_instance or 'single_instance' in program):
+            program['single_instance'] = single_instance
+        if program.key > 0:
+            self._update_row("programs", program.key, program)
+        else:
+            self._update_row("favorites", -program.key, program)
+        return True
+
+    def set_launch_profiles(self, program_path, profiles, active_profile=None):
+        """
+        Заменяет профили запуска программы (список словарей, см. program_launcher.normalize_profile)
+        и профиль по умолчанию (имя или None - запуск без профиля). Хранятся в колонке extra.
+        """
+        program = self.get_program_data_by_path(program_path)
+        if not program:
+            return False
+        if profiles or 'profiles' in program:
+            program['profiles'] = [dict(profile) for profile in profiles]
+        if active_profile or 'active_profile' in program:
+            program['active_profile'] = active_profile
+        if program.key > 0:
+            self._update_row("programs", program.key, program)
+        else:
+            self._update_row("favorites", -program.key, program)
+        return True
+
+    # Избранное
+
+    def add_favorite(self, program_data):
+        """
+        Добавляет программу в список избранных.
+        program_data должен быть полным словарем данных программы.
+        """
+        if self.is_favorite(program_data.get('path')):
+            return False
+        self.conn.execute(_INSERT_FAVORITE, _program_values(program_data))
+        self.launch_plans.invalidate(program_data.get('path'))
+        return True
+
+    def remove_favorite(self, program_path):
+        """Удаляет программу из списка избранных по пути."""
+        cursor = self.conn.execute("DELETE FROM favorites WHERE path = ?", (program_path,))
+        self.launch_plans.invalidate(program_path)
+        return cursor.rowcount > 0
+
+    def get_favorites(self):
+        """Возвращает список всех избранных программ."""
+        return self.list_programs(FAVORITES_CATEGORY)
+
+    def is_favorite(self, program_path):
+        """Проверяет, является ли программа избранной по пути."""
+        return self.conn.execute("SELECT 1 FROM favorites WHERE path = ? LIMIT 1", (program_path,)).fetchone() is not None
+
+    # Поиск
+
+    def search_program_keys(self, query, programs=None):
+        """
+        Возвращает множество ключей (см. program_key) программ, у которых query
+        встречается в имени, заметке, аргументах или пути.
+        programs ограничивает поиск переданным списком (например, текущей категорией).
+        """
+        query = query.lower()
+        if programs is None:
+            return {row[0] for row in self.conn.execute(
+                "SELECT id FROM programs WHERE instr(haystack, ?) > 0 "
+                "UNION ALL SELECT -id FROM favorites WHERE instr(haystack, ?) > 0",
+                (query, query)
+            )}
+        # Проверяем только строки переданных записей (поиск по первичному ключу)
+        program_ids = json.dumps([program.key for program in programs if program.key > 0])
+        favorite_ids = json.dumps([-program.key for program in programs if program.key < 0])
+        return {row[0] for row in self.conn.execute(
+            "SELECT id FROM programs WHERE id IN (SELECT value FROM json_each(?)) AND instr(haystack, ?) > 0 "
+            "UNION ALL SELECT -id FROM favorites WHERE id IN (SELECT value FROM json_each(?)) AND instr(haystack, ?) > 0",
+            (program_ids, query, favorite_ids, query)
+        )}
+
+    def search_programs(self, query, programs=None):
+        """Возвращает список программ, подходящих под query (см. search_program_keys)."""
+        if programs is not None:
+            keys = self.search_program_keys(query, programs)
+            return [program for program in programs if program.key in keys]
+        query = query.lower()
+        rows = self.conn.execute(f"{_SELECT_PROGRAM} WHERE instr(haystack, ?) > 0", (query,))
+        return [_record_from_row(row) for row in rows]
+
+    def _fuzzy_targets_for(self, key, name, path):
+        cached = self._fuzzy_targets.get(key)
+        if cached is None or cached[0] != name or cached[1] != path:
+            cached = (name, path, prepare_program({"name": name, "path": path}))
+            self._fuzzy_targets[key] = cached
+        return cached[2]
+
+    def fuzzy_session(self):
+        """Сессии поиска по мере набора не нужны: кандидатов отбирает SQL (см. fuzzy_search)."""
+        return None
+
+    def fuzzy_search(self, query, limit=50, session=None):
+        """
+        Нечеткий поиск сразу по всем категориям и избранному.
+        Возвращает до limit кортежей (оценка, программа, категория), лучшие первыми.
+        Кандидаты отбираются в SQL шаблоном LIKE '%a%b%c%' (символы запроса по порядку),
+        а оцениваются так же, как в DataManager. session принимается для совместимости
+        с DataManager и не используется.
+        """
+        query = "".join(query.lower().split())
+        if not query:
+            return []
+        if len(query) == 1:
+            # Один символ - только начала слов
+            letter = _escape_like(query)
+            condition = "(name_key LIKE ? ESCAPE '\\' OR name_key LIKE ? ESCAPE '\\')"
+            params = (letter + "%", "% " + letter + "%")
+        else:
+            condition = "haystack LIKE ? ESCAPE '\\'"
+            params = ("%" + "%".join(_escape_like(ch) for ch in query) + "%",)
+
+        launch_counts = dict(self.conn.execute("SELECT path, count FROM launch_counts"))
+        rows = self.conn.execute(
+            f"SELECT p.id, p.name, p.path, c.name FROM programs p JOIN categories c ON c.id = p.category_id WHERE {condition} "
+            f"UNION ALL SELECT -id, name, path, NULL FROM favorites WHERE {condition} "
+            "AND NOT EXISTS (SELECT 1 FROM programs WHERE programs.path = favorites.path)",
+            params + params
+        )
+        scored = []
+        for key, name, path, category_name in rows:
+            targets = self._fuzzy_targets_for(key, name, path)
+            if len(query) == 1 and query not in boundary_chars(targets):
+                continue
+            score = score_program(query, targets)
+            if score is None:
+                continue
+            count = launch_counts.get(path, 0)
+            if count:
+                score += FREQUENT_LAUNCH_BOOST * math.log1p(count)
+            scored.append((score, key, path, category_name))
+
+        results = []
+        seen_paths = set()
+        for score, key, path, category_name in heapq.nlargest(limit * 2, scored):
+            if path in seen_paths:
+                continue
+            seen_paths.add(path)
+            if key > 0:
+                row = self.conn.execute(f"{_SELECT_PROGRAM} WHERE id = ?", (key,)).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT -id, name, path, type, note, arguments, working_directory, extra FROM favorites WHERE id = ?", (-key,)
+                ).fetchone()
+            results.append((score, _record_from_row(row), category_name or FAVORITES_CATEGORY))
+            if len(results) >= limit:
+                break
+        return results
+
+    def record_launch(self, program_path, arguments=""):
+        """
+        Учитывает запуск программы (для ранжирования в поиске) и добавляет его
+        в историю запусков. Возвращает запись истории (launch_history.LaunchRecord).
+        """
+        self.conn.execute(
+            "INSERT INTO launch_counts (path, count) VALUES (?, 1) ON CONFLICT(path) DO UPDATE SET count = count + 1",
+            (program_path,)
+        )
+        return self.launch_history.record_launch(program_path, arguments)
+
+    def get_launch_plan(self, program_path, profile_name=None, fs=os.path):
+        """
+        План запуска программы (program_launcher.LaunchRequest) с профилем profile_name:
+        собирается при первом запуске после правки записи, дальше берется из кэша
+        без запроса к базе и обращения к диску. fs - см. program_launcher.resolve_launch.
+        Ошибки - program_launcher.LaunchError.
+        """
+        plan = self.launch_plans.get(program_path, profile_name)
+        if plan is not None:
+            return plan
+        program = self.get_program_data_by_path(program_path)
+        if program is None:
+            raise LaunchError(f"Программа {program_path} не найдена в лаунчере.")
+        return self.launch_plans.build(program, profile_name, fs)
+
+    def note_file_changed(self, program_path):
+        """
+        Файл программы или ее каталог изменился на диске (см. file_watcher): сбрасывает
+        кэшированный план запуска. Возвращает True, если программа есть в лаунчере.
+        """
+        self.launch_plans.invalidate(program_path)
+        return self.get_program_data_by_path(program_path) is not None
+
+    def get_sort_scores(self, sort_by):
+        """Оценки для сортировок из SCORED_SORT_KEYS (путь -> оценка) или None для обычных."""
+        if sort_by in SCORED_SORT_KEYS:
+            return self.launch_history.scores(sort_by)
+        return None
+
+    def get_recent_programs(self, limit=RECENT_LIMIT):
+        """Последние запущенные программы, которые еще есть в лаунчере, - самые свежие первыми."""
+        programs = []
+        for path in self.launch_history.recent_paths(limit):
+            program = self.get_program_data_by_path(path)
+            if program is not None:
+                programs.append(program)
+        return programs
+
+    def get_program_category(self, program):
+        """Категория записи программы (FAVORITES_CATEGORY для записи избранного)."""
+        if program.key < 0:
+            return FAVORITES_CATEGORY
+        row = self.conn.execute(
+            "SELECT c.name FROM programs p JOIN categories c ON c.id = p.category_id WHERE p.id = ?",
+            (program.key,)
+        ).fetchone()
+        return row[0] if row else FAVORITES_CATEGORY
+
+    # Импорт и экспорт
+
+    def get_all_data(self):
+        """Собирает все данные в формате launcher_data.json (для экспорта)."""
+        categories = {name: [] for name in self.get_categories()}
+        names_by_id = dict(self.conn.execute("SELECT id, name FROM categories"))
+        rows = self.conn.execute("SELECT category_id, id, name, path, type, note, arguments, working_directory, extra FROM programs ORDER BY id")
+        for row in rows:
+            categories[names_by_id[row[0]]].append(dict(_record_from_row(row[1:])))
+        return {
+            "categories": categories,
+            "last_selected_category": self.get_last_selected_category(),
+            "window_geometry": self.get_window_geometry(),
+            "favorites": [dict(program) for program in self.get_favorites()],
+            "launch_counts": dict(self.conn.execute("SELECT path, count FROM launch_counts")),
+        }
+
+    def get_export_settings(self):
+        """Настройки для экспорта (см. launcher_archive): последняя категория, геометрия окна, счетчики запусков."""
+        return {
+            "last_selected_category": self.get_last_selected_category(),
+            "window_geometry": self.get_window_geometry(),
+            "launch_counts": dict(self.conn.execute("SELECT path, count FROM launch_counts")),
+        }
+
+    def iter_export_programs(self, category_name):
+        """
+        Программы категории (FAVORITES_CATEGORY - избранное) словарями по одной,
+        в порядке хранения; строки читаются курсором, а не списком целиком.
+        """
+        if category_name == FAVORITES_CATEGORY:
+            rows = self.conn.execute(f"{_SELECT_FAVORITES} ORDER BY position")
+            for row in rows:
+                yield dict(_record_from_row(row))
+            return
+        category_id = self._category_id(category_name)
+        if category_id is None:
+            return
+        for row in self.conn.execute(f"{_SELECT_PROGRAM} WHERE category_id = ? ORDER BY id", (category_id,)):
+            yield dict(_record_from_row(row))
+
+    def find_program(self, category_name, program_path):
+        """Запись программы категории с путем program_path (та, что обновит импорт) или None."""
+        category_id = self._category_id(category_name)
+        if category_id is None:
+            return None
+        row = self._first_program_row("category_id = ? AND path = ?", (category_id, program_path))
+        return _record_from_row(row) if row is not None else None
+
+    def find_favorite(self, program_path):
+        """Запись избранного с путем program_path или None."""
+        row = self.conn.execute(
+            "SELECT id, name, path, type, note, arguments, working_directory, extra FROM favorites WHERE path = ? ORDER BY id LIMIT 1",
+            (program_path,)
+        ).fetchone()
+        return _record_from_row(row) if row is not None else None
+
+    def count_programs(self):
+        """Число записей программ во всех категориях (без избранного)."""
+        return self.conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0]
+
+    def import_all_data(self, imported_data, strategy="merge"):
+        """
+        Импортирует данные из внешнего источника.
+        strategy: "replace" (заменяет все текущие данные) или "merge" (объединяет данные).
+        """
+        self.launch_plans.clear()
+        if strategy == "replace":
+            # Геометрия окна и счетчики запусков сохраняются
+            self.conn.execute("DELETE FROM programs")
+            self.conn.execute("DELETE FROM categories")
+            self.conn.execute("DELETE FROM favorites")
+            self._set_setting("last_selected_category", None)
+
+        for category_name, programs_list in imported_data.get("categories", {}).items():
+            if self._category_id(category_name) is None:
+                self.add_category(category_name)
+            category_id = self._category_id(category_name)
+            for imported_program in programs_list:
+                row = self._first_program_row("category_id = ? AND path = ?", (category_id, imported_program.get('path')))
+                if row is not None:
+                    # Обновляем существующую программу
+                    program = _record_from_row(row)
+                    program.update(_with_default_fields(imported_program))
+                    self._update_row("programs", row[0], program)
+                else:
+                    self.conn.execute(_INSERT_PROGRAM, (category_id,) + _program_values(imported_program))
+
+        for imported_favorite in imported_data.get("favorites", []):
+            row = self.conn.execute(
+                "SELECT id, name, path, type, note, arguments, working_directory, extra FROM favorites WHERE path = ? ORDER BY id LIMIT 1",
+                (imported_favorite.get('path'),)
+            ).fetchone()
+            if row is not None:
+                # Обновляем существующее избранное
+                favorite = _record_from_row(row)
+                favorite.update(_with_default_fields(imported_favorite))
+                self._update_row("favorites", row[0], favorite)
+            else:
+                self.conn.execute(_INSERT_FAVORITE, _program_values(imported_favorite))
+
+        categories = set(self.get_categories())
+        last_selected = self.get_last_selected_category()
+        if "last_selected_category" in imported_data and imported_data["last_selected_category"] in categories:
+            self.set_last_selected_category(imported_data["last_selected_category"])
+        elif last_selected is not None and last_selected not in categories:
+            self.set_last_selected_category(None) # Сбрасываем, если категория больше не существует
@@ -0,0 +1,37 @@
+"""
+Хронология запуска лаунчера: отметки времени (импорт, загрузка данных,
+первая отрисовка, первая иконка) относительно начала запуска.
+Печатается, если main_app запущен с флагом --startup-timeline.
+"""
+import time
+
+
+class StartupTimeline:
+    def __init__(self, start=None, echo=False):
+        """start - time.perf_counter() начала запуска; echo - печатать отметки по мере появления."""
+        self.start = time.perf_counter() if start is None else start
+        self.echo = echo
+        self.marks = [] # [(событие, секунд от начала)] в порядке появления
+
+    def mark(self, event):
+        """Отмечает событие (повторные отметки того же события игнорируются)."""
+        if self.elapsed(event) is not None:
+            return
+        self.marks.append((event, time.perf_counter() - self.start))
+        if self.echo:
+            print(self.format_mark(*self.marks[-1]))
+
+    def elapsed(self, event):
+        """Секунды от начала до события или None, если события еще не было."""
+        for name, seconds in self.marks:
+            if name == event:
+                return seconds
+        return None
+
+    @staticmethod
+    def format_mark(event, seconds):
+        return f"[запуск] {seconds * 1000:8.1f} мс  {event}"
+
+    def report(self):
+        """Все отметки одной строкой на событие."""
+        return "\n".join(self.format_mark(event, seconds) for event, seconds in self.marks)
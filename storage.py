@@ -0,0 +1,623 @@
+"""
+Запись файла данных лаунчера на диск.
+Файл пишется атомарно (временный файл + fsync + os.replace) с ротацией
+нескольких резервных копий, а частые сохранения объединяются и выполняются
+в фоновом потоке (см. SaveScheduler).
+Хранилище выбирается через create_storage: полный JSON (JsonStorage)
+или журнал изменений со свертками в снимок (JournalStorage).
+"""
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_SAVE_DELAY = 0.5 # секунд тишины перед фоновой записью
+JSON_INDENT = 4
+READ_CHUNK = 1 << 20 # Символов за одно чтение файла
+
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+def backup_filename(filename, number):
+    """Имя резервной копии номер number (1 - самая свежая)."""
+    return f"{filename}.bak{number}"
+
+
+def _fsync_directory(directory):
+    # На Windows каталоги нельзя открыть для fsync - там os.replace и так надежен
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def rotate_backups(filename, backup_count, keep_current=False):
+    """
+    Сдвигает резервные копии (.bak1 -> .bak2 ...) и превращает текущий файл в .bak1.
+    keep_current - текущий файл остается на месте, а .bak1 становится его жесткой
+    ссылкой (или копией, если ссылки не поддерживаются): файл не пропадает ни на миг.
+    """
+    if backup_count <= 0 or not os.path.exists(filename):
+        return
+    for number in range(backup_count - 1, 0, -1):
+        older = backup_filename(filename, number)
+        if os.path.exists(older):
+            os.replace(older, backup_filename(filename, number + 1))
+    newest = backup_filename(filename, 1)
+    if not keep_current:
+        os.replace(filename, newest)
+        return
+    temp_backup = f"{newest}.tmp"
+    if os.path.exists(temp_backup):
+        os.remove(temp_backup)
+    try:
+        os.link(filename, temp_backup)
+    except OSError:
+        import shutil
+
+        shutil.copy2(filename, temp_backup)
+    os.replace(temp_backup, newest)
+
+
+def atomic_write_json(filename, data, backup_count=DEFAULT_BACKUP_COUNT):
+    """
+    Атомарно записывает data в filename в формате JSON.
+    Сначала пишется и синхронизируется временный файл, затем текущий файл
+    получает резервную копию .bak1 (жесткую ссылку), а временный заменяет его
+    одним os.replace. Файл filename существует все время: читатель или процесс
+    после сбоя видит либо старый, либо новый JSON, но не обрезанный и не пропавший.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=JSON_INDENT, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    rotate_backups(filename, backup_count, keep_current=True)
+    os.replace(temp_filename, filename)
+    _fsync_directory(directory)
+
+
+def load_json_with_backups(filename, backup_count=DEFAULT_BACKUP_COUNT):
+    """
+    Читает JSON из filename, а если он поврежден или отсутствует после
+    прерванной записи - из самой свежей читаемой резервной копии.
+    Возвращает (данные, имя прочитанного файла) или (None, None).
+    """
+    candidates = [filename] + [backup_filename(filename, n) for n in range(1, backup_count + 1)]
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                return json.load(f), candidate
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Ошибка чтения JSON из {candidate}: {e}")
+    return None, None
+
+
+class JsonStreamReader:
+    """
+    Разбор JSON из файла порциями по chunk_size символов: объекты и массивы
+    обходятся по одному ключу или элементу (iter_object, iter_array), а в памяти
+    держится только текущая порция и разбираемое значение. Чтение можно начать
+    в одном потоке и продолжить в другом (не одновременно).
+    """
+
+    def __init__(self, f, chunk_size=READ_CHUNK):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self._eof = False
+
+    def _fill(self):
+        """Дочитывает порцию; False - файл кончился."""
+        if self._eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        if self.position > self.chunk_size:
+            self.buffer = self.buffer[self.position:] # Разобранное начало больше не нужно
+            self.position = 0
+        self.buffer += chunk
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self.position = _WHITESPACE_RE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self._fill():
+                return
+
+    def peek(self):
+        """Следующий значащий символ ("" - конец файла)."""
+        self._skip_whitespace()
+        return self.buffer[self.position:self.position + 1]
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"ожидался символ '{char}'")
+        self.position += 1
+
+    def read_value(self):
+        """Разбирает следующее значение целиком."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue # Значение оборвалось на границе порции
+                raise
+            if end == len(self.buffer) and self._fill():
+                continue # Число или литерал мог оборваться на границе порции
+            self.position = end
+            return value
+
+    def skip_value(self):
+        """Пропускает следующее значение, не держа в памяти большие объекты и массивы целиком."""
+        char = self.peek()
+        if char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        elif char == "[":
+            for _ in self.iter_array():
+                pass
+        else:
+            self.read_value()
+
+    def iter_object(self):
+        """Ключи объекта; значение каждого ключа вызывающий читает сам до следующего шага."""
+        self._expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError("ожидался ключ объекта")
+            self._expect(":")
+            yield key
+            separator = self.peek()
+            self.position += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("ожидалась запятая между членами объекта")
+
+    def iter_array(self):
+        """
+        Элементы массива по одному. Между элементами поток может уступить GIL,
+        поэтому разбор большого массива в фоновом потоке не останавливает поток интерфейса.
+        """
+        self._expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self.peek()
+            self.position += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("ожидалась запятая между элементами массива")
+
+
+def read_json_head(filename, stop_key):
+    """
+    Читает порциями пары верхнего уровня JSON-объекта из filename до ключа stop_key.
+    Возвращает (прочитанные пары, JsonStreamReader на начале значения stop_key):
+    файл остается открытым, дочитывает и закрывает его вызывающий (reader.file).
+    Если ключа stop_key в файле нет, файл закрывается, а вместо читателя - None.
+    """
+    f = open(filename, 'r', encoding='utf-8')
+    try:
+        reader = JsonStreamReader(f)
+        head = {}
+        for key in reader.iter_object():
+            if key == stop_key:
+                return head, reader
+            head[key] = reader.read_value()
+    except Exception:
+        f.close()
+        raise
+    f.close()
+    return head, None
+
+
+class SaveScheduler:
+    """
+    Объединяет серию сохранений в одну запись после паузы delay секунд
+    и выполняет ее в фоновом потоке. write_func(snapshot) вызывается
+    не более чем из одного потока одновременно, и более старый снимок
+    никогда не записывается поверх более нового.
+
+    Ошибку фоновой записи некому показать - она только печатается, а снимок
+    остается несохраненным до следующей записи. Синхронные flush, write_now
+    и close передают ошибку вызывающему.
+    """
+
+    def __init__(self, write_func, delay=DEFAULT_SAVE_DELAY):
+        self._write_func = write_func
+        self._delay = delay
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None # (номер, снимок)
+        self._sequence = 0
+        self._written_sequence = 0
+        self._deadline = 0.0
+        self._thread = None
+        self._closed = False
+
+    def schedule(self, snapshot):
+        """Ставит snapshot на запись; более поздний вызов заменяет еще не записанный."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("SaveScheduler уже закрыт")
+            self._sequence += 1
+            self._pending = (self._sequence, snapshot)
+            self._deadline = time.monotonic() + self._delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="launcher-save", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self):
+        """Синхронно записывает запланированный снимок, если он есть."""
+        with self._condition:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        try:
+            self._write(*pending)
+        except Exception:
+            with self._condition:
+                if self._pending is None:
+                    self._pending = pending # Снимок не потерян: его запишет следующая попытка
+            raise
+
+    def write_now(self, snapshot):
+        """Синхронно записывает snapshot, заменяя запланированную запись."""
+        with self._condition:
+            self._sequence += 1
+            sequence = self._sequence
+            self._pending = None
+        self._write(sequence, snapshot)
+
+    def close(self):
+        """
+        Записывает отложенные данные и останавливает фоновый поток.
+        Если записать не удалось, ошибка передается дальше, а планировщик
+        остается открытым - можно исправить причину и повторить.
+        """
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _write(self, sequence, snapshot):
+        with self._write_lock:
+            if sequence <= self._written_sequence:
+                return # Уже записан более новый снимок
+            self._write_func(snapshot)
+            self._written_sequence = sequence
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0 and not self._closed:
+                    self._condition.wait(remaining)
+                    continue
+                pending, self._pending = self._pending, None
+            try:
+                self._write(*pending)
+            except Exception as e:
+                print(f"Ошибка при сохранении данных: {e}")
+
+
+STORAGE_ENV_VAR = "LAUNCHER_STORAGE" # Выбор хранилища без изменения кода приложения
+DEFAULT_STORAGE = "json"
+JOURNAL_COMPACT_BYTES = 1024 * 1024 # Размер журнала, после которого он сворачивается в снимок
+JOURNAL_GENERATION_KEY = "journal_generation"
+
+
+class JsonStorage:
+    """
+    Хранилище по умолчанию: каждое сохранение целиком переписывает JSON-файл
+    (атомарно и в фоне, см. SaveScheduler).
+    """
+    name = "json"
+
+    def __init__(self, filename, backup_count=DEFAULT_BACKUP_COUNT, save_delay=DEFAULT_SAVE_DELAY):
+        self.filename = filename
+        self.backup_count = backup_count
+        self._save_scheduler = SaveScheduler(self._write_snapshot, delay=save_delay)
+
+    def load(self):
+        """Читает снимок данных: (данные, имя прочитанного файла) или (None, None)."""
+        return load_json_with_backups(self.filename, self.backup_count)
+
+    def load_head(self, stop_key):
+        """
+        Начало снимка для отложенной загрузки (см. read_json_head)
+        или None, если так читать нельзя - тогда нужна полная загрузка.
+        """
+        if not os.path.exists(self.filename):
+            return None
+        return read_json_head(self.filename, stop_key)
+
+    def replay(self, apply_func):
+        """Применяет изменения, сделанные после снимка. Возвращает их количество."""
+        return 0
+
+    def record(self, operation, args):
+        """Запоминает изменение данных (JSON-хранилищу это не нужно)."""
+
+    def mark_dirty(self):
+        """Следующее сохранение должно записать полный снимок."""
+
+    def save(self, make_snapshot):
+        """Синхронно сохраняет данные (отменяет отложенное сохранение)."""
+        self._save_scheduler.write_now(make_snapshot())
+
+    def schedule_save(self, make_snapshot):
+        """Планирует сохранение в фоне; make_snapshot() вызывается сразу."""
+        self._save_scheduler.schedule(make_snapshot())
+
+    def flush(self):
+        """Синхронно выполняет отложенную запись, если она есть."""
+        self._save_scheduler.flush()
+
+    def close(self):
+        self._save_scheduler.close()
+
+    def _write_snapshot(self, snapshot):
+        atomic_write_json(self.filename, snapshot, self.backup_count)
+
+
+class JournalStorage(JsonStorage):
+    """
+    Хранилище с журналом: изменения дописываются компактными строками JSON
+    в файлы журнала <filename>.journal.<поколение>, а полный снимок
+    (обычный launcher_data.json) переписывается только при свертке журнала -
+    когда он вырос больше compact_bytes, после массовых изменений (импорт)
+    и при закрытии приложения.
+
+    Снимок помечается номером поколения журнала, который он уже включает,
+    поэтому записи, дописанные во время фоновой записи снимка, попадают
+    в следующее поколение и не теряются, а уже учтенные не применяются повторно.
+
+    Поток интерфейса только ставит строки журнала и снимки в очередь; дописывание
+    с fsync и запись снимка выполняет поток SaveScheduler, по порядку.
+    """
+    name = "journal"
+
+    def __init__(self, filename, backup_count=DEFAULT_BACKUP_COUNT, save_delay=DEFAULT_SAVE_DELAY,
+                 compact_bytes=JOURNAL_COMPACT_BYTES, fsync=True):
+        super().__init__(filename, backup_count, save_delay)
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self._pending_lines = []
+        self._queue_lock = threading.Lock()
+        self._unwritten = [] # [(поколение, байты)] - строки журнала для потока записи
+        self._compaction = None # (поколение, снимок) для потока записи
+        self._journal_file = None # Открывает и пишет только поток записи
+        self._journal_file_generation = None
+        self._journal_bytes = 0 # Сколько байт журнала еще не свернуто в снимок
+        self._needs_snapshot = False
+        self._snapshot_generation = 0
+        self._generation = 1 # Поколение, в которое дописываются новые записи
+
+    def journal_filename(self, generation):
+        return f"{self.filename}.journal.{generation}"
+
+    def _journal_generations(self):
+        """Номера поколений журнала, существующих на диске, по возрастанию."""
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        prefix = os.path.basename(self.filename) + ".journal."
+        generations = []
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return generations
+        for name in names:
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def load(self):
+        data, source = super().load()
+        self._snapshot_generation = 0
+        if isinstance(data, dict):
+            self._snapshot_generation = data.pop(JOURNAL_GENERATION_KEY, 0)
+        return data, source
+
+    def replay(self, apply_func):
+        """
+        Применяет записи журнала новее снимка по порядку.
+        Оборванная строка (сбой во время дописывания) завершает чтение своего файла.
+        Новые записи после загрузки всегда идут в новое поколение.
+        """
+        generations = [g for g in self._journal_generations() if g > self._snapshot_generation]
+        applied = 0
+        for generation in generations:
+            filename = self.journal_filename(generation)
+            try:
+                with open(filename, 'rb') as f:
+                    lines = f.read().split(b"\n")
+            except OSError as e:
+                print(f"Ошибка чтения журнала {filename}: {e}")
+                continue
+            self._journal_bytes += sum(len(line) + 1 for line in lines)
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    operation, args = json.loads(line.decode('utf-8'))
+                except (ValueError, UnicodeDecodeError):
+                    print(f"Журнал {filename} оборван, остаток файла пропущен.")
+                    self._needs_snapshot = True
+                    break
+                try:
+                    apply_func(operation, args)
+                    applied += 1
+                except Exception as e:
+                    print(f"Не удалось применить запись журнала {operation}: {e}")
+        self._generation = max([self._snapshot_generation] + generations) + 1
+        return applied
+
+    def load_head(self, stop_key):
+        # Журнал повторяется поверх полных данных - отложенная загрузка не подходит
+        return None
+
+    def record(self, operation, args):
+        self._pending_lines.append(
+            json.dumps([operation, args], ensure_ascii=False, separators=(",", ":")) + "\n"
+        )
+
+    def mark_dirty(self):
+        self._pending_lines.clear() # Полный снимок все равно включит эти изменения
+        self._needs_snapshot = True
+
+    def _queue_pending(self):
+        """Передает накопленные записи потоку записи (в текущее поколение журнала)."""
+        if not self._pending_lines:
+            return
+        chunk = "".join(self._pending_lines).encode('utf-8')
+        self._pending_lines.clear()
+        self._journal_bytes += len(chunk)
+        with self._queue_lock:
+            self._unwritten.append((self._generation, chunk))
+
+    def _start_compaction(self, make_snapshot):
+        """Снимок включает все поколения до текущего; новые записи пойдут в следующее."""
+        generation = self._generation
+        self._generation += 1
+        self._journal_bytes = 0
+        self._needs_snapshot = False
+        self._pending_lines.clear()
+        compaction = (generation, make_snapshot())
+        with self._queue_lock:
+            self._compaction = compaction # Более новый снимок включает и еще не записанный
+        return compaction
+
+    def save(self, make_snapshot):
+        self._start_compaction(make_snapshot)
+        self._save_scheduler.write_now(None)
+
+    def schedule_save(self, make_snapshot):
+        self._queue_pending()
+        if self._needs_snapshot or self._journal_bytes >= self.compact_bytes:
+            self._start_compaction(make_snapshot)
+        # Снимок SaveScheduler - только сигнал: что писать, лежит в очереди хранилища
+        self._save_scheduler.schedule(None)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._close_journal_file()
+
+    def _close_journal_file(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+            self._journal_file_generation = None
+
+    def _append(self, generation, chunk):
+        """Дописывает строки в журнал поколения generation (только поток записи)."""
+        if self._journal_file_generation != generation:
+            self._close_journal_file()
+            self._journal_file = open(self.journal_filename(generation), 'ab')
+            self._journal_file_generation = generation
+        self._journal_file.write(chunk)
+        self._journal_file.flush()
+        if self.fsync:
+            os.fsync(self._journal_file.fileno())
+
+    def _requeue_compaction(self, compaction):
+        """Возвращает незаписанный снимок в очередь, если его еще не заменил более новый."""
+        if compaction is None:
+            return
+        with self._queue_lock:
+            if self._compaction is None:
+                self._compaction = compaction
+
+    def _write_snapshot(self, token):
+        with self._queue_lock:
+            unwritten, self._unwritten = self._unwritten, []
+            compaction, self._compaction = self._compaction, None
+        try:
+            # Строки одного поколения дописываются одной записью с одним fsync
+            start = 0
+            for index in range(1, len(unwritten) + 1):
+                if index == len(unwritten) or unwritten[index][0] != unwritten[start][0]:
+                    self._append(unwritten[start][0], b"".join(chunk for _, chunk in unwritten[start:index]))
+                    start = index
+        except OSError:
+            # Журнал мог оборваться посреди строки - изменения сохранит только полный снимок
+            self._needs_snapshot = True
+            self._requeue_compaction(compaction)
+            raise
+        if compaction is None:
+            return
+        generation, snapshot = compaction
+        if self._journal_file_generation is not None and self._journal_file_generation <= generation:
+            self._close_journal_file() # Свернутое поколение будет удалено
+        snapshot = dict(snapshot)
+        snapshot[JOURNAL_GENERATION_KEY] = generation
+        try:
+            super()._write_snapshot(snapshot)
+        except Exception:
+            self._requeue_compaction(compaction)
+            raise
+        # Снимок на диске - теперь свернутые поколения журнала не нужны
+        for old_generation in self._journal_generations():
+            if old_generation <= generation:
+                try:
+                    os.remove(self.journal_filename(old_generation))
+                except OSError as e:
+                    print(f"Не удалось удалить журнал {self.journal_filename(old_generation)}: {e}")
+
+
+STORAGE_BACKENDS = {
+    JsonStorage.name: JsonStorage,
+    JournalStorage.name: JournalStorage,
+}
+
+
+def create_storage(filename, backend=None, **options):
+    """
+    Создает хранилище данных лаунчера. backend - имя из STORAGE_BACKENDS;
+    по умолчанию берется из переменной окружения LAUNCHER_STORAGE, иначе "json".
+    """
+    if backend is None:
+        backend = os.environ.get(STORAGE_ENV_VAR, DEFAULT_STORAGE)
+    storage_class = STORAGE_BACKENDS.get(backend)
+    if storage_class is None:
+        print(f"Неизвестное хранилище {backend!r}, используется {DEFAULT_STORAGE!r}.")
+        storage_class = STORAGE_BACKENDS[DEFAULT_STORAGE]
+    return storage_class(filename, **options)
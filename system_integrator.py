@@ -80,6 +80,133 @@ def open_file_location(path):
         traceback.print_exc() # Для отладки
         print(f"[DEBUG] Возникла ошибка: {e}")
 
+def focus_process_window(pid):
+    """
+    Выводит на передний план окно процесса pid. Возвращает True, если окно найдено.
+    Windows - через WinAPI (ctypes), macOS - через AppleScript,
+    Linux - через xdotool или wmctrl, если они установлены.
+    """
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            user32 = ctypes.windll.user32
+            found = []
+
+            @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+            def enum_window(hwnd, lparam):
+                window_pid = wintypes.DWORD()
+                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(window_pid))
+                if window_pid.value == pid and user32.IsWindowVisible(hwnd):
+                    found.append(hwnd)
+                    return False
+                return True
+
+            user32.EnumWindows(enum_window, 0)
+            if not found:
+                return False
+            user32.ShowWindow(found[0], 9) # SW_RESTORE - если окно свернуто
+            return bool(user32.SetForegroundWindow(found[0]))
+
+        if sys.platform == "darwin":
+            script = f'tell application "System Events" to set frontmost of (first process whose unix id is {pid}) to true'
+            return subprocess.run(["osascript", "-e", script], capture_output=True).returncode == 0
+
+        import shutil
+
+        if shutil.which("xdotool"):
+            result = subprocess.run(["xdotool", "search", "--onlyvisible", "--pid", str(pid), "windowactivate"], capture_output=True)
+            return result.returncode == 0
+        if shutil.which("wmctrl"):
+            windows = subprocess.run(["wmctrl", "-lp"], capture_output=True, text=True).stdout
+            for line in windows.splitlines():
+                fields = line.split(None, 3)
+                if len(fields) >= 3 and fields[2] == str(pid):
+                    return subprocess.run(["wmctrl", "-ia", fields[0]], capture_output=True).returncode == 0
+        return False
+    except Exception as e:
+        print(f"[DEBUG] Не удалось вывести окно процесса {pid} на передний план: {e}")
+        return False
+
+# Глобальное сочетание клавиш (WinAPI RegisterHotKey)
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_SHIFT = 0x0004
+MOD_NOREPEAT = 0x4000 # Удержание клавиши не повторяет нажатие
+VK_SPACE = 0x20
+WM_HOTKEY = 0x0312
+WM_QUIT = 0x0012
+HOTKEY_ID = 1
+
+
+class GlobalHotkey:
+    """
+    Сочетание клавиш, которое срабатывает, даже когда окно лаунчера не активно
+    (по умолчанию Ctrl+Alt+Пробел). Только Windows: сочетание регистрирует свой поток
+    с очередью сообщений, а интерфейс опрашивает pressed() через after().
+    На других системах start() возвращает False и объясняет причину в error:
+    там сочетание назначается в настройках рабочего стола на команду
+    python -m launcher_service --palette.
+    """
+
+    def __init__(self, modifiers=MOD_CONTROL | MOD_ALT, key=VK_SPACE):
+        import threading
+
+        self.modifiers = modifiers
+        self.key = key
+        self.error = None
+        self._pressed = threading.Event()
+        self._registered = threading.Event()
+        self._thread_id = None
+        self._thread = threading.Thread(target=self._run, name="global-hotkey", daemon=True)
+
+    def start(self):
+        """Регистрирует сочетание; False - сочетание недоступно (причина в error)."""
+        if sys.platform != "win32":
+            self.error = "Глобальное сочетание клавиш поддерживается только в Windows."
+            return False
+        self._thread.start()
+        self._registered.wait(1.0)
+        return self.error is None and self._thread_id is not None
+
+    def pressed(self):
+        """True, если сочетание нажимали с прошлого вызова."""
+        if self._pressed.is_set():
+            self._pressed.clear()
+            return True
+        return False
+
+    def close(self):
+        if self._thread_id is not None:
+            import ctypes
+
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread.join(1.0)
+            self._thread_id = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        try:
+            if not user32.RegisterHotKey(None, HOTKEY_ID, self.modifiers | MOD_NOREPEAT, self.key):
+                self.error = f"Сочетание клавиш уже занято другой программой (код {ctypes.get_last_error()})."
+                return
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        finally:
+            self._registered.set()
+        message = wintypes.MSG()
+        try:
+            # GetMessageW возвращает 0 на WM_QUIT (close) и -1 при ошибке
+            while user32.GetMessageW(ctypes.byref(message), None, 0, 0) > 0:
+                if message.message == WM_HOTKEY and message.wParam == HOTKEY_ID:
+                    self._pressed.set()
+        finally:
+            user32.UnregisterHotKey(None, HOTKEY_ID)
+
+
 if __name__ == '__main__':
     # Пример использования для тестирования модуля:
     print("Тестирование system_integrator.py (как отдельного скрипта).")
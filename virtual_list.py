@@ -0,0 +1,278 @@
+"""
+Виртуальный список поверх ttk.Treeview.
+В дереве живет только столько строк, сколько помещается в окне, а при прокрутке
+эти строки перезаполняются данными из модели (обычного списка Python).
+Поэтому число элементов Tk не зависит от длины списка - хоть 100 000 записей.
+"""
+import math
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_OVERSCAN = 10 # Строк выше и ниже окна, для которых заранее готовятся данные (иконки)
+WHEEL_ROWS = 3 # Строк за один шаг колеса мыши
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    Список строк с виртуальной прокруткой.
+
+    render_row(row) -> (текст, изображение, values) или (текст, изображение, values, теги)
+    вызывается только для видимых строк; теги - для оформления через tree.tag_configure.
+    on_select() вызывается, когда пользователь выбирает другую строку.
+    Ctrl+щелчок добавляет строку к выбору или убирает ее, Shift+щелчок выбирает диапазон;
+    selected_index - текущая строка, selected_indices - все выбранные.
+    on_viewport_change(first, last) сообщает диапазон строк модели [first, last),
+    который виден на экране с запасом overscan - например, чтобы загрузить иконки.
+    """
+
+    def __init__(self, master, render_row, row_height, on_select=None, on_viewport_change=None,
+                 overscan=DEFAULT_OVERSCAN, frame_style=None, **tree_options):
+        if frame_style:
+            super().__init__(master, style=frame_style)
+        else:
+            super().__init__(master)
+        self.render_row = render_row
+        self.row_height = row_height
+        self.on_select = on_select
+        self.on_viewport_change = on_viewport_change
+        self.overscan = overscan
+
+        self.rows = []
+        self.first = 0 # Индекс строки модели в верхней строке окна
+        self.selected_index = None
+        self.selected_indices = set()
+        self._slots = [] # id элементов дерева, которые переиспользуются при прокрутке
+        self._viewport = None
+        self._header_height = 0 # Высота заголовка дерева, узнается после первой отрисовки
+
+        self.tree = ttk.Treeview(self, selectmode="browse", **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", lambda event: self._render())
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Control-Button-1>", self._on_control_click)
+        self.tree.bind("<Shift-Button-1>", self._on_shift_click)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_by(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_by(WHEEL_ROWS))
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                               ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(sequence, lambda event, step=step: self._on_key(step))
+
+    # Модель
+
+    def set_rows(self, rows, keep_position=False):
+        """Заменяет строки списка. Без keep_position прокрутка и выбор сбрасываются."""
+        self.rows = rows
+        self._viewport = None # Строки другие - диапазон нужно сообщить заново
+        if not keep_position:
+            self.first = 0
+            self.selected_index = None
+            self.selected_indices = set()
+        else:
+            self.selected_indices = {index for index in self.selected_indices if index < len(rows)}
+            if self.selected_index is not None and self.selected_index >= len(rows):
+                self.selected_index = None
+        self._render()
+
+    def refresh(self):
+        """Перерисовывает видимые строки (например, после загрузки иконки)."""
+        self._render()
+
+    def refresh_rows(self, predicate):
+        """Перерисовывает только видимые строки, для которых predicate(строка) истинно."""
+        for offset, item_id in enumerate(self._slots):
+            row = self.rows[self.first + offset]
+            if predicate(row):
+                text, image, values, *tags = self.render_row(row)
+                self.tree.item(item_id, text=text, image=image or "", values=values, tags=tags[0] if tags else ())
+
+    def selected_row(self):
+        if self.selected_index is None:
+            return None
+        return self.rows[self.selected_index]
+
+    def selected_rows(self):
+        """Все выбранные строки в порядке модели."""
+        return [self.rows[index] for index in sorted(self.selected_indices)]
+
+    def select_index(self, index):
+        """Выбирает одну строку модели и прокручивает к ней (без вызова on_select)."""
+        self.selected_index = index
+        self.selected_indices = {index}
+        self._ensure_visible(index)
+        self._render()
+
+    def clear_selection(self):
+        self.selected_index = None
+        self.selected_indices = set()
+        self._render()
+
+    def index_at(self, y):
+        """Индекс строки модели под координатой y или None."""
+        item_id = self.tree.identify_row(y)
+        if item_id in self._slots:
+            return self.first + self._slots.index(item_id)
+        return None
+
+    def viewport(self):
+        """Последний сообщенный диапазон [first, last) строк модели (с запасом overscan)."""
+        return self._viewport or (0, 0)
+
+    def live_item_count(self):
+        """Сколько элементов сейчас создано в дереве."""
+        return len(self.tree.get_children())
+
+    # Прокрутка
+
+    def page_size(self):
+        """Сколько строк помещается в окне (с частично видимой нижней)."""
+        height = self.tree.winfo_height() - self._header_height
+        if height <= 1:
+            height = int(self.tree.cget("height") or 10) * self.row_height
+        return max(1, math.ceil(height / self.row_height))
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: ("moveto", доля) или ("scroll", n, "units"/"pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                amount *= max(1, self.page_size() - 1)
+            self.first += amount
+        self._render()
+
+    def _scroll_by(self, rows):
+        self.first += rows
+        self._render()
+        return "break"
+
+    def _on_mouse_wheel(self, event):
+        if event.delta:
+            steps = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+            return self._scroll_by(steps * WHEEL_ROWS)
+        return "break"
+
+    def _ensure_visible(self, index):
+        visible = max(1, self.page_size() - 1) # Нижняя строка может быть видна частично
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + visible:
+            self.first = index - visible + 1
+
+    def _on_key(self, step):
+        if not self.rows:
+            return "break"
+        page = max(1, self.page_size() - 1)
+        current = self.selected_index
+        if step == "home":
+            index = 0
+        elif step == "end":
+            index = len(self.rows) - 1
+        elif current is None:
+            index = self.first
+        elif step == "page":
+            index = current + page
+        elif step == "-page":
+            index = current - page
+        else:
+            index = current + step
+        index = min(max(index, 0), len(self.rows) - 1)
+        if index != current or len(self.selected_indices) > 1:
+            self.select_index(index)
+            if self.on_select:
+                self.on_select()
+        return "break"
+
+    def _on_tree_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._slots:
+            return # Выбранная строка ушла за пределы окна - выбор в модели сохраняется
+        indices = {self.first + self._slots.index(item_id) for item_id in selection if item_id in self._slots}
+        if indices == self._visible_selection():
+            return # Это выбор, который выставил сам _render
+        index = self.first + self._slots.index(selection[0])
+        self.selected_index = index
+        self.selected_indices = {index}
+        if self.on_select:
+            self.on_select()
+
+    def _on_control_click(self, event):
+        index = self.index_at(event.y)
+        if index is None:
+            return "break"
+        if index in self.selected_indices:
+            self.selected_indices.discard(index)
+            if self.selected_index == index:
+                self.selected_index = min(self.selected_indices) if self.selected_indices else None
+        else:
+            self.selected_indices.add(index)
+            self.selected_index = index
+        self._render()
+        if self.on_select:
+            self.on_select()
+        return "break"
+
+    def _on_shift_click(self, event):
+        index = self.index_at(event.y)
+        if index is None:
+            return "break"
+        anchor = self.selected_index if self.selected_index is not None else index
+        self.selected_indices = set(range(min(anchor, index), max(anchor, index) + 1))
+        self.selected_index = index
+        self._render()
+        if self.on_select:
+            self.on_select()
+        return "break"
+
+    def _visible_selection(self):
+        last = self.first + len(self._slots)
+        return {index for index in self.selected_indices if self.first <= index < last}
+
+    # Отрисовка
+
+    def _render(self):
+        count = len(self.rows)
+        page = self.page_size()
+        self.first = min(max(self.first, 0), max(0, count - page + 1))
+        visible = min(page, count - self.first)
+
+        # Число элементов дерева - не больше числа строк в окне
+        while len(self._slots) < visible:
+            self._slots.append(self.tree.insert("", tk.END, text=""))
+        if len(self._slots) > visible:
+            self.tree.delete(*self._slots[visible:])
+            del self._slots[visible:]
+
+        for offset, item_id in enumerate(self._slots):
+            text, image, values, *tags = self.render_row(self.rows[self.first + offset])
+            self.tree.item(item_id, text=text, image=image or "", values=values, tags=tags[0] if tags else ())
+
+        # Выделение в дереве не зависит от selectmode: несколько строк выставляются программно
+        selected_slots = tuple(self._slots[index - self.first] for index in sorted(self._visible_selection()))
+        if selected_slots:
+            if self.tree.selection() != selected_slots:
+                self.tree.selection_set(selected_slots)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+        self.tree.yview_moveto(0)
+        if self._slots:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                self._header_height = bbox[1]
+
+        if count:
+            self.scrollbar.set(self.first / count, min(1.0, (self.first + page) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        viewport = (max(0, self.first - self.overscan), min(count, self.first + visible + self.overscan))
+        if viewport != self._viewport:
+            self._viewport = viewport
+            if self.on_viewport_change:
+                self.on_viewport_change(*viewport)